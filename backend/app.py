@@ -1,9 +1,14 @@
 # app.py
 import asyncio
+import logging
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from routes import auth, portfolio, stocks, info, leaderboard, admin, news, mutual_funds, analytics, chat
 from websocket_manager import manager, price_updater_task, start_price_updater_on_startup
+from utils.cache_store import start_cache_persistence, stop_cache_persistence
+from utils.market_snapshot import start_market_snapshot
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="BenStocks API",
@@ -13,9 +18,18 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
+    # Warm the market data caches from the last run before any traffic arrives
+    await start_cache_persistence()
     # Starts the background task to fetch live prices using the new robust startup helper
     # This ensures the cache is primed before the first user connects
     await start_price_updater_on_startup()
+    # Market summary / top movers are materialized in the background, not per request
+    start_market_snapshot()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush cache entries still waiting for write-behind
+    await stop_cache_persistence()
 
 # --- SECURITY FIX: Restrict CORS to Frontend URL ---
 origins = [
@@ -51,8 +65,14 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive_text()
+            await manager.handle_client_message(websocket, message)
     except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        # Socket was evicted by its writer or died mid-receive
+        logger.debug("WebSocket closed: %s", e)
+    finally:
         manager.disconnect(websocket)
 
 @app.get("/")
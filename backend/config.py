@@ -15,4 +15,34 @@ DEFAULT_BALANCE = 100000  # ₹100,000
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
 
 # NewsData.io API Key for news fetching
-NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY")
\ No newline at end of file
+NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY")
+
+# Market data backend: "yfinance" (live), "synthetic" (random walk) or "replay" (tapes on disk)
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yfinance")
+# Directory of <SYMBOL>.csv OHLC tapes for the replay provider
+MARKET_DATA_TAPE_DIR = os.getenv("MARKET_DATA_TAPE_DIR", "")
+# Live ticks per second for the local providers
+MARKET_DATA_TICK_RATE = float(os.getenv("MARKET_DATA_TICK_RATE", "1.0"))
+MARKET_DATA_SEED = int(os.getenv("MARKET_DATA_SEED", "42"))
+
+# Stale-while-revalidate: for this long past their TTL, cached quotes/fundamentals are served
+# immediately (flagged stale) while a background refresh runs; after that, callers wait.
+QUOTE_STALE_GRACE_SECONDS = float(os.getenv("QUOTE_STALE_GRACE_SECONDS", "120"))
+FUNDAMENTALS_STALE_GRACE_SECONDS = float(os.getenv("FUNDAMENTALS_STALE_GRACE_SECONDS", str(7 * 24 * 3600)))
+
+# Symbols scanned for top movers: CSV with symbol,name,sector columns (see resources/symbols.csv)
+MOVERS_UNIVERSE_FILE = os.getenv("MOVERS_UNIVERSE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "symbols.csv"))
+
+# Symbol master for /stocks/search (symbol,name[,exchange,type] CSV, reloaded when it changes).
+# The remote provider search is only asked when the local index has no match.
+SYMBOL_MASTER_FILE = os.getenv("SYMBOL_MASTER_FILE", MOVERS_UNIVERSE_FILE)
+SYMBOL_SEARCH_REMOTE_FALLBACK = os.getenv("SYMBOL_SEARCH_REMOTE_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+# Local daily OHLC store (one memory-mapped .npy per symbol, see utils/history_store.py)
+HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "history"))
+
+# Price bus for multi-worker deployments: "inprocess" (single worker) or "unix"
+# With "unix", one worker wins the lock and polls prices for all of them.
+PRICE_BUS_TRANSPORT = os.getenv("PRICE_BUS_TRANSPORT", "inprocess")
+PRICE_BUS_SOCKET_PATH = os.getenv("PRICE_BUS_SOCKET_PATH", "/tmp/benstocks-price-bus.sock")
+PRICE_BUS_LOCK_PATH = os.getenv("PRICE_BUS_LOCK_PATH", "/tmp/benstocks-price-bus.lock")
@@ -20,4 +20,6 @@ except Exception as e:
 users_collection = db["users"]
 portfolio_collection = db["portfolios"]
 transactions_collection = db["transactions"]
-chats_collection = db["chats"]
\ No newline at end of file
+chats_collection = db["chats"]
+# Persisted market data cache entries for warm restarts (see utils/cache_store.py)
+market_cache_collection = db["market_cache"]
\ No newline at end of file
@@ -47,4 +47,46 @@ async def run_dividend_cycle():
 @router.post("/issue-dividend")
 async def issue_dividend(request: DividendRequest):
     users_paid = await _issue_dividend_for_symbol(request.symbol.upper(), request.dividend_per_share_inr)
-    return {"message": f"Dividend for {request.symbol.upper()} issued successfully.", "users_paid": users_paid}
\ No newline at end of file
+    return {"message": f"Dividend for {request.symbol.upper()} issued successfully.", "users_paid": users_paid}
+
+@router.get("/ws-stats")
+async def get_websocket_stats():
+    """Per-connection outbound queue depth, coalesced ticks and delivery lag for /ws."""
+    from websocket_manager import manager
+    return manager.connection_stats()
+
+@router.get("/refresh-schedule")
+async def get_refresh_schedule():
+    """Next refresh time, interval and subscriber count for every tracked symbol."""
+    from websocket_manager import scheduler
+    return scheduler.snapshot()
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Entries, bytes, hit rate, evictions and expirations for every market data cache,
+    plus the Mongo write-behind counters under "persistence".
+    """
+    from utils.cache import cache_stats
+    from utils import cache_store
+    store = cache_store.cache_store
+    return {**cache_stats(), "persistence": store.stats() if store is not None else None}
+
+@router.get("/market-data-stats")
+async def get_market_data_stats():
+    """Calls, timeouts and in-flight work on the market data executor, plus the dashboard snapshot's age."""
+    from utils import market_service
+    from utils.market_snapshot import market_snapshot
+    return {**market_service.stats(), "snapshot": market_snapshot.stats()}
+
+@router.get("/history-store-stats")
+async def get_history_store_stats():
+    """Symbols open, backfills, tail refreshes and bars appended in the local OHLC history store."""
+    from utils.history_store import history_store
+    return history_store.stats()
+
+@router.get("/symbol-search-stats")
+async def get_symbol_search_stats():
+    """Symbols indexed, learned symbols and how often search fell back to the remote provider."""
+    from utils.symbol_search import symbol_search
+    return symbol_search.stats()
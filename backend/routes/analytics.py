@@ -54,6 +54,7 @@ async def get_diversification_score(user_id: str):
         live_data = await get_live_portfolio_value(user_id)
         investment_details = live_data.get("investment_details", {})
         score_data = calculate_diversification_score(portfolio.investments, investment_details)
+        score_data["price_ages"] = live_data.get("price_ages", {})
         return score_data
     except Exception as e:
         print(f"Error calculating diversification score for user {user_id}: {e}")
@@ -1,7 +1,6 @@
 # backend/routes/chat.py
 import asyncio
 import re
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -16,6 +15,10 @@ from models.chat_model import ChatSession, ChatMessage, CreateChatRequest
 from routes.portfolio import get_portfolio
 from routes.news import get_financial_news
 from utils.fetch_data import fetch_stock_data
+from utils.market_data import get_provider
+from utils.history_store import history_store
+from utils.cache import SingleFlight
+from utils import market_service
 from utils.prompts import FEW_SHOT_EXAMPLES
 
 router = APIRouter()
@@ -127,14 +130,23 @@ def calculate_technicals(history_df):
 
 # --- SMART SEARCH & DATA FETCHING ---
 
+# Concurrent chats asking about the same ticker share one provider scrape
+_analysis_flight = SingleFlight()
+
+def load_market_snapshot(symbol: str):
+    """Price, .info and technicals for one ticker, or None if it has no history."""
+    # Get 3mo history for MACD
+    hist = history_store.frame(symbol, period="3mo")
+    if hist.empty: return None
+
+    info = get_provider().ticker(symbol).info or {}
+
+    return hist['Close'].iloc[-1], info, calculate_technicals(hist)
+
 def search_ticker_from_query(query: str) -> List[str]:
-    """Finds tickers via Yahoo. Prioritizes Stocks over Funds."""
-    url = f"https://query1.finance.yahoo.com/v1/finance/search?q={query}"
-    headers = {'User-Agent': 'Mozilla/5.0'}
+    """Finds tickers via the provider's search. Prioritizes Stocks over Funds."""
     try:
-        response = requests.get(url, headers=headers, timeout=2)
-        data = response.json()
-        quotes = data.get("quotes", [])
+        quotes = get_provider().search(query)
         
         found_tickers = []
         if quotes:
@@ -192,31 +204,26 @@ async def resolve_context_and_fetch(user_message: str, user_id: str):
                 detected_tickers.add(holding_symbol)
 
     # B. Search Yahoo for new tickers
-    loop = asyncio.get_event_loop()
-    search_tasks = [loop.run_in_executor(None, search_ticker_from_query, word) for word in candidates]
+    search_tasks = [
+        market_service.run_blocking(search_ticker_from_query, word, timeout=market_service.SEARCH_TIMEOUT_SECONDS)
+        for word in candidates
+    ]
     if search_tasks:
-        search_results = await asyncio.gather(*search_tasks)
+        search_results = await asyncio.gather(*search_tasks, return_exceptions=True)
         for res in search_results:
-            detected_tickers.update(res)
+            if not isinstance(res, Exception):
+                detected_tickers.update(res)
     
     market_data_str = ""
     if not detected_tickers:
         market_data_str = "[No specific ticker identified]"
     else:
-        import yfinance as yf
-        
         def fetch_full_analysis(symbol):
             try:
-                ticker = yf.Ticker(symbol)
-                # Get 3mo history for MACD
-                hist = ticker.history(period="3mo")
-                info = ticker.info or {}
-                
-                if hist.empty: return None
-
-                current_price = hist['Close'].iloc[-1]
-                technicals = calculate_technicals(hist)
-                
+                snapshot = _analysis_flight.do(symbol, lambda: load_market_snapshot(symbol))
+                if snapshot is None: return None
+                current_price, info, technicals = snapshot
+
                 holding_info = ""
                 if symbol in user_holdings_map:
                     inv = user_holdings_map[symbol]
@@ -229,10 +236,13 @@ async def resolve_context_and_fetch(user_message: str, user_id: str):
                 )
             except: return None
 
-        analysis_tasks = [asyncio.to_thread(fetch_full_analysis, t) for t in list(detected_tickers)[:3]]
-        results = await asyncio.gather(*analysis_tasks)
+        analysis_tasks = [
+            market_service.run_blocking(fetch_full_analysis, t, timeout=market_service.HISTORY_TIMEOUT_SECONDS)
+            for t in list(detected_tickers)[:3]
+        ]
+        results = await asyncio.gather(*analysis_tasks, return_exceptions=True)
         
-        valid_rows = [r for r in results if r]
+        valid_rows = [r for r in results if r and not isinstance(r, Exception)]
         if valid_rows:
             market_data_str = "\n".join(valid_rows)
         else:
@@ -1,22 +1,25 @@
 # routes/leaderboard.py
 from fastapi import APIRouter, HTTPException
 from database import users_collection, portfolio_collection
-from utils.fetch_data import fetch_stock_data
-from utils.currency import get_exchange_rate
+from utils import market_service
+from utils.price_lookup import get_prices
 from utils.simulate_nav import get_simulated_nav, SIMULATED_FUNDS_DATA
 from bson import ObjectId
+from typing import Dict, Optional
 import asyncio
 
 router = APIRouter()
 
-async def calculate_user_portfolio_value(user_doc: dict) -> float:
-    user_id = str(user_doc["_id"])
+async def calculate_user_portfolio_value(user_doc: dict, portfolio_doc: Optional[dict], prices: Dict[str, Dict]):
+    """
+    Cash plus holdings valued from `prices` (see utils/price_lookup.get_prices).
+    Returns (total value in INR, age in seconds of the oldest price used or None).
+    """
     cash_balance = user_doc.get("balance", 0.0)
-    
-    portfolio_doc = await portfolio_collection.find_one({"user_id": user_id})
     investments = portfolio_doc.get("investments", []) if portfolio_doc else []
 
     total_investment_value_inr = 0.0
+    oldest_price_age = None
     
     for investment_dict in investments:
         symbol = investment_dict.get("symbol")
@@ -32,8 +35,8 @@ async def calculate_user_portfolio_value(user_doc: dict) -> float:
         else:
             value_inr_for_this_investment = buy_cost_inr_fallback
             try:
-                live_data = fetch_stock_data(symbol) 
-                live_price = live_data.get("close")
+                live_data = prices.get(symbol.upper()) or {}
+                live_price = live_data.get("price")
                 stock_currency = live_data.get("currency", "USD")
                 
                 if live_price is not None and live_price > 0:
@@ -41,35 +44,51 @@ async def calculate_user_portfolio_value(user_doc: dict) -> float:
                     live_value_inr = value_original_currency
                     
                     if stock_currency != "INR":
-                        rate = get_exchange_rate(stock_currency, "INR")
+                        rate = await market_service.get_exchange_rate(stock_currency, "INR")
                         if rate:
                             live_value_inr = value_original_currency * rate
                         else: 
                              live_value_inr = buy_cost_inr_fallback
                     
                     value_inr_for_this_investment = live_value_inr
+                    oldest_price_age = max(oldest_price_age or 0.0, live_data["age_seconds"])
                 
             except Exception as e:
                 print(f"Error getting live value for {symbol} during leaderboard calc: {e}. Using fallback.")
 
         total_investment_value_inr += value_inr_for_this_investment
 
-    return cash_balance + total_investment_value_inr
+    return cash_balance + total_investment_value_inr, oldest_price_age
 
 @router.get("")
 async def get_leaderboard(limit: int = 10):
     try:
         cursor = users_collection.find({}, {"username": 1, "balance": 1, "_id": 1})
         all_users = await cursor.to_list(length=None)
-        
-        tasks = [calculate_user_portfolio_value(user_doc) for user_doc in all_users]
+
+        # One portfolio query and one price lookup for everybody, instead of per user/per symbol
+        user_ids = [str(user_doc["_id"]) for user_doc in all_users]
+        portfolios = await portfolio_collection.find({"user_id": {"$in": user_ids}}).to_list(length=None)
+        portfolios_by_user = {p.get("user_id"): p for p in portfolios}
+        symbols = {
+            inv.get("symbol") for p in portfolios for inv in p.get("investments", [])
+            if inv.get("symbol") and inv.get("symbol") not in SIMULATED_FUNDS_DATA
+        }
+        prices = await get_prices(symbols) if symbols else {}
+
+        tasks = [
+            calculate_user_portfolio_value(user_doc, portfolios_by_user.get(user_id), prices)
+            for user_doc, user_id in zip(all_users, user_ids)
+        ]
         all_values = await asyncio.gather(*tasks)
 
         leaderboard_data = []
         for i, user_doc in enumerate(all_users):
+             total_value, price_age = all_values[i]
              leaderboard_data.append({
                  "username": user_doc.get("username", f"User_{str(user_doc['_id'])[-4:]}"),
-                 "total_value_inr": round(all_values[i], 2)
+                 "total_value_inr": round(total_value, 2),
+                 "oldest_price_age_seconds": price_age,
              })
             
         leaderboard_data.sort(key=lambda x: x["total_value_inr"], reverse=True)
@@ -78,4 +97,4 @@ async def get_leaderboard(limit: int = 10):
 
     except Exception as e:
         print(f"Error generating leaderboard: {e}")
-        raise HTTPException(status_code=500, detail="Could not generate leaderboard.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Could not generate leaderboard.")
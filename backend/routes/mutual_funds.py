@@ -1,24 +1,67 @@
 # backend/routes/mutual_funds.py
-from fastapi import APIRouter, HTTPException
-from utils.simulate_nav import get_simulated_nav, SIMULATED_FUNDS_DATA
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from utils.simulate_nav import get_simulated_nav, nav_engine
 
 router = APIRouter()
 
+# (built_for, category) -> (body, etag); the catalog only changes when the NAV engine rebuilds
+_catalog_bodies: Dict[Tuple[object, Optional[str]], Tuple[bytes, str]] = {}
+
+
+def _catalog_body(category: Optional[str]) -> Tuple[bytes, str, datetime]:
+    engine = nav_engine()
+    key = (engine.built_for, category)
+    cached = _catalog_bodies.get(key)
+    if cached is None:
+        funds = engine.catalog()
+        if category:
+            funds = [fund for fund in funds if fund["category"] == category]
+        body = json.dumps(funds, separators=(",", ":")).encode()
+        cached = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        # Drop bodies from previous days
+        for stale in [k for k in _catalog_bodies if k[0] != engine.built_for]:
+            del _catalog_bodies[stale]
+        _catalog_bodies[key] = cached
+    rebuilds_at = datetime.combine(engine.built_for + timedelta(days=1), datetime.min.time())
+    return cached[0], cached[1], rebuilds_at
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for it): exact tags from the list, or "*"."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag and tag.strip('"') == etag.strip('"'):
+            return True
+    return False
+
+
 @router.get("")
-async def get_all_mutual_funds():
+async def get_all_mutual_funds(
+    request: Request,
+    category: Optional[str] = Query(None, description="Only funds in this category, e.g. 'Index Funds'"),
+):
     """
-    Returns the list of all available simulated mutual funds, including their category.
+    Returns every simulated mutual fund with its category, today's NAV, 1M/1Y/3Y returns
+    and volatility. The body is built once a day; clients revalidate with If-None-Match
+    and get a 304 until the NAVs roll over.
     """
-    fund_list = [
-        {
-            "id": fund_id,
-            "name": details["name"],
-            "baseNav": details["baseNav"],
-            "category": details.get("category", "Uncategorized") # Include the category
-        }
-        for fund_id, details in SIMULATED_FUNDS_DATA.items()
-    ]
-    return fund_list
+    body, etag, rebuilds_at = _catalog_body(category)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max(int((rebuilds_at - datetime.now()).total_seconds()), 0)}",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/nav/{fund_id}")
 async def get_mutual_fund_nav(fund_id: str):
@@ -28,4 +71,4 @@ async def get_mutual_fund_nav(fund_id: str):
     nav = get_simulated_nav(fund_id)
     if nav is None:
         raise HTTPException(status_code=404, detail="Mutual fund not found.")
-    return {"fund_id": fund_id, "simulated_nav": nav}
\ No newline at end of file
+    return {"fund_id": fund_id, "simulated_nav": nav}
@@ -2,14 +2,15 @@
 
 from fastapi import APIRouter, HTTPException, Body
 from typing import List, Dict, Optional
-from datetime import datetime, date, time, timedelta, timezone
+from datetime import datetime, date, timedelta
 from models.portfolio_model import PortfolioDB, Investment, Transaction, SellRequest, PortfolioHistoryItem
 from database import portfolio_collection, users_collection, transactions_collection
-from utils.fetch_data import fetch_stock_data
-from utils.currency import get_exchange_rate
+from utils.market_hours import closed_reason
 from utils.simulate_nav import get_simulated_nav
+from utils.symbol_registry import symbol_registry
+from utils import market_service
+from utils.price_lookup import get_prices
 from bson import ObjectId
-import yfinance as yf
 import asyncio
 import random 
 
@@ -22,37 +23,20 @@ SIMULATED_MF_IDS = [
     "SBI-CONTRA", "HDFC-FLEXI"
 ]
 
+# The simulator allows trading 24/7 so you can test the app anytime.
+# Set to True for strict exchange hours (sessions come from utils/market_hours.py).
+ENFORCE_MARKET_HOURS = False
+
 def check_market_hours(symbol: str):
     """
-    Returns True if trading is allowed.
-    
-    UPDATED: For this Simulator/Demo, we allow trading 24/7.
-    In a real app, you would uncomment the logic below.
+    Returns True if trading is allowed; raises a 400 when ENFORCE_MARKET_HOURS is on
+    and the symbol's exchange is closed. Crypto & Mutual Funds are always open.
     """
-    # 1. Crypto & Mutual Funds are always open
-    if symbol in SIMULATED_MF_IDS or symbol.upper().endswith("-USD"):
+    if symbol in SIMULATED_MF_IDS or not ENFORCE_MARKET_HOURS:
         return True
-
-    # 2. Indian Stocks (NSE/BSE) - BYPASS FOR SIMULATOR
-    # We allow trading 24/7 so you can test the app anytime.
-    # If you want strict rules, uncomment the lines below:
-    
-    """
-    if symbol.upper().endswith(".NS") or symbol.upper().endswith(".BO"):
-        utc_now = datetime.now(timezone.utc)
-        ist_now = utc_now + timedelta(hours=5, minutes=30)
-        
-        if ist_now.weekday() >= 5: # Saturday/Sunday
-             raise HTTPException(status_code=400, detail="Market Closed: Weekend")
-
-        current_time = ist_now.time()
-        market_open = time(9, 15)
-        market_close = time(15, 30)
-
-        if not (market_open <= current_time <= market_close):
-             raise HTTPException(status_code=400, detail="Market Closed: 09:15 - 15:30 IST")
-    """
-    
+    reason = closed_reason(symbol)
+    if reason:
+        raise HTTPException(status_code=400, detail=f"Market Closed: {reason}")
     return True
 
 def _seed_initial_history(balance: float) -> List[PortfolioHistoryItem]:
@@ -115,13 +99,13 @@ async def buy_investment(
     if investment.symbol in SIMULATED_MF_IDS:
         live_price_original = get_simulated_nav(investment.symbol)
     else:
-        stock_data = fetch_stock_data(investment.symbol)
+        stock_data = await market_service.get_stock_quote(investment.symbol)
         if stock_data.get("error"): raise HTTPException(status_code=400, detail=f"Could not fetch data for {investment.symbol}")
         stock_currency = stock_data.get("currency", "USD")
         live_price_original = stock_data.get("close")
         
         if stock_currency != "INR":
-            rate = get_exchange_rate(stock_currency, "INR")
+            rate = await market_service.get_exchange_rate(stock_currency, "INR")
             if rate is None: raise HTTPException(status_code=500, detail=f"Could not get exchange rate for {stock_currency}/INR")
 
     if not live_price_original:
@@ -154,6 +138,7 @@ async def buy_investment(
         {"user_id": user_id}, 
         {"$push": {"investments": investment.dict()}}
     )
+    symbol_registry.add(investment.symbol)
     
     transaction = Transaction(
         user_id=user_id, 
@@ -208,11 +193,13 @@ async def sell_investment(user_id: str, sell_request: SellRequest):
         stock_currency = "INR"
     else:
         try:
-            live_data = fetch_stock_data(symbol_to_sell)
+            live_data = await market_service.get_stock_quote(symbol_to_sell)
             if live_data.get("error"): raise ValueError(live_data.get("error"))
             live_price = live_data.get("close")
             stock_currency = live_data.get("currency", "USD")
             if live_price is None or live_price <= 0: raise ValueError("Live price is invalid or zero.")
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Could not fetch live price for {symbol_to_sell}: {e}")
 
@@ -220,7 +207,7 @@ async def sell_investment(user_id: str, sell_request: SellRequest):
     sale_value_inr = total_sale_value_original
     rate = 1.0
     if stock_currency != "INR":
-        rate = get_exchange_rate(stock_currency, "INR")
+        rate = await market_service.get_exchange_rate(stock_currency, "INR")
         if rate is None: raise HTTPException(status_code=500, detail="Could not get exchange rate")
         sale_value_inr = total_sale_value_original * rate
 
@@ -229,6 +216,7 @@ async def sell_investment(user_id: str, sell_request: SellRequest):
 
     remaining_qty_to_sell = qty_to_sell
     updated_investments = [inv for inv in portfolio.investments if inv.symbol.upper() != symbol_to_sell]
+    lots_closed = 0
     
     for holding in holdings_for_symbol:
         if remaining_qty_to_sell <= 0:
@@ -241,11 +229,13 @@ async def sell_investment(user_id: str, sell_request: SellRequest):
             updated_investments.append(holding)
         else:
             remaining_qty_to_sell -= holding.quantity
+            lots_closed += 1
 
     await portfolio_collection.update_one(
         {"user_id": user_id},
         {"$set": {"investments": [inv.dict() for inv in updated_investments]}}
     )
+    symbol_registry.remove(symbol_to_sell, lots_closed)
 
     await users_collection.update_one({"_id": ObjectId(user_id)}, {"$inc": {"balance": net_payout}})
     
@@ -299,33 +289,14 @@ async def get_live_portfolio_value(user_id: str):
         await _try_snapshot_history(user_id, portfolio_db, total_val, 0.0, total_val)
         return {"user_id": user_id, "cash_balance_inr": user_doc["balance"], "total_investment_value_inr": 0.0, "total_portfolio_value_inr": total_val, "investment_details": {}, "errors": [], "history": portfolio_db.history}
 
+    # Served from the live price cache; only missing/stale symbols hit the provider, in one batch
     symbols_to_fetch = {inv.symbol for inv in investments if inv.symbol not in SIMULATED_MF_IDS}
-    live_prices_data = {}
-    if symbols_to_fetch:
-        tickers_str = " ".join(symbols_to_fetch)
-        tickers = yf.Tickers(tickers_str)
-        for symbol in symbols_to_fetch:
-            try:
-                ticker_obj = tickers.tickers.get(symbol.upper())
-                if not ticker_obj: continue
-                try:
-                    price = ticker_obj.fast_info.last_price
-                    currency = "USD" 
-                except:
-                    info = ticker_obj.info
-                    price = info.get("currentPrice") or info.get("regularMarketPrice")
-                    currency = info.get("currency", "USD")
-
-                if price:
-                    is_indian = symbol.upper().endswith(".NS") or symbol.upper().endswith(".BO")
-                    curr = "INR" if is_indian else "USD"
-                    live_prices_data[symbol] = {"price": price, "currency": curr}
-            except Exception as e:
-                print(f"Could not fetch bulk info for {symbol}: {e}")
+    live_prices_data = await get_prices(symbols_to_fetch) if symbols_to_fetch else {}
+    fetch_errors = []
+    price_ages = {sym: data["age_seconds"] for sym, data in live_prices_data.items()}
 
     total_investment_value_inr = 0.0
     investment_details = {}
-    fetch_errors = []
 
     for investment in investments:
         value_inr = 0
@@ -335,7 +306,7 @@ async def get_live_portfolio_value(user_id: str):
             live_nav = get_simulated_nav(investment.symbol)
             value_inr = (investment.quantity * live_nav) if live_nav else buy_cost_fallback
         else:
-            live_data = live_prices_data.get(investment.symbol)
+            live_data = live_prices_data.get(investment.symbol.upper())
             if not live_data:
                 fetch_errors.append(f"Could not fetch price for {investment.symbol}")
                 value_inr = buy_cost_fallback
@@ -346,7 +317,7 @@ async def get_live_portfolio_value(user_id: str):
                 value_inr = value_original_currency
 
                 if stock_currency != "INR":
-                    rate = get_exchange_rate(stock_currency, "INR")
+                    rate = await market_service.get_exchange_rate(stock_currency, "INR")
                     if rate:
                         value_inr = value_original_currency * rate
                     else:
@@ -355,6 +326,8 @@ async def get_live_portfolio_value(user_id: str):
 
         total_investment_value_inr += value_inr
         investment_details[investment.id] = {"live_value_inr": round(value_inr, 2)}
+        if investment.symbol.upper() in price_ages:
+            investment_details[investment.id]["price_age_seconds"] = price_ages[investment.symbol.upper()]
 
     total_portfolio_value_inr = user_doc["balance"] + total_investment_value_inr
 
@@ -367,6 +340,7 @@ async def get_live_portfolio_value(user_id: str):
         "total_portfolio_value_inr": round(total_portfolio_value_inr, 2),
         "investment_details": investment_details,
         "errors": fetch_errors,
+        "price_ages": price_ages,
         "history": portfolio_db.history 
     }
 
@@ -400,11 +374,15 @@ async def add_to_watchlist(user_id: str, stock: Dict[str, str]):
     if not symbol: raise HTTPException(status_code=400, detail="Stock symbol is required")
     result = await users_collection.update_one({"_id": ObjectId(user_id)}, {"$addToSet": {"watchlist": symbol.upper()}})
     if result.matched_count == 0: raise HTTPException(status_code=404, detail="User not found")
+    if result.modified_count > 0:
+        symbol_registry.add(symbol)
     return {"message": f"{symbol.upper()} added to watchlist"}
 
 @router.delete("/watchlist/{user_id}/{symbol}")
 async def remove_from_watchlist(user_id: str, symbol: str):
     result = await users_collection.update_one({"_id": ObjectId(user_id)}, {"$pull": {"watchlist": symbol.upper()}})
+    if result.modified_count > 0:
+        symbol_registry.remove(symbol)
     if result.modified_count == 0: 
         user_exists = await users_collection.count_documents({"_id": ObjectId(user_id)}) > 0
         if not user_exists:
@@ -1,59 +1,48 @@
 # backend/routes/stocks.py
-import pandas as pd
-import yfinance as yf
-import requests
-import asyncio
-import random
+import numpy as np
 from datetime import datetime, timedelta
+from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
-from utils.fetch_data import fetch_stock_data
+from fastapi.responses import JSONResponse, Response
+from config import SYMBOL_SEARCH_REMOTE_FALLBACK
+from utils import market_service
 from utils.calculate import calculate_future_value
-from utils.simulate_nav import SIMULATED_FUNDS_DATA, get_simulated_nav
+from utils.downsample import lttb_indices, ohlc_buckets
+from utils.history_store import start_for_period
+from utils.market_snapshot import market_snapshot
+from utils.simulate_nav import SIMULATED_FUNDS_DATA, get_simulated_nav, nav_engine
+from utils.symbol_search import exchange_of, symbol_search
+from utils.tick_store import tick_store, BAR_INTERVALS
 
 router = APIRouter()
 
-# --- CONFIGURATION ---
-# A basket of popular stocks to scan for "Top Movers" (Simulating a market scan)
-POPULAR_TICKERS = [
-    "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "ICICIBANK.NS",
-    "TATAMOTORS.NS", "SBIN.NS", "BAJFINANCE.NS", "ITC.NS", "WIPRO.NS",
-    "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX"
-]
-
-# Major Indices to track - EXPANDED LIST
-INDICES = {
-    "^NSEI": "Nifty 50",
-    "^BSESN": "Sensex",
-    "^GSPC": "S&P 500",
-    "^IXIC": "Nasdaq 100",   # Added Tech
-    "BTC-USD": "Bitcoin",
-    "ETH-USD": "Ethereum",   # Added Crypto
-    "GC=F": "Gold",
-    "CL=F": "Crude Oil",     # Added Commodities
-    "INR=X": "USD/INR"       # Added Currency
-}
-
 # --- ROUTES ---
 
+SEARCH_LIMIT = 7
+
+
 @router.get("/search")
 async def search_symbols(query: str = Query(..., min_length=1, description="Search query for stock symbols")):
     """
-    Searches for stock symbols matching the query using Yahoo Finance's API.
+    Searches stocks, ETFs and simulated mutual funds by symbol or company name in the
+    local symbol index (prefix and typo-tolerant matching). The market data provider's
+    search is only asked when nothing matches locally.
     """
     if not query:
         return []
 
-    url = f"https://query1.finance.yahoo.com/v1/finance/search?q={query}"
-    headers = {'User-Agent': 'Mozilla/5.0'}
+    suggestions = [
+        {"symbol": e["symbol"], "name": e["name"], "exchange": e["exchange"], "type": e["type"]}
+        for e in symbol_search.search(query, limit=SEARCH_LIMIT)
+    ]
+    if suggestions or not SYMBOL_SEARCH_REMOTE_FALLBACK:
+        return suggestions
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("quotes", [])
+        symbol_search.record_fallback()
+        results = await market_service.search(query)
 
-        suggestions = []
         for result in results:
             symbol = result.get("symbol")
             name = result.get("longname") or result.get("shortname")
@@ -62,11 +51,14 @@ async def search_symbols(query: str = Query(..., min_length=1, description="Sear
             # Filter to ensure we only get Stocks or ETFs
             if symbol and name and (quote_type == "EQUITY" or quote_type == "ETF"):
                 suggestions.append({
-                    "symbol": symbol,
-                    "name": name
+                    "symbol": symbol.upper(),
+                    "name": name,
+                    "exchange": exchange_of(symbol.upper()),
+                    "type": quote_type
                 })
 
-        return suggestions[:7]
+        symbol_search.learn(suggestions)
+        return suggestions[:SEARCH_LIMIT]
 
     except Exception as e:
         print(f"Error searching stocks: {e}")
@@ -86,6 +78,7 @@ async def get_stock_price(symbol: str = Query(..., description="Stock symbol")):
         try:
             fund_info = SIMULATED_FUNDS_DATA[upper_symbol]
             nav = get_simulated_nav(upper_symbol) or fund_info["baseNav"]
+            _, year_navs = nav_engine().history(upper_symbol, start=start_for_period("1y"))
             
             # Construct a response that looks exactly like real stock data
             # so the frontend (StockDetails.js) can render it without errors.
@@ -101,8 +94,8 @@ async def get_stock_price(symbol: str = Query(..., description="Stock symbol")):
                 "market_cap": None,
                 "pe_ratio": None,
                 "dividend_yield": None,
-                "week_52_high": nav * 1.15,
-                "week_52_low": nav * 0.85,
+                "week_52_high": round(float(year_navs.max()), 2),
+                "week_52_low": round(float(year_navs.min()), 2),
                 "recommendation": "BUY",
                 "description": fund_info.get("category", "Mutual Fund")
             }
@@ -112,7 +105,7 @@ async def get_stock_price(symbol: str = Query(..., description="Stock symbol")):
 
     # 2. FETCH REAL STOCK DATA
     try:
-        data = fetch_stock_data(symbol)
+        data = await market_service.get_stock_data(symbol)
 
         if data.get("error"):
             raise HTTPException(status_code=404, detail=data["error"])
@@ -129,79 +122,19 @@ async def get_stock_price(symbol: str = Query(..., description="Stock symbol")):
 @router.get("/market-summary")
 async def get_market_summary():
     """
-    Fetches live data for major global indices.
+    Live data for major global indices, served from the background market snapshot.
     """
-    try:
-        tickers = list(INDICES.keys())
-        # Fetch all indices in parallel using threads
-        data = await asyncio.to_thread(yf.download, tickers, period="1d", group_by='ticker', progress=False, threads=True)
-        
-        summary = []
-        for ticker, name in INDICES.items():
-            try:
-                if ticker in data.columns.levels[0]:
-                    df = data[ticker]
-                else:
-                    continue 
-                
-                if not df.empty and 'Close' in df.columns:
-                    close = float(df['Close'].iloc[-1])
-                    prev_close = float(df['Open'].iloc[-1])
-                    if pd.isna(prev_close): prev_close = close
-                    
-                    if pd.notna(close) and pd.notna(prev_close) and prev_close != 0:
-                        change = ((close - prev_close) / prev_close) * 100
-                        summary.append({
-                            "symbol": ticker,
-                            "name": name,
-                            "price": close,
-                            "change_percent": change
-                        })
-            except Exception:
-                continue
-                
-        return summary
-    except Exception as e:
-        print(f"Market summary error: {e}")
-        return []
+    snapshot = await market_snapshot.current()
+    return Response(content=snapshot.summary, media_type="application/json")
 
 
 @router.get("/top-movers")
 async def get_top_movers():
     """
-    Scans popular tickers to find top gainers and losers of the day.
+    Top gainers and losers of the day among popular tickers, served from the background market snapshot.
     """
-    try:
-        data = await asyncio.to_thread(yf.download, POPULAR_TICKERS, period="1d", group_by='ticker', progress=False, threads=True)
-        
-        movers = []
-        for symbol in POPULAR_TICKERS:
-            try:
-                if symbol in data.columns.levels[0]:
-                    df = data[symbol]
-                    if not df.empty and 'Close' in df.columns and 'Open' in df.columns:
-                        close = float(df['Close'].iloc[-1])
-                        open_price = float(df['Open'].iloc[-1])
-                        
-                        if pd.notna(close) and pd.notna(open_price) and open_price != 0:
-                            change = ((close - open_price) / open_price) * 100
-                            movers.append({
-                                "symbol": symbol,
-                                "price": close,
-                                "change": change
-                            })
-            except: continue
-            
-        # Sort by change %
-        movers.sort(key=lambda x: x["change"], reverse=True)
-        
-        return {
-            "gainers": movers[:3], # Top 3
-            "losers": movers[-3:]  # Bottom 3
-        }
-    except Exception as e:
-        print(f"Top movers error: {e}")
-        return {"gainers": [], "losers": []}
+    snapshot = await market_snapshot.current()
+    return Response(content=snapshot.movers, media_type="application/json")
 
 
 @router.get("/projection")
@@ -225,64 +158,93 @@ async def projection(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/intraday/{symbol}")
+async def get_intraday(
+    symbol: str,
+    interval: str = Query("1m", description="Bar size: 1m, 5m, or 'tick' for raw (time, value) points"),
+    minutes: int = Query(390, ge=1, le=1440, description="How far back to look"),
+):
+    """
+    Intraday bars or sparkline points from the live price ring buffers.
+    Served entirely from memory: symbols nobody holds or watches have no ticks yet,
+    and return an empty list until the price updater starts tracking them.
+    """
+    upper_symbol = symbol.upper()
+    if interval != "tick" and interval not in BAR_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval: {interval}")
+
+    since = datetime.now().timestamp() - minutes * 60
+    if interval == "tick":
+        return tick_store.ticks(upper_symbol, since=since)
+    return tick_store.bars(upper_symbol, interval, since=since)
+
+
+HISTORY_FORMATS = ("records", "columnar")
+HISTORY_MODES = ("candles", "line")
+OHLC_FIELDS = ("open", "high", "low", "close")
+
+
+def ohlc_response(dates, open_, high, low, close, fmt: str = "records",
+                  max_points: Optional[int] = None, mode: str = "candles") -> JSONResponse:
+    """
+    Daily OHLC arrays -> chart payload, built column-wise. "records" is the
+    Lightweight Charts shape ([{time, open, high, low, close}, ...]); "columnar"
+    is parallel arrays, which is much smaller for multi-year ranges.
+    mode="line" returns only (time, value) closes. With `max_points`, candles are
+    merged into OHLC buckets and lines are thinned with LTTB.
+    Bars with a missing price are dropped. Returned as a JSONResponse so FastAPI
+    doesn't walk every value through jsonable_encoder.
+    `dates` may be a tz-aware DatetimeIndex (provider history); bars keep their exchange-local date.
+    """
+    if getattr(dates, "tz", None) is not None:
+        # .values would be UTC, moving every .NS/.BO bar to the previous day
+        dates = dates.tz_localize(None)
+    columns = [np.asarray(c, dtype=np.float64) for c in (open_, high, low, close)]
+    valid = ~np.isnan(np.vstack(columns)).any(axis=0)
+    dates = np.asarray(dates, dtype="datetime64[D]")[valid]
+    columns = [c[valid] for c in columns]
+
+    if mode == "line":
+        fields, columns = ("value",), [columns[3]]
+        if max_points:
+            keep = lttb_indices(dates.astype(np.int64), columns[0], max_points)
+            dates, columns = dates[keep], [columns[0][keep]]
+    else:
+        fields = OHLC_FIELDS
+        if max_points:
+            dates, *columns = ohlc_buckets(dates, *columns, max_points)
+
+    times = np.datetime_as_string(dates, unit="D").tolist()
+    values = [c.tolist() for c in columns]
+    if fmt == "columnar":
+        return JSONResponse({"time": times, **dict(zip(fields, values))})
+    return JSONResponse([dict(zip(("time", *fields), row)) for row in zip(times, *values)])
+
+
 @router.get("/history/{symbol}")
-async def get_stock_history(symbol: str, period: str = "1y"):
+async def get_stock_history(
+    symbol: str,
+    period: str = "1y",
+    format: str = Query("records", description="'records' (one object per bar) or 'columnar' (parallel arrays)"),
+    max_points: Optional[int] = Query(None, ge=3, le=5000, description="Downsample to at most this many points"),
+    mode: str = Query("candles", description="'candles' (OHLC) or 'line' (close only, as value)"),
+):
     """
     Fetches historical stock data in OHLC format for Candlestick charts.
     Handles Simulated Mutual Funds by generating a synthetic history.
     """
     upper_symbol = symbol.upper()
+    if format not in HISTORY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if mode not in HISTORY_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}")
 
     # 1. SIMULATED HISTORY FOR MUTUAL FUNDS
     if upper_symbol in SIMULATED_FUNDS_DATA:
         try:
-            current_nav = get_simulated_nav(upper_symbol) or SIMULATED_FUNDS_DATA[upper_symbol]["baseNav"]
-            
-            # Generate synthetic history walking backwards from current NAV
-            # This creates a realistic-looking "random walk" chart
-            records = []
-            current_sim_price = current_nav
-            today = datetime.now()
-            
-            # Determine days based on period
-            days_to_generate = 30
-            if period == '3mo': days_to_generate = 90
-            elif period == '6mo': days_to_generate = 180
-            elif period == '1y': days_to_generate = 365
-            elif period == '2y': days_to_generate = 730
-            elif period == '5y': days_to_generate = 1825
-
-            # We generate prices in reverse (Today -> Past) then flip the list
-            price_series = [current_sim_price]
-            for _ in range(days_to_generate):
-                # Random daily fluctuation between -1.5% and +1.5%
-                change = random.uniform(-0.015, 0.015) 
-                # Calculate previous day's price
-                prev_price = price_series[-1] / (1 + change)
-                price_series.append(prev_price)
-            
-            # Reverse to be Chronological (Past -> Today)
-            price_series.reverse()
-            start_date = today - timedelta(days=len(price_series))
-
-            for i, price in enumerate(price_series):
-                # Create fake High/Low/Open for the candlestick effect
-                volatility = price * 0.008 # 0.8% intra-day movement
-                
-                open_p = price + random.uniform(-volatility, volatility)
-                close_p = price
-                high_p = max(open_p, close_p) + random.uniform(0, volatility)
-                low_p = min(open_p, close_p) - random.uniform(0, volatility)
-
-                records.append({
-                    "time": (start_date + timedelta(days=i)).strftime('%Y-%m-%d'),
-                    "open": round(open_p, 2),
-                    "high": round(high_p, 2),
-                    "low": round(low_p, 2),
-                    "close": round(close_p, 2)
-                })
-            
-            return records
+            # Slice of the fund's deterministic NAV path, so the chart is stable across reloads
+            dates, *ohlc = nav_engine().candles(upper_symbol, start=start_for_period(period))
+            return ohlc_response(dates, *np.round(ohlc, 2), fmt=format, max_points=max_points, mode=mode)
 
         except Exception as e:
             print(f"Error generating simulated history for {upper_symbol}: {e}")
@@ -290,32 +252,22 @@ async def get_stock_history(symbol: str, period: str = "1y"):
 
     # 2. REAL HISTORY FOR STOCKS
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period)
+        hist = await market_service.get_history(symbol, period=period)
 
         if hist.empty:
             # Fallback: Try with .NS suffix for Indian stocks
             if not symbol.upper().endswith(".NS") and not symbol.upper().endswith(".BO"):
-                 ticker = yf.Ticker(f"{symbol}.NS")
-                 hist = ticker.history(period=period)
+                 hist = await market_service.get_history(f"{symbol}.NS", period=period)
 
         if hist.empty:
              raise HTTPException(status_code=404, detail=f"No historical data found for {symbol}.")
 
-        hist.reset_index(inplace=True)
-
         # Format specifically for Lightweight Charts (time, open, high, low, close)
-        records = []
-        for index, row in hist.iterrows():
-            records.append({
-                "time": row['Date'].strftime('%Y-%m-%d'),
-                "open": row['Open'],
-                "high": row['High'],
-                "low": row['Low'],
-                "close": row['Close']
-            })
-        
-        return records
+        return ohlc_response(
+            hist.index, hist['Open'].to_numpy(), hist['High'].to_numpy(),
+            hist['Low'].to_numpy(), hist['Close'].to_numpy(),
+            fmt=format, max_points=max_points, mode=mode,
+        )
 
     except HTTPException as http_exc:
         raise http_exc
@@ -330,14 +282,12 @@ async def run_backtest(symbol: str, years: int = 5, amount: float = 100000):
     Time Machine Feature: Calculates past performance of an investment.
     """
     try:
-        ticker = yf.Ticker(symbol)
         start_date = (datetime.now() - timedelta(days=years*365 + 30)).strftime('%Y-%m-%d')
-        hist = ticker.history(start=start_date)
+        hist = await market_service.get_history(symbol, start=start_date)
         
         if hist.empty:
              if not symbol.endswith(".NS"):
-                 ticker = yf.Ticker(f"{symbol}.NS")
-                 hist = ticker.history(start=start_date)
+                 hist = await market_service.get_history(f"{symbol}.NS", start=start_date)
         
         if hist.empty or len(hist) < 2:
             raise HTTPException(status_code=404, detail="Not enough historical data for this stock.")
@@ -367,6 +317,8 @@ async def run_backtest(symbol: str, years: int = 5, amount: float = 100000):
                 "gold": round(gold_value, 2)
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Backtest error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,154 @@
+# backend/tests/test_cache.py
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import cache
+from utils.cache import SingleFlight, TTLCache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+class InlineExecutor:
+    """Runs background refreshes immediately so their effect can be asserted."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn):
+        self.submitted += 1
+        fn()
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = InlineExecutor()
+    monkeypatch.setattr(cache, "_refresh_executor", executor)
+    return executor
+
+
+def test_entries_expire_after_ttl(clock):
+    c = TTLCache("test_ttl", ttl=10)
+    c.set("a", 1)
+    clock.now += 9.9
+    assert c.get("a") == 1
+    clock.now += 0.2
+    assert c.get("a") is None
+    assert "a" not in c
+    assert c.stats()["expirations"] == 1
+
+
+def test_lru_eviction_by_entry_count(clock):
+    c = TTLCache("test_lru", ttl=60, max_entries=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1          # "b" is now least recently used
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_oldest_first(clock):
+    value = "x" * 1000
+    size = cache.estimate_size(value)
+    c = TTLCache("test_bytes", ttl=60, max_entries=100, max_bytes=int(size * 2.5))
+    for key in ("a", "b", "c"):
+        c.set(key, value)
+    assert len(c) == 2
+    assert c.get("a") is None and c.get("c") == value
+    assert c.stats()["bytes"] <= c.max_bytes
+
+
+def test_replacing_a_key_keeps_the_byte_count_exact(clock):
+    c = TTLCache("test_replace", ttl=60)
+    c.set("a", "x" * 100)
+    c.set("a", "y")
+    assert c.stats()["bytes"] == cache.estimate_size("y")
+    c.pop("a")
+    assert c.stats()["bytes"] == 0
+
+
+def test_backdated_entries_expire_on_their_original_schedule(clock):
+    c = TTLCache("test_backdate", ttl=10)
+    c.set("old", 1, stored_at=clock.now - 20)
+    assert len(c) == 0
+    c.set("recent", 2, stored_at=clock.now - 5)
+    clock.now += 5.1
+    assert c.get("recent") is None
+
+
+def test_stale_entry_is_served_and_revalidated_in_background(clock, executor):
+    c = TTLCache("test_swr", ttl=10, grace=30)
+    loads = []
+
+    def loader():
+        loads.append(clock.now)
+        return len(loads)
+
+    assert c.get_or_load_entry("k", loader) == (1, 0.0, False)
+    clock.now += 15                                     # past TTL, inside grace
+    entry = c.get_or_load_entry("k", loader)
+    assert entry.value == 1 and entry.stale and entry.age_seconds == 15
+    assert executor.submitted == 1 and len(loads) == 2
+    entry = c.get_or_load_entry("k", loader)            # refreshed value is fresh again
+    assert entry == (2, 0.0, False)
+    assert c.stats()["stale_hits"] == 1
+
+
+def test_past_hard_expiry_the_caller_waits_for_the_loader(clock, executor):
+    c = TTLCache("test_hard_expiry", ttl=10, grace=30)
+    c.get_or_load("k", lambda: "first")
+    clock.now += 41
+    entry = c.get_or_load_entry("k", lambda: "second")
+    assert entry == ("second", 0.0, False)
+    assert executor.submitted == 0
+
+
+def test_results_failing_cache_if_are_not_stored(clock):
+    c = TTLCache("test_cache_if", ttl=10)
+    assert c.get_or_load("k", lambda: {"error": "x"}, cache_if=lambda v: not v.get("error")) == {"error": "x"}
+    assert "k" not in c
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    deadline = time.monotonic() + 5
+    while flight.shared < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+    assert results == ["value"] * 4
+    assert len(calls) == 1 and flight.loads == 1 and flight.shared == 3
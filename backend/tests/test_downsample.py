@@ -0,0 +1,65 @@
+# backend/tests/test_downsample.py
+import numpy as np
+
+from utils.downsample import bucket_starts, lttb_indices, ohlc_buckets
+
+
+def _bars(n: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[:1], close[:-1]]
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    dates = np.arange(n).astype("datetime64[D]")
+    return dates, open_, high, low, close
+
+
+def test_bucket_starts_cover_every_point_once():
+    for n, m in [(10, 10), (10, 3), (1000, 7), (1001, 1000), (5, 100)]:
+        starts = bucket_starts(n, m)
+        assert starts[0] == 0
+        assert len(starts) == min(n, m)
+        assert np.all(np.diff(starts) > 0) and starts[-1] < n
+
+
+def test_short_series_are_returned_unchanged():
+    bars = _bars(50)
+    out = ohlc_buckets(*bars, max_points=50)
+    assert all(a is b for a, b in zip(out, bars))
+    assert np.array_equal(lttb_indices(bars[0].astype(np.int64), bars[4], 50), np.arange(50))
+
+
+def test_ohlc_buckets_keep_extremes_and_endpoints():
+    dates, open_, high, low, close = _bars(1000)
+    d, o, h, l, c = ohlc_buckets(dates, open_, high, low, close, max_points=37)
+    assert len(d) == 37
+    assert d[0] == dates[0] and o[0] == open_[0] and c[-1] == close[-1]
+    assert h.max() == high.max() and l.min() == low.min()
+    starts = bucket_starts(1000, 37)
+    ends = np.r_[starts[1:], 1000]
+    for i, (lo, hi) in enumerate(zip(starts, ends)):
+        assert d[i] == dates[lo] and o[i] == open_[lo] and c[i] == close[hi - 1]
+        assert h[i] == high[lo:hi].max() and l[i] == low[lo:hi].min()
+
+
+def test_ohlc_buckets_with_one_bar_per_bucket_boundary():
+    dates, open_, high, low, close = _bars(4)
+    d, o, h, l, c = ohlc_buckets(dates, open_, high, low, close, max_points=3)
+    assert len(d) == 3
+    assert c[-1] == close[-1] and h.max() == high.max()
+
+
+def test_lttb_keeps_first_last_and_spikes():
+    n = 2000
+    x = np.arange(n, dtype=np.float64)
+    y = np.zeros(n)
+    y[777], y[1500] = 50.0, -40.0
+    keep = lttb_indices(x, y, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+    assert 777 in keep and 1500 in keep
+
+
+def test_lttb_below_three_points_is_a_no_op():
+    assert np.array_equal(lttb_indices(np.arange(10.0), np.arange(10.0), 2), np.arange(10))
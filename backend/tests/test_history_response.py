@@ -0,0 +1,34 @@
+# backend/tests/test_history_response.py
+import json
+
+import numpy as np
+import pandas as pd
+
+from routes.stocks import ohlc_response
+
+
+def _body(response):
+    return json.loads(response.body)
+
+
+def test_tz_aware_index_keeps_exchange_local_dates():
+    # Provider history for .NS symbols is stamped at local midnight, i.e. the previous day in UTC
+    index = pd.DatetimeIndex(["2024-01-01", "2024-01-02", "2024-01-03"]).tz_localize("Asia/Kolkata")
+    prices = np.array([100.0, 101.0, 102.0])
+    body = _body(ohlc_response(index, prices, prices + 1, prices - 1, prices, fmt="columnar"))
+    assert body["time"] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert body["close"] == [100.0, 101.0, 102.0]
+
+
+def test_tz_aware_index_in_line_mode():
+    index = pd.DatetimeIndex(["2024-03-04 00:00", "2024-03-05 00:00"]).tz_localize("America/New_York")
+    prices = np.array([10.0, 11.0])
+    body = _body(ohlc_response(index, prices, prices, prices, prices, mode="line"))
+    assert body == [{"time": "2024-03-04", "value": 10.0}, {"time": "2024-03-05", "value": 11.0}]
+
+
+def test_bars_with_missing_prices_are_dropped():
+    dates = np.array(["2024-01-01", "2024-01-02", "2024-01-03"], dtype="datetime64[D]")
+    close = np.array([1.0, np.nan, 3.0])
+    body = _body(ohlc_response(dates, close, close, close, close))
+    assert [bar["time"] for bar in body] == ["2024-01-01", "2024-01-03"]
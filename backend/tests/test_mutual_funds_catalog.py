@@ -0,0 +1,19 @@
+# backend/tests/test_mutual_funds_catalog.py
+from routes.mutual_funds import etag_matches
+
+ETAG = '"0123456789abcdef0123456789abcdef"'
+
+
+def test_exact_and_weak_tags_match():
+    assert etag_matches(ETAG, ETAG)
+    assert etag_matches(f"W/{ETAG}", ETAG)
+    assert etag_matches(f'"other", {ETAG}', ETAG)
+    assert etag_matches("*", ETAG)
+
+
+def test_partial_or_missing_tags_do_not_match():
+    assert not etag_matches("", ETAG)
+    assert not etag_matches('"0123456789abcdef"', ETAG)
+    assert not etag_matches('"0"', ETAG)
+    assert not etag_matches(f'"x{ETAG[1:-1]}x"', ETAG)
+    assert not etag_matches('"', ETAG)
@@ -0,0 +1,39 @@
+# backend/tests/test_price_bus.py
+import asyncio
+import os
+import tempfile
+
+from utils.price_bus import UnixSocketBus
+
+
+def test_follower_receives_snapshot_larger_than_default_stream_limit():
+    async def scenario(tmp):
+        leader = UnixSocketBus(os.path.join(tmp, "bus.sock"), os.path.join(tmp, "bus.lock"))
+        symbols = [f"SYM{i:05d}.NS" for i in range(5000)]
+        prices = {sym: 1000.0 + i / 7 for i, sym in enumerate(symbols)}
+        updated_at = {sym: 1760000000.123456 for sym in symbols}
+        leader.snapshot_provider = lambda: {"prices": prices, "updated_at": updated_at}
+        assert leader.try_become_leader()
+        await leader.serve()
+
+        follower = UnixSocketBus(leader.socket_path, leader.election.lock_path)
+        stream = follower.consume()
+        try:
+            message = await asyncio.wait_for(stream.__anext__(), timeout=5)
+            # The follower's interest report travels the other way over the same socket
+            await follower.send_interest({sym: 1 for sym in symbols})
+            for _ in range(50):
+                if len(leader.remote_interest()) == len(symbols):
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await stream.aclose()
+            await leader.close()
+        return message, leader.remote_interest()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        message, interest = asyncio.run(scenario(tmp))
+    assert message["type"] == "snapshot"
+    assert len(message["prices"]) == 5000
+    assert message["prices"]["SYM04999.NS"] == 1000.0 + 4999 / 7
+    assert len(interest) == 5000
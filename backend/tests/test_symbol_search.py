@@ -0,0 +1,113 @@
+# backend/tests/test_symbol_search.py
+import os
+
+import pytest
+
+from utils import symbol_search as search_module
+from utils.symbol_search import SymbolIndex, SymbolSearch, _edit_distance
+
+ENTRIES = [
+    {"symbol": "RELIANCE.NS", "name": "Reliance Industries Ltd", "exchange": "NSE", "type": "EQUITY"},
+    {"symbol": "TATASTEEL.NS", "name": "Tata Steel Ltd", "exchange": "NSE", "type": "EQUITY"},
+    {"symbol": "TATAMOTORS.NS", "name": "Tata Motors Ltd", "exchange": "NSE", "type": "EQUITY"},
+    {"symbol": "MSFT", "name": "Microsoft Corporation", "exchange": "US", "type": "EQUITY"},
+    {"symbol": "MS", "name": "Morgan Stanley", "exchange": "US", "type": "EQUITY"},
+    {"symbol": "BTC-USD", "name": "Bitcoin USD", "exchange": "CRYPTO", "type": "EQUITY"},
+    {"symbol": "TATA-SMALL", "name": "Tata Small Cap Fund", "exchange": "MF", "type": "MUTUALFUND"},
+]
+
+
+def symbols(results):
+    return [entry["symbol"] for entry in results]
+
+
+@pytest.fixture
+def index():
+    return SymbolIndex(ENTRIES)
+
+
+def test_edit_distance_with_limit():
+    assert _edit_distance("relaince", "reliance", 2) == 2
+    assert _edit_distance("kitten", "sitting", 3) == 3
+    assert _edit_distance("kitten", "sitting", 1) == 2      # gave up past the limit
+    assert _edit_distance("abc", "abcdef", 1) == 2
+
+
+def test_exact_symbol_ranks_before_prefix_matches(index):
+    assert symbols(index.search("ms")) == ["MS", "MSFT"]
+    assert symbols(index.search("MSFT"))[0] == "MSFT"
+
+
+def test_exchange_suffix_and_pair_bases_are_searchable(index):
+    assert symbols(index.search("reliance"))[0] == "RELIANCE.NS"
+    assert symbols(index.search("btc")) == ["BTC-USD"]
+
+
+def test_name_word_prefixes_must_all_match(index):
+    assert symbols(index.search("tata st")) == ["TATASTEEL.NS"]
+    assert symbols(index.search("morgan")) == ["MS"]
+    assert index.search("tata bitcoin") == []
+
+
+def test_funds_rank_after_equities_sharing_a_prefix(index):
+    results = symbols(index.search("tata"))
+    assert results[-1] == "TATA-SMALL"
+    assert set(results[:2]) == {"TATASTEEL.NS", "TATAMOTORS.NS"}
+
+
+def test_typos_match_through_the_trigram_index(index):
+    assert symbols(index.search("relaince")) == ["RELIANCE.NS"]
+    assert symbols(index.search("microsft")) == ["MSFT"]
+    assert symbols(index.search("tata stel")) == ["TATASTEEL.NS"]
+
+
+def test_short_queries_are_not_fuzzy(index):
+    assert index.search("tsla") == []
+    assert index.search("") == [] and index.search("  -- ") == []
+
+
+def test_limit(index):
+    assert len(index.search("t", limit=2)) == 2
+
+
+def test_add_and_remove_match_a_fresh_build(index):
+    extra = {"symbol": "VOD.L", "name": "Vodafone Group Plc", "exchange": "US", "type": "EQUITY"}
+    index.add(extra)
+    index.add(dict(extra, name="ignored duplicate"))
+    assert symbols(index.search("vodafon")) == ["VOD.L"]
+    index.remove("TATASTEEL.NS")
+    fresh = SymbolIndex([e for e in ENTRIES if e["symbol"] != "TATASTEEL.NS"] + [extra])
+    for query in ("tata", "vod", "vodafne", "steel", "rel", "ms"):
+        assert symbols(index.search(query)) == symbols(fresh.search(query))
+    assert len(index) == len(fresh)
+
+
+def test_learned_symbols_are_capped_lru(tmp_path, monkeypatch):
+    master = tmp_path / "symbols.csv"
+    master.write_text("symbol,name\nAAPL,Apple Inc\n")
+    monkeypatch.setattr(search_module, "MAX_LEARNED_SYMBOLS", 2)
+    monkeypatch.setattr(search_module, "_fund_entries", lambda: [])
+    search = SymbolSearch(str(master))
+
+    def learned(symbol):
+        return {"symbol": symbol, "name": f"{symbol} Holdings", "exchange": "US", "type": "EQUITY"}
+
+    search.learn([learned("ZZA"), learned("ZZB")])
+    assert symbols(search.search("zza")) == ["ZZA"]        # touch ZZA: ZZB is now the oldest
+    search.learn([learned("ZZC"), learned("AAPL")])        # AAPL is in the master, not learned
+    assert search.stats()["learned"] == 2
+    assert symbols(search.search("zzb")) == []
+    assert symbols(search.search("zz")) == ["ZZA", "ZZC"]
+    assert search.search("aapl")[0]["name"] == "Apple Inc"
+
+
+def test_master_file_changes_are_picked_up(tmp_path, monkeypatch):
+    master = tmp_path / "symbols.csv"
+    master.write_text("symbol,name\nAAPL,Apple Inc\n")
+    monkeypatch.setattr(search_module, "_fund_entries", lambda: [])
+    monkeypatch.setattr(search_module, "RELOAD_CHECK_SECONDS", 0)
+    search = SymbolSearch(str(master))
+    assert symbols(search.search("nvda")) == []
+    master.write_text("symbol,name\nAAPL,Apple Inc\nNVDA,NVIDIA Corporation\n")
+    os.utime(master, (1, 1))
+    assert symbols(search.search("nvidia")) == ["NVDA"]
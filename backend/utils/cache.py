@@ -0,0 +1,283 @@
+# backend/utils/cache.py
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Background revalidation of stale entries; small because each refresh is one provider load
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+# Every TTLCache registers itself here so the admin endpoint can report on all of them
+_caches: Dict[str, "TTLCache"] = {}
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size in bytes of plain data (dicts, lists, strings, numbers)."""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v, _depth + 1) for v in value)
+    return size
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Per-key call coalescing: while a load for `key` is running, other callers
+    block on it and share its result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.loads = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.loads += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    age_seconds: float
+    stale: bool
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL, bounded by entry count and an
+    approximate byte budget. Expired entries are dropped when touched and are
+    the first to go under pressure since they are the least recently used.
+
+    With a `grace` window, an entry past its TTL is stale rather than gone:
+    get_or_load_entry() serves it immediately and refreshes it in the background.
+    Only past expiry + grace (the hard expiry) does a caller wait on the loader.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 1000, max_bytes: Optional[int] = None,
+                 grace: float = 0):
+        self.name = name
+        self.ttl = ttl
+        self.grace = grace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at, size, stored_at)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self._flight = SingleFlight()
+        # Called as on_store(key, value, stored_at) after every set(); used for write-behind persistence
+        self.on_store: Optional[Callable[[Hashable, Any, float], None]] = None
+        _caches[name] = self
+
+    def _entry(self, key: Hashable, now: float) -> Optional[tuple]:
+        """Entry for `key` unless it is past its hard expiry (then it is dropped). Caller holds the lock."""
+        entry = self._data.get(key)
+        if entry is not None and now >= entry[1] + self.grace:
+            del self._data[key]
+            self._bytes -= entry[2]
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Fresh value for `key`; stale entries count as a miss here."""
+        now = time.time()
+        with self._lock:
+            entry = self._entry(key, now)
+            if entry is None or now >= entry[1]:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Read a live entry without touching LRU order or the hit/miss counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.time() >= entry[1]:
+                return default
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, stored_at: Optional[float] = None):
+        """
+        Store `value`. `stored_at` backdates the entry (e.g. when reloading a persisted
+        one) so it expires on its original schedule; such loads are not re-persisted.
+        """
+        size = estimate_size(value)
+        restoring = stored_at is not None
+        stored_at = time.time() if stored_at is None else stored_at
+        expires_at = stored_at + (self.ttl if ttl is None else ttl)
+        if expires_at + self.grace <= time.time():
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (value, expires_at, size, stored_at)
+            self._bytes += size
+            self._evict()
+        if self.on_store is not None and not restoring:
+            self.on_store(key, value, stored_at)
+
+    def _evict(self):
+        now = time.time()
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, expires_at, size, _) = self._data.popitem(last=False)
+            self._bytes -= size
+            if now >= expires_at + self.grace:
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    cache_if: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        """
+        Cached value for `key`, or the result of `loader()`. Concurrent misses on the
+        same key share one loader call. Only results passing `cache_if` are stored.
+        """
+        return self.get_or_load_entry(key, loader, cache_if).value
+
+    def get_or_load_entry(self, key: Hashable, loader: Callable[[], Any],
+                          cache_if: Callable[[Any], bool] = lambda value: value is not None) -> CacheEntry:
+        """
+        Like get_or_load, but returns the value with its age and whether it is stale.
+        A stale entry (past TTL, within grace) is returned at once and revalidated
+        in the background; past the hard expiry the caller waits for the loader.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entry(key, now)
+            if entry is not None:
+                self._data.move_to_end(key)
+                if now < entry[1]:
+                    self.hits += 1
+                    return CacheEntry(entry[0], now - entry[3], False)
+                self.stale_hits += 1
+            else:
+                self.misses += 1
+
+        def load():
+            value = loader()
+            if cache_if(value):
+                self.set(key, value)
+            return value
+
+        if entry is not None:
+            self._revalidate(key, load)
+            return CacheEntry(entry[0], now - entry[3], True)
+        return CacheEntry(self._flight.do(key, load), 0.0, False)
+
+    def _revalidate(self, key: Hashable, load: Callable[[], Any]):
+        if self._flight.in_flight(key):
+            return
+        self.refreshes += 1
+
+        def refresh():
+            try:
+                self._flight.do(key, load)
+            except Exception as e:
+                logger.warning("Background refresh of %s:%s failed: %s", self.name, key, e)
+
+        _refresh_executor.submit(refresh)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[2]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and time.time() < entry[1]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "grace_seconds": self.grace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(served / lookups, 3) if lookups else None,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "loads": self._flight.loads,
+            "coalesced": self._flight.shared,
+        }
+
+
+def cache_stats() -> Dict[str, Dict]:
+    """Stats for every cache created in this process, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -0,0 +1,127 @@
+# backend/utils/cache_store.py
+"""
+Write-behind persistence for TTLCache so a restart doesn't start cold.
+
+Every set() on an attached cache lands in a pending map (last write per key wins);
+a background task flushes it to Mongo in bulk every FLUSH_INTERVAL_SECONDS. On
+startup, unexpired documents are loaded back with their original timestamps, so
+entries keep their remaining TTL instead of getting a fresh one. Mongo's TTL
+index on `expires_at` deletes entries that nobody refreshed.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Tuple
+
+from pymongo import UpdateOne
+
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 5
+MAX_BATCH = 500
+
+
+class CacheStore:
+    def __init__(self, collection):
+        self.collection = collection
+        self.caches: Dict[str, TTLCache] = {}
+        self._pending: Dict[Tuple[str, str], dict] = {}
+        self._lock = threading.Lock()   # set() runs on executor threads
+        self.written = 0
+        self.loaded = 0
+
+    def attach(self, *caches: TTLCache):
+        for cache in caches:
+            self.caches[cache.name] = cache
+            cache.on_store = self._recorder(cache)
+
+    def _recorder(self, cache: TTLCache):
+        def record(key, value, stored_at: float):
+            doc = {
+                "_id": f"{cache.name}:{key}",
+                "cache": cache.name,
+                "key": key,
+                "value": value,
+                "stored_at": stored_at,
+                # Kept through the stale grace window so a restart can still serve-and-refresh
+                "expires_at": datetime.fromtimestamp(stored_at + cache.ttl + cache.grace, tz=timezone.utc),
+            }
+            with self._lock:
+                self._pending[(cache.name, key)] = doc
+        return record
+
+    async def load(self) -> int:
+        """Load every unexpired persisted entry into its cache. Returns the number loaded."""
+        now = datetime.now(timezone.utc)
+        loaded = 0
+        try:
+            cursor = self.collection.find({"cache": {"$in": list(self.caches)}, "expires_at": {"$gt": now}})
+            async for doc in cursor:
+                cache = self.caches.get(doc.get("cache"))
+                if cache is None:
+                    continue
+                cache.set(doc["key"], doc["value"], stored_at=doc["stored_at"])
+                loaded += 1
+        except Exception as e:
+            logger.warning("Could not load persisted cache entries: %s", e)
+        self.loaded += loaded
+        logger.info("Warm-started %d cache entries from %s", loaded, self.collection.name)
+        return loaded
+
+    async def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        docs = list(pending.values())
+        for i in range(0, len(docs), MAX_BATCH):
+            batch = docs[i:i + MAX_BATCH]
+            try:
+                await self.collection.bulk_write(
+                    [UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True) for doc in batch],
+                    ordered=False,
+                )
+                self.written += len(batch)
+            except Exception as e:
+                logger.warning("Cache write-behind failed for %d entries: %s", len(batch), e)
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            await self.flush()
+
+    async def ensure_indexes(self):
+        try:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            await self.collection.create_index("cache")
+        except Exception as e:
+            logger.warning("Could not create market cache indexes: %s", e)
+
+    def stats(self) -> Dict:
+        return {"pending": len(self._pending), "written": self.written, "loaded": self.loaded,
+                "caches": sorted(self.caches)}
+
+
+def _persisted_caches() -> Iterable[TTLCache]:
+    from utils.fetch_data import quote_cache, fundamentals_cache
+    from utils.currency import exchange_rate_cache
+    return quote_cache, fundamentals_cache, exchange_rate_cache
+
+
+cache_store = None
+
+async def start_cache_persistence():
+    """FastAPI startup hook: attach the market data caches, warm them, start the write-behind loop."""
+    global cache_store
+    from database import market_cache_collection
+    cache_store = CacheStore(market_cache_collection)
+    cache_store.attach(*_persisted_caches())
+    await cache_store.ensure_indexes()
+    await cache_store.load()
+    asyncio.create_task(cache_store.flush_loop())
+
+async def stop_cache_persistence():
+    """FastAPI shutdown hook: write out whatever is still pending."""
+    if cache_store is not None:
+        await cache_store.flush()
@@ -1,14 +1,20 @@
 # utils/currency.py
-import yfinance as yf
-import time
+from typing import Optional
+from utils.market_data import get_provider
+from utils.cache import TTLCache
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Cache for exchange rates
-exchange_rate_cache = {}
 CACHE_DURATION_SECONDS = 3600  # Cache for 1 hour
+exchange_rate_cache = TTLCache("exchange_rates", ttl=CACHE_DURATION_SECONDS, max_entries=256)
+
+# Quote currency per symbol. A listing's currency doesn't change, so it is kept for a week
+# and filled by the quote/fundamentals loads in utils/fetch_data.py
+QUOTE_CURRENCY_CACHE_SECONDS = 7 * 24 * 3600
+quote_currency_cache = TTLCache("quote_currencies", ttl=QUOTE_CURRENCY_CACHE_SECONDS, max_entries=5000)
 
 # Fallback rate (Updated to roughly current market rate)
 # This prevents the app from crashing if Yahoo API is down
@@ -16,7 +22,7 @@ DEFAULT_USD_INR_RATE = 84.50
 
 def get_exchange_rate(from_currency: str, to_currency: str) -> float:
     """
-    Fetches the exchange rate between two currencies using yfinance.
+    Fetches the exchange rate between two currencies from the market data provider.
     Returns a float. Uses a fallback if the API fails to prevent transaction crashes.
     """
     # 1. Handle identical currencies
@@ -30,20 +36,21 @@ def get_exchange_rate(from_currency: str, to_currency: str) -> float:
     else:
         pair = f"{from_currency}{to_currency}=X"
 
-    current_time = time.time()
+    # 3. Check Cache; concurrent misses for the same pair share one download
+    rate = exchange_rate_cache.get_or_load(pair, lambda: _load_exchange_rate(pair, from_currency, to_currency))
+    if rate is not None:
+        return rate
 
-    # 3. Check Cache
-    if pair in exchange_rate_cache:
-        rate, timestamp = exchange_rate_cache[pair]
-        if current_time - timestamp < CACHE_DURATION_SECONDS:
-            return rate
+    # 5. Fallback
+    logger.warning(f"Using fallback rate ({DEFAULT_USD_INR_RATE}) for {pair}")
+    return DEFAULT_USD_INR_RATE
 
-    # 4. Fetch from API
+def _load_exchange_rate(pair: str, from_currency: str, to_currency: str):
+    """4. Fetch from API. Returns None when the provider has nothing usable."""
     print(f"Fetching new exchange rate for {pair}...")
     try:
         # Download last 1 day of data
-        # progress=False suppresses the progress bar in logs
-        data = yf.download(pair, period="1d", progress=False)
+        data = get_provider().download(pair, period="1d")
         
         if not data.empty:
             # Get the last available close price
@@ -55,14 +62,33 @@ def get_exchange_rate(from_currency: str, to_currency: str) -> float:
             # This protects against API glitches returning bad data
             if from_currency == "USD" and to_currency == "INR" and (rate < 50 or rate > 120):
                 logger.warning(f"Anomalous rate detected for {pair}: {rate}. Using fallback.")
-                return DEFAULT_USD_INR_RATE
+                return None
 
-            exchange_rate_cache[pair] = (rate, current_time)
             return rate
             
     except Exception as e:
         logger.error(f"Error fetching exchange rate for {pair}: {e}")
+    return None
 
-    # 5. Fallback
-    logger.warning(f"Using fallback rate ({DEFAULT_USD_INR_RATE}) for {pair}")
-    return DEFAULT_USD_INR_RATE
\ No newline at end of file
+
+# -------------------------
+# Quote currencies
+# -------------------------
+def suffix_currency(symbol: str) -> Optional[str]:
+    """Currency implied by the symbol alone, or None when the suffix doesn't settle it (.L, .T, .DE, ...)."""
+    symbol = symbol.upper()
+    if symbol.endswith((".NS", ".BO")):
+        return "INR"
+    if symbol.endswith("-USD") or not any(c in symbol for c in ".=-"):
+        return "USD"  # US listings and USD crypto pairs
+    return None
+
+
+def remember_currency(symbol: str, currency: Optional[str]):
+    if currency:
+        quote_currency_cache.set(symbol.upper(), currency)
+
+
+def resolve_currency(symbol: str) -> Optional[str]:
+    """The symbol's quote currency if it is known without a provider call: learned, else from the suffix."""
+    return quote_currency_cache.peek(symbol.upper()) or suffix_currency(symbol)
@@ -0,0 +1,62 @@
+# backend/utils/downsample.py
+"""
+Server-side downsampling for long chart ranges. A chart a few hundred pixels wide
+can't show more points than it has pixels, so long periods are reduced to at most
+`max_points` before they are serialized.
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def bucket_starts(n: int, max_points: int) -> np.ndarray:
+    """Start index of each of at most `max_points` contiguous, near-equal buckets over n points."""
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n, max_points, endpoint=False).astype(np.int64))
+
+
+def ohlc_buckets(dates: np.ndarray, open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, max_points: int) -> Tuple[np.ndarray, ...]:
+    """
+    Merge consecutive bars into at most `max_points` candles: first open, highest high,
+    lowest low, last close. Each candle is stamped with its first bar's date.
+    """
+    n = len(dates)
+    if n <= max_points:
+        return dates, open_, high, low, close
+    starts = bucket_starts(n, max_points)
+    ends = np.r_[starts[1:], n] - 1
+    return (
+        dates[starts],
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of at most `max_points` points that keep a
+    line's visual shape. The first and last points are always kept; from each bucket
+    in between, the point forming the largest triangle with the previously kept point
+    and the next bucket's average is chosen.
+    """
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
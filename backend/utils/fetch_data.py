@@ -1,45 +1,107 @@
-import yfinance as yf
-import time
+from utils.market_data import get_provider
+from utils.cache import TTLCache
+from utils.currency import quote_currency_cache, remember_currency, suffix_currency
+from config import QUOTE_STALE_GRACE_SECONDS, FUNDAMENTALS_STALE_GRACE_SECONDS
 import pandas as pd
 
 # --- Caching Setup ---
-stock_data_cache = {}
-CACHE_DURATION_SECONDS = 900  # Cache for 15 minutes
+# Quotes move all day; fundamentals change with quarterly filings. Each layer has its own cache,
+# bounded so that searches for arbitrary tickers can't grow memory without limit.
+QUOTE_CACHE_SECONDS = 60  # Cache quotes for 1 minute
+FUNDAMENTALS_CACHE_SECONDS = 24 * 3600  # Cache fundamentals for 1 day
+# Past the TTL, entries are served stale (and refreshed in the background) for the grace window
+quote_cache = TTLCache("quotes", ttl=QUOTE_CACHE_SECONDS, max_entries=5000, max_bytes=8 * 1024 * 1024,
+                       grace=QUOTE_STALE_GRACE_SECONDS)
+fundamentals_cache = TTLCache("fundamentals", ttl=FUNDAMENTALS_CACHE_SECONDS, max_entries=2000,
+                              max_bytes=16 * 1024 * 1024, grace=FUNDAMENTALS_STALE_GRACE_SECONDS)
 
-def fetch_stock_data(symbol: str):
+
+def safe_float(value):
+    try:
+        return float(value) if pd.notna(value) else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _cache_unless_error(data) -> bool:
+    return bool(data) and not data.get("error")
+
+
+def fetch_stock_quote(symbol: str):
     """
-    Fetches stock data for a given symbol, using a cache to improve performance.
-    Includes key financial metrics and advanced analytics with more robust error handling.
+    Fast quote layer: latest OHLC and currency from a single 2-day history call.
+    This is all that trading and valuation paths need. Concurrent misses for the
+    same symbol share one provider call. The result carries `stale` and `age_seconds`:
+    a quote past its TTL is returned at once while a background refresh runs.
     """
-    current_time = time.time()
-    # Always use the uppercase version of the symbol for consistency
     upper_symbol = symbol.upper()
+    entry = quote_cache.get_or_load_entry(upper_symbol, lambda: _load_quote(upper_symbol), cache_if=_cache_unless_error)
+    if entry.value.get("error"):
+        return entry.value
+    return {**entry.value, "stale": entry.stale, "age_seconds": round(entry.age_seconds, 1)}
 
-    if upper_symbol in stock_data_cache:
-        cached_data, timestamp = stock_data_cache[upper_symbol]
-        if current_time - timestamp < CACHE_DURATION_SECONDS:
-            print(f"CACHE HIT: Returning cached data for {upper_symbol}")
-            return cached_data
 
-    print(f"CACHE MISS: Fetching new data for {upper_symbol} from yfinance")
+def _load_quote(upper_symbol: str):
     try:
-        # Pass the uppercase symbol directly to yfinance
-        stock = yf.Ticker(upper_symbol)
-        
+        stock = get_provider().ticker(upper_symbol)
+        history = stock.history(period="2d")
+        if history.empty:
+            return {"error": f"No data found for symbol '{upper_symbol}'. It may be an invalid ticker or delisted."}
+        latest_data = history.iloc[-1]
+
+        if upper_symbol.endswith((".NS", ".BO")):
+            currency = "INR"
+        else:
+            # Learned or in cached fundamentals; otherwise the metadata of the history call
+            # just made (no extra provider request)
+            fundamentals = fundamentals_cache.peek(upper_symbol)
+            currency = quote_currency_cache.peek(upper_symbol) or (fundamentals or {}).get("currency")
+            if not currency:
+                try:
+                    currency = (getattr(stock, "history_metadata", None) or {}).get("currency")
+                except Exception:
+                    currency = None
+            remember_currency(upper_symbol, currency)
+            currency = currency or suffix_currency(upper_symbol) or "USD"
+
+        data = {
+            "symbol": upper_symbol,
+            "open": safe_float(latest_data["Open"]), "high": safe_float(latest_data["High"]),
+            "low": safe_float(latest_data["Low"]), "close": safe_float(latest_data["Close"]),
+            "currency": currency,
+        }
+        if data["close"] is None:
+            return {"error": f"No price available for '{upper_symbol}'."}
+        return data
+
+    except Exception as e:
+        print(f"An error occurred while fetching quote for {upper_symbol}: {e}")
+        return {"error": "Failed to retrieve quote. The ticker may be invalid or the data provider is temporarily unavailable."}
+
+
+def fetch_stock_fundamentals(symbol: str):
+    """
+    Slow fundamentals layer: .info, financial statements and ESG data.
+    Cached for a day since none of it moves intraday; concurrent misses share one scrape.
+    """
+    upper_symbol = symbol.upper()
+    return fundamentals_cache.get_or_load(
+        upper_symbol, lambda: _load_fundamentals(upper_symbol), cache_if=_cache_unless_error
+    )
+
+
+def _load_fundamentals(upper_symbol: str):
+    print(f"CACHE MISS: Fetching fundamentals for {upper_symbol} from market data provider")
+    try:
+        stock = get_provider().ticker(upper_symbol)
+
         # .info can be slow, but it's the main way to get snapshot data
         info = stock.info
 
-        # --- START: MODIFIED CODE (More Robust Ticker Validation) ---
         # A more reliable way to check if the ticker is valid is to see if essential
         # pricing data or market cap exists.
         if not info or info.get('marketCap') is None and info.get('regularMarketPrice') is None:
             return {"error": f"No data found for symbol '{upper_symbol}'. It may be an invalid ticker."}
-        # --- END: MODIFIED CODE ---
-
-        history = stock.history(period="2d")
-        if history.empty: # Fallback check
-             return {"error": f"No historical data for '{upper_symbol}'. It may be delisted."}
-        latest_data = history.iloc[-1]
 
         # --- Financial Data ---
         revenue, net_income, total_debt, free_cash_flow = None, None, None, None
@@ -63,8 +125,7 @@ def fetch_stock_data(symbol: str):
                 free_cash_flow = cashflow.iloc[:, 0].get("Free Cash Flow")
         except Exception as e:
             print(f"Could not fetch cashflow for {upper_symbol}: {e}")
-        
-        # --- START: MODIFIED CODE (More Robust ESG Fetching) ---
+
         # ESG data is often unavailable. This code handles that case gracefully.
         esg_score, esg_percentile = None, None
         try:
@@ -78,23 +139,14 @@ def fetch_stock_data(symbol: str):
                     esg_percentile = sustainability_df['percentile'].iloc[0]
         except Exception as e:
             print(f"Could not fetch ESG data for {upper_symbol}: {e}")
-        # --- END: MODIFIED CODE ---
 
         currency = "INR" if upper_symbol.endswith((".NS", ".BO")) else info.get("currency", "USD")
-        live_price = info.get("currentPrice") or info.get("regularMarketPrice") or latest_data["Close"]
-        
-        def safe_float(value):
-             try:
-                 return float(value) if pd.notna(value) else None
-             except (ValueError, TypeError):
-                 return None
+        remember_currency(upper_symbol, currency)
 
         data = {
-            "symbol": upper_symbol, "name": info.get("longName", "N/A"),
-            "open": safe_float(latest_data["Open"]), "high": safe_float(latest_data["High"]),
-            "low": safe_float(latest_data["Low"]), "close": safe_float(live_price),
+            "name": info.get("longName", "N/A"),
             "currency": currency,
-            
+
             "market_cap": safe_float(info.get("marketCap")),
             "pe_ratio": safe_float(info.get("trailingPE")),
             "dividend_yield": safe_float(info.get("dividendYield")),
@@ -110,16 +162,30 @@ def fetch_stock_data(symbol: str):
             "sharpe_ratio": safe_float(info.get("threeYearAverageReturn")),
             "esg_score": safe_float(esg_score),
             "esg_percentile": safe_float(esg_percentile),
-            
+
             "revenue": safe_float(revenue),
             "net_income": safe_float(net_income),
             "total_debt": safe_float(total_debt),
             "free_cash_flow": safe_float(free_cash_flow),
         }
 
-        stock_data_cache[upper_symbol] = (data, current_time)
         return data
 
     except Exception as e:
-        print(f"An error occurred while fetching data for {symbol}: {e}")
-        return {"error": "Failed to retrieve data. The ticker may be invalid or the data provider is temporarily unavailable."}
\ No newline at end of file
+        print(f"An error occurred while fetching fundamentals for {upper_symbol}: {e}")
+        return {"error": "Failed to retrieve data. The ticker may be invalid or the data provider is temporarily unavailable."}
+
+
+def fetch_stock_data(symbol: str):
+    """
+    Full stock payload for /stocks/price: the fundamentals layer overlaid with the
+    current quote. Trading and valuation code should call fetch_stock_quote instead.
+    """
+    fundamentals = fetch_stock_fundamentals(symbol)
+    if fundamentals.get("error"):
+        return fundamentals
+    quote = fetch_stock_quote(symbol)
+    if quote.get("error"):
+        return quote
+    # The quote's currency comes from the same source unless .info had none
+    return {**fundamentals, **quote, "currency": fundamentals.get("currency") or quote["currency"]}
@@ -0,0 +1,237 @@
+# backend/utils/history_store.py
+"""
+Local daily OHLC history, so charts, backtests and chat stop re-downloading years of bars.
+
+Each symbol is one .npy file holding a (len(COLUMNS), n) float64 matrix: row i is
+column i, so every column is contiguous and a date range is a view into the
+memory map, not a copy. Dates are stored as days since the epoch.
+
+A read first makes sure the store covers the requested start date (backfilling
+once if not) and that the tail is current. A tail refresh fetches only from the
+last stored bar onwards; that bar is replaced because it may have been a partial
+session. Files are rewritten through a temp file and os.replace, so readers
+holding the old map never see a half-written file.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import HISTORY_STORE_DIR
+from utils.cache import SingleFlight
+from utils.market_data import PERIOD_DAYS, get_provider
+from utils.market_hours import is_market_open
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("date", "open", "high", "low", "close", "volume")
+FRAME_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+# While a symbol's market is open (or was at the last check) its last bar is still moving
+TAIL_REFRESH_SECONDS = 300
+
+
+def start_for_period(period: Optional[str]) -> Optional[date]:
+    """First calendar day covered by a yfinance-style period, or None for "max"/unknown periods."""
+    today = date.today()
+    if period == "ytd":
+        return date(today.year, 1, 1)
+    days = PERIOD_DAYS.get(period)
+    return today - timedelta(days=days) if days else None
+
+
+def _to_matrix(hist: pd.DataFrame) -> np.ndarray:
+    """Provider history DataFrame -> (len(COLUMNS), n) matrix, one row per trading day."""
+    index = pd.DatetimeIndex(hist.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    days = index.values.astype("datetime64[D]").astype(np.int64)
+    matrix = np.empty((len(COLUMNS), len(hist)), dtype=np.float64)
+    matrix[0] = days
+    for row, column in enumerate(COLUMNS[1:], start=1):
+        name = FRAME_COLUMNS[column]
+        matrix[row] = hist[name].to_numpy(dtype=np.float64) if name in hist.columns else np.nan
+    # Keep the last bar per day, in date order
+    _, last = np.unique(days[::-1], return_index=True)
+    return matrix[:, len(days) - 1 - last]
+
+
+class HistoryStore:
+    def __init__(self, root: str = HISTORY_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._maps: Dict[str, np.ndarray] = {}   # symbol -> open (read-only) memory map
+        self._meta: Dict[str, dict] = {}
+        self._flight = SingleFlight()
+        self.reads = 0
+        self.backfills = 0
+        self.tail_refreshes = 0
+        self.bars_appended = 0
+
+    # --- files ---
+    def _path(self, symbol: str, ext: str) -> str:
+        return os.path.join(self.root, symbol.replace(os.sep, "_") + ext)
+
+    def _matrix(self, symbol: str) -> Optional[np.ndarray]:
+        with self._lock:
+            if symbol in self._maps:
+                return self._maps[symbol]
+        path = self._path(symbol, ".npy")
+        matrix = np.load(path, mmap_mode="r") if os.path.exists(path) else None
+        with self._lock:
+            self._maps[symbol] = matrix
+        return matrix
+
+    def _load_meta(self, symbol: str) -> dict:
+        with self._lock:
+            if symbol in self._meta:
+                return self._meta[symbol]
+        meta = {}
+        try:
+            with open(self._path(symbol, ".json")) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            self._meta[symbol] = meta
+        return meta
+
+    def _write(self, symbol: str, matrix: np.ndarray, meta: dict):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            for ext, dump in ((".npy", lambda f: np.save(f, matrix)), (".json", lambda f: json.dump(meta, f))):
+                path = self._path(symbol, ext)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb" if ext == ".npy" else "w") as f:
+                    dump(f)
+                os.replace(tmp, path)
+            matrix = np.load(self._path(symbol, ".npy"), mmap_mode="r")
+        except OSError as e:
+            # Keep serving from memory; the next process start will backfill again
+            logger.warning("Could not write history for %s: %s", symbol, e)
+        with self._lock:
+            self._maps[symbol] = matrix
+            self._meta[symbol] = meta
+
+    # --- sync ---
+    def _tail_stale(self, symbol: str, meta: dict) -> bool:
+        checked_at = meta.get("checked_at", 0)
+        if date.fromtimestamp(checked_at) != date.today():
+            return True
+        recent = time.time() - checked_at < TAIL_REFRESH_SECONDS
+        return not recent and (meta.get("checked_open", False) or is_market_open(symbol))
+
+    def _sync(self, symbol: str, start: date):
+        meta = dict(self._load_meta(symbol))
+        stored = self._matrix(symbol)
+        covered_from = date.fromisoformat(meta["covered_from"]) if "covered_from" in meta else None
+
+        if stored is None or stored.shape[1] == 0 or covered_from is None or start < covered_from:
+            fetch_from = start
+            self.backfills += 1
+        elif self._tail_stale(symbol, meta):
+            fetch_from = date(1970, 1, 1) + timedelta(days=int(stored[0, -1]))
+            self.tail_refreshes += 1
+        else:
+            return
+
+        hist = get_provider().ticker(symbol).history(start=fetch_from.isoformat())
+        now = time.time()
+        meta.update(checked_at=now, checked_open=is_market_open(symbol))
+        if hist is None or hist.empty:
+            if stored is not None:
+                with self._lock:
+                    self._meta[symbol] = meta
+            return  # unknown symbols leave nothing on disk
+
+        fetched = _to_matrix(hist)
+        if stored is not None and stored.shape[1]:
+            keep = int(np.searchsorted(stored[0], fetched[0, 0], side="left"))
+            matrix = np.concatenate((stored[:, :keep], fetched), axis=1)
+            self.bars_appended += matrix.shape[1] - stored.shape[1]
+        else:
+            matrix = fetched
+            self.bars_appended += matrix.shape[1]
+        meta["covered_from"] = min(start, covered_from or start).isoformat()
+        self._write(symbol, matrix, meta)
+
+    def _covers(self, symbol: str, start: date) -> bool:
+        covered_from = self._load_meta(symbol).get("covered_from")
+        return covered_from is not None and date.fromisoformat(covered_from) <= start
+
+    def _ensure(self, symbol: str, start: date):
+        """
+        Sync `symbol` for `start`. Syncs are coalesced per symbol (one writer per file), so a
+        caller that joined a sync for a later start checks coverage again and runs its own.
+        """
+        ran = False
+
+        def sync():
+            nonlocal ran
+            ran = True
+            self._sync(symbol, start)
+
+        while True:
+            self._flight.do(symbol, sync)
+            if ran or self._covers(symbol, start):
+                return
+
+    # --- reads ---
+    def columns(self, symbol: str, start: date, end: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """
+        Column name -> array for bars from `start` to `end` (inclusive). Price columns
+        are views into the memory map; "date" is converted to datetime64[D].
+        """
+        symbol = symbol.upper()
+        self._ensure(symbol, start)
+        self.reads += 1
+        matrix = self._matrix(symbol)
+        if matrix is None:
+            return {name: np.empty(0) for name in COLUMNS}
+        epoch = np.datetime64("1970-01-01", "D")
+        lo = int(np.searchsorted(matrix[0], (np.datetime64(start, "D") - epoch).astype(np.int64), side="left"))
+        hi = matrix.shape[1] if end is None else int(
+            np.searchsorted(matrix[0], (np.datetime64(end, "D") - epoch).astype(np.int64), side="right"))
+        view = matrix[:, lo:hi]
+        result = {name: view[i] for i, name in enumerate(COLUMNS)}
+        result["date"] = view[0].astype(np.int64).astype("datetime64[D]")
+        return result
+
+    def frame(self, symbol: str, period: Optional[str] = None, start=None) -> pd.DataFrame:
+        """
+        History as a DataFrame shaped like Ticker.history (Date index; Open/High/Low/Close/Volume).
+        Periods the store can't express ("max") go straight to the provider.
+        """
+        if start is not None:
+            start = pd.Timestamp(start).date()
+        else:
+            start = start_for_period(period)
+            if start is None:
+                return get_provider().ticker(symbol).history(period=period)
+        cols = self.columns(symbol, start)
+        return pd.DataFrame(
+            {FRAME_COLUMNS[name]: cols[name] for name in COLUMNS[1:]},
+            index=pd.DatetimeIndex(cols["date"], name="Date"),
+        )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            symbols = [s for s, m in self._maps.items() if m is not None]
+            bars = sum(self._maps[s].shape[1] for s in symbols)
+        return {
+            "root": self.root,
+            "symbols_open": len(symbols),
+            "bars_open": bars,
+            "reads": self.reads,
+            "backfills": self.backfills,
+            "tail_refreshes": self.tail_refreshes,
+            "bars_appended": self.bars_appended,
+        }
+
+
+history_store = HistoryStore()
@@ -0,0 +1,364 @@
+# backend/utils/market_data.py
+"""
+Market-data provider interface.
+
+Every place that used to call yfinance directly goes through `get_provider()`:
+  - download(tickers, period=..., start=..., group_by=...) -> DataFrame shaped like yf.download
+  - ticker(symbol)   -> object with .info, .history(), .fast_info, .financials,
+                        .balance_sheet, .cashflow, .sustainability (like yf.Ticker)
+  - tickers(symbols) -> object with a .tickers dict (like yf.Tickers)
+  - search(query)    -> list of Yahoo-style quote dicts
+
+Backends (MARKET_DATA_PROVIDER):
+  - "yfinance"  : live Yahoo Finance (default)
+  - "synthetic" : seeded random-walk prices, no network
+  - "replay"    : OHLC tapes from MARKET_DATA_TAPE_DIR (<SYMBOL>.csv), replayed at
+                  MARKET_DATA_TICK_RATE rows per second; symbols without a tape
+                  fall back to the synthetic walk
+"""
+import logging
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+
+from config import MARKET_DATA_PROVIDER, MARKET_DATA_TAPE_DIR, MARKET_DATA_TICK_RATE, MARKET_DATA_SEED
+
+logger = logging.getLogger(__name__)
+
+YAHOO_SEARCH_URL = "https://query1.finance.yahoo.com/v1/finance/search"
+SEARCH_TIMEOUT_SECONDS = 3
+
+# yfinance period strings -> calendar days
+PERIOD_DAYS = {
+    "1d": 1, "2d": 2, "5d": 5, "1wk": 7, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653,
+}
+
+
+def _normalize_tickers(tickers: Union[str, Iterable[str]]) -> List[str]:
+    if isinstance(tickers, str):
+        tickers = tickers.replace(",", " ").split()
+    return [t.strip().upper() for t in tickers if t and t.strip()]
+
+
+class MarketDataProvider(ABC):
+    """Base interface. Subclasses implement ticker() and may override the rest."""
+
+    name = "base"
+
+    @abstractmethod
+    def ticker(self, symbol: str):
+        ...
+
+    def tickers(self, symbols: Union[str, Iterable[str]]):
+        return SimpleNamespace(tickers={sym: self.ticker(sym) for sym in _normalize_tickers(symbols)})
+
+    def download(self, tickers, period: Optional[str] = "1d", start=None, group_by: str = "column", **kwargs) -> pd.DataFrame:
+        symbols = _normalize_tickers(tickers)
+        frames = {}
+        for sym in symbols:
+            hist = self.ticker(sym).history(period=period, start=start)
+            if hist is not None and not hist.empty:
+                frames[sym] = hist
+        if not frames:
+            return pd.DataFrame()
+        if isinstance(tickers, str) and len(symbols) == 1 and group_by != "ticker":
+            return frames[symbols[0]]
+        return pd.concat(frames, axis=1)
+
+    def search(self, query: str) -> List[Dict]:
+        return []
+
+
+# -------------------------
+# Live: Yahoo Finance
+# -------------------------
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def ticker(self, symbol: str):
+        return yf.Ticker(symbol)
+
+    def tickers(self, symbols):
+        return yf.Tickers(" ".join(_normalize_tickers(symbols)))
+
+    def download(self, tickers, period: Optional[str] = "1d", start=None, group_by: str = "column", **kwargs) -> pd.DataFrame:
+        kwargs.setdefault("progress", False)
+        if start is not None:
+            return yf.download(tickers, start=start, group_by=group_by, **kwargs)
+        return yf.download(tickers, period=period, group_by=group_by, **kwargs)
+
+    def search(self, query: str) -> List[Dict]:
+        response = requests.get(
+            YAHOO_SEARCH_URL,
+            params={"q": query},
+            headers={"User-Agent": "Mozilla/5.0"},
+            timeout=SEARCH_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+        return response.json().get("quotes", [])
+
+
+# -------------------------
+# Offline: synthetic random walk / tape replay
+# -------------------------
+SYNTHETIC_EPOCH = date(2010, 1, 4)
+DAILY_DRIFT = 0.0003
+DAILY_VOL = 0.018
+TICK_VOL = 0.0008
+FX_DAILY_VOL = 0.003
+# Synthetic series for these symbols are scaled so yesterday's close lands on the anchor
+# (keeps sanity checks like the USD/INR band in utils/currency.py meaningful offline)
+SYNTHETIC_ANCHORS = {"INR=X": 84.0}
+
+
+class _LocalSeries:
+    """Daily OHLC bars plus a live intraday walk for one symbol."""
+
+    def __init__(self, symbol: str, daily: pd.DataFrame, rng: np.random.Generator, is_tape: bool = False):
+        self.symbol = symbol
+        self.daily = daily
+        self.is_tape = is_tape
+        self.rng = rng
+        self.prev_close = float(daily["Close"].iloc[-1])
+        self.live_price = self.prev_close
+        self.session_high = self.prev_close
+        self.session_low = self.prev_close
+        self.steps = 0
+        self.built_for = date.today()
+
+
+class LocalProvider(MarketDataProvider):
+    """
+    Deterministic offline provider. Prices depend only on (seed, symbol, tick step),
+    so two runs with the same settings see the same numbers.
+    """
+
+    name = "local"
+
+    def __init__(self, mode: str = "synthetic", tape_dir: Optional[str] = None,
+                 tick_rate: float = 1.0, seed: int = 0):
+        self.mode = mode
+        self.tape_dir = tape_dir
+        self.tick_rate = max(tick_rate, 0.0)
+        self.seed = seed
+        self.started = time.monotonic()
+        self._series: Dict[str, _LocalSeries] = {}
+        self._lock = threading.Lock()
+
+    # --- series construction ---
+    def _rng(self, symbol: str) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+
+    def _synthetic_daily(self, symbol: str, rng: np.random.Generator) -> pd.DataFrame:
+        freq = "D" if symbol.endswith("-USD") else "B"
+        index = pd.date_range(SYNTHETIC_EPOCH, date.today() - timedelta(days=1), freq=freq, name="Date")
+        n = len(index)
+        is_fx = symbol.endswith("=X")
+        start_price = float(rng.uniform(0.5, 2.0) if is_fx else rng.uniform(20, 3000))
+        returns = rng.normal(0.0, FX_DAILY_VOL, n) if is_fx else rng.normal(DAILY_DRIFT, DAILY_VOL, n)
+        close = start_price * np.exp(np.cumsum(returns))
+        if symbol in SYNTHETIC_ANCHORS:
+            scale = SYNTHETIC_ANCHORS[symbol] / close[-1]
+            close *= scale
+            start_price *= scale
+        open_ = np.concatenate(([start_price], close[:-1]))
+        spread = np.abs(rng.normal(0, DAILY_VOL / 2, n))
+        high = np.maximum(open_, close) * (1 + spread)
+        low = np.minimum(open_, close) * (1 - spread)
+        volume = rng.integers(100_000, 5_000_000, n)
+        return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+    def _tape_daily(self, symbol: str) -> Optional[pd.DataFrame]:
+        if not self.tape_dir:
+            return None
+        path = os.path.join(self.tape_dir, f"{symbol}.csv")
+        if not os.path.exists(path):
+            return None
+        df = pd.read_csv(path, parse_dates=["Date"]).set_index("Date").sort_index()
+        if df.empty:
+            return None
+        df.index = pd.DatetimeIndex(df.index).tz_localize(None)
+        df.index.name = "Date"
+        # Shift the tape so its last bar lands on yesterday; ranges relative to today stay meaningful
+        df.index = df.index + (pd.Timestamp(date.today() - timedelta(days=1)) - df.index[-1])
+        return df[["Open", "High", "Low", "Close"] + (["Volume"] if "Volume" in df.columns else [])]
+
+    def _get_series(self, symbol: str) -> _LocalSeries:
+        symbol = symbol.upper()
+        with self._lock:
+            series = self._series.get(symbol)
+            if series is None or series.built_for != date.today():
+                rng = self._rng(symbol)
+                daily = self._tape_daily(symbol) if self.mode == "replay" else None
+                is_tape = daily is not None
+                if daily is None:
+                    daily = self._synthetic_daily(symbol, rng)
+                series = _LocalSeries(symbol, daily, rng, is_tape=is_tape)
+                self._series[symbol] = series
+            self._advance(series)
+            return series
+
+    def _advance(self, series: _LocalSeries):
+        """Walk the live price forward to the current tick step."""
+        target = int((time.monotonic() - self.started) * self.tick_rate)
+        n = target - series.steps
+        if n <= 0:
+            return
+        if series.is_tape:
+            # Replay: step through the tape's closes, looping
+            closes = series.daily["Close"].to_numpy()
+            series.live_price = float(closes[target % len(closes)])
+        else:
+            path = series.live_price * np.exp(np.cumsum(series.rng.normal(0, TICK_VOL, n)))
+            series.live_price = float(path[-1])
+            series.session_high = max(series.session_high, float(path.max()))
+            series.session_low = min(series.session_low, float(path.min()))
+        series.session_high = max(series.session_high, series.live_price)
+        series.session_low = min(series.session_low, series.live_price)
+        series.steps = target
+
+    def _tape_symbols(self) -> set:
+        if not self.tape_dir or not os.path.isdir(self.tape_dir):
+            return set()
+        return {f[:-4].upper() for f in os.listdir(self.tape_dir) if f.endswith(".csv")}
+
+    # --- public API ---
+    def history(self, symbol: str, period: Optional[str] = "1mo", start=None) -> pd.DataFrame:
+        series = self._get_series(symbol)
+        today_bar = pd.DataFrame(
+            {
+                "Open": [series.prev_close],
+                "High": [series.session_high],
+                "Low": [series.session_low],
+                "Close": [series.live_price],
+                "Volume": [0],
+            },
+            index=pd.DatetimeIndex([pd.Timestamp(date.today())], name="Date"),
+        )
+        df = pd.concat([series.daily, today_bar])
+        if start is not None:
+            return df[df.index >= pd.Timestamp(start)]
+        if period in (None, "max"):
+            return df
+        if period == "ytd":
+            return df[df.index >= pd.Timestamp(date.today().year, 1, 1)]
+        days = PERIOD_DAYS.get(period, 31)
+        if days <= 5:
+            return df.iloc[-days:]
+        return df[df.index > pd.Timestamp(date.today() - timedelta(days=days))]
+
+    def ticker(self, symbol: str):
+        return LocalTicker(self, symbol.upper())
+
+    def search(self, query: str) -> List[Dict]:
+        q = query.strip().upper()
+        if not q:
+            return []
+        candidates = sorted(s for s in self._tape_symbols() if q in s)
+        if q not in candidates:
+            candidates.insert(0, q)
+        return [
+            {"symbol": sym, "shortname": f"{sym} (simulated)", "longname": f"{sym} (simulated)", "quoteType": "EQUITY"}
+            for sym in candidates[:10]
+        ]
+
+
+class LocalTicker:
+    """yf.Ticker look-alike backed by LocalProvider."""
+
+    def __init__(self, provider: LocalProvider, symbol: str):
+        self._provider = provider
+        self.ticker = symbol
+
+    def history(self, period: Optional[str] = "1mo", start=None, **kwargs) -> pd.DataFrame:
+        return self._provider.history(self.ticker, period=period, start=start)
+
+    @property
+    def _currency(self) -> str:
+        return "INR" if self.ticker.endswith((".NS", ".BO")) or self.ticker == "INR=X" else "USD"
+
+    @property
+    def history_metadata(self) -> Dict:
+        return {"currency": self._currency}
+
+    @property
+    def fast_info(self):
+        series = self._provider._get_series(self.ticker)
+        return SimpleNamespace(last_price=series.live_price, currency=self._currency,
+                               previous_close=series.prev_close)
+
+    @property
+    def info(self) -> Dict:
+        series = self._provider._get_series(self.ticker)
+        year = series.daily["Close"].iloc[-252:]
+        return {
+            "symbol": self.ticker,
+            "longName": f"{self.ticker} (simulated)",
+            "currency": self._currency,
+            "currentPrice": series.live_price,
+            "regularMarketPrice": series.live_price,
+            "previousClose": series.prev_close,
+            "marketCap": series.live_price * 1_000_000_000,
+            "trailingPE": 20.0,
+            "dividendYield": None,
+            "fiftyTwoWeekHigh": float(year.max()),
+            "fiftyTwoWeekLow": float(year.min()),
+            "beta": 1.0,
+        }
+
+    @property
+    def financials(self) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    @property
+    def balance_sheet(self) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    @property
+    def cashflow(self) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    @property
+    def sustainability(self):
+        return None
+
+
+# -------------------------
+# Provider selection
+# -------------------------
+_provider: Optional[MarketDataProvider] = None
+
+
+def create_provider(kind: str) -> MarketDataProvider:
+    kind = (kind or "yfinance").lower()
+    if kind == "yfinance":
+        return YFinanceProvider()
+    if kind in ("synthetic", "replay"):
+        return LocalProvider(mode=kind, tape_dir=MARKET_DATA_TAPE_DIR,
+                             tick_rate=MARKET_DATA_TICK_RATE, seed=MARKET_DATA_SEED)
+    raise ValueError(f"Unknown MARKET_DATA_PROVIDER: {kind}")
+
+
+def get_provider() -> MarketDataProvider:
+    global _provider
+    if _provider is None:
+        _provider = create_provider(MARKET_DATA_PROVIDER)
+        logger.info("Market data provider: %s", MARKET_DATA_PROVIDER)
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider):
+    """Swap the active provider (benchmarks, tests)."""
+    global _provider
+    _provider = provider
@@ -0,0 +1,51 @@
+# backend/utils/market_hours.py
+from datetime import datetime, time, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+IST = ZoneInfo("Asia/Kolkata")
+US_EASTERN = ZoneInfo("America/New_York")
+
+NSE_OPEN, NSE_CLOSE = time(9, 15), time(15, 30)
+US_OPEN, US_CLOSE = time(9, 30), time(16, 0)
+
+
+def exchange_for(symbol: str) -> str:
+    """Rough exchange bucket from the ticker suffix."""
+    sym = symbol.upper()
+    if sym.endswith("-USD"):
+        return "CRYPTO"
+    if sym.endswith((".NS", ".BO")) or sym in ("^NSEI", "^BSESN"):
+        return "NSE"
+    if sym.endswith("=X") or sym.endswith("=F"):
+        return "FX"
+    return "US"
+
+
+def closed_reason(symbol: str, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    None while the symbol's exchange is in its regular session, else why it isn't
+    ("Weekend", "09:15 - 15:30 IST"). Crypto trades around the clock, FX/futures on
+    weekdays; holidays are ignored.
+    """
+    now = now or datetime.now(timezone.utc)
+    exchange = exchange_for(symbol)
+
+    if exchange == "CRYPTO":
+        return None
+    if exchange == "FX":
+        return None if now.weekday() < 5 else "Weekend"
+    if exchange == "NSE":
+        local, (open_, close), label = now.astimezone(IST), (NSE_OPEN, NSE_CLOSE), "IST"
+    else:
+        local, (open_, close), label = now.astimezone(US_EASTERN), (US_OPEN, US_CLOSE), "ET"
+    if local.weekday() >= 5:
+        return "Weekend"
+    if not open_ <= local.time() <= close:
+        return f"{open_:%H:%M} - {close:%H:%M} {label}"
+    return None
+
+
+def is_market_open(symbol: str, now: Optional[datetime] = None) -> bool:
+    """Whether the symbol's exchange is in its regular session right now."""
+    return closed_reason(symbol, now) is None
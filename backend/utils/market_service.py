@@ -0,0 +1,90 @@
+# backend/utils/market_service.py
+"""
+Async facade over the blocking market-data layer.
+
+Provider calls (yfinance/HTTP) block, so routes must never make them on the event
+loop. Everything here runs on a dedicated, bounded thread pool and is awaited with
+a per-call timeout; a timeout surfaces as a 504 so one slow upstream response
+can't stall every request and websocket in the worker.
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+from fastapi import HTTPException
+
+from utils.market_data import get_provider
+from utils.fetch_data import fetch_stock_data, fetch_stock_quote
+from utils.history_store import history_store
+from utils import currency
+
+logger = logging.getLogger(__name__)
+
+# --- Tuning ---
+MARKET_DATA_WORKERS = 8          # provider calls in flight per worker process
+QUOTE_TIMEOUT_SECONDS = 10
+FUNDAMENTALS_TIMEOUT_SECONDS = 20
+HISTORY_TIMEOUT_SECONDS = 15
+SEARCH_TIMEOUT_SECONDS = 5
+
+_executor = ThreadPoolExecutor(max_workers=MARKET_DATA_WORKERS, thread_name_prefix="market-data")
+_stats = {"calls": 0, "timeouts": 0, "in_flight": 0}
+
+
+class MarketDataTimeout(HTTPException):
+    """The provider didn't answer in time. Routes let it propagate as a 504."""
+
+    def __init__(self, what: str, timeout: float):
+        super().__init__(status_code=504, detail=f"Market data provider timed out after {timeout:g}s ({what})")
+
+
+async def run_blocking(fn: Callable, *args, timeout: float = QUOTE_TIMEOUT_SECONDS, **kwargs) -> Any:
+    """
+    Run a blocking market-data call on the bounded pool and await it.
+    On timeout the caller gets MarketDataTimeout; the thread finishes in the
+    background and its result (usually a cache fill) is still useful to the next caller.
+    """
+    loop = asyncio.get_running_loop()
+    _stats["calls"] += 1
+    _stats["in_flight"] += 1
+    future = loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+    future.add_done_callback(lambda _: _stats.__setitem__("in_flight", _stats["in_flight"] - 1))
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        name = getattr(fn, "__name__", "call")
+        logger.warning("Market data call %s%s timed out after %ss", name, args[:1], timeout)
+        raise MarketDataTimeout(name, timeout)
+
+
+# -------------------------
+# Facade
+# -------------------------
+async def get_stock_quote(symbol: str) -> Dict:
+    return await run_blocking(fetch_stock_quote, symbol, timeout=QUOTE_TIMEOUT_SECONDS)
+
+async def get_stock_data(symbol: str) -> Dict:
+    return await run_blocking(fetch_stock_data, symbol, timeout=FUNDAMENTALS_TIMEOUT_SECONDS)
+
+async def get_exchange_rate(from_currency: str, to_currency: str) -> float:
+    if from_currency == to_currency:
+        return 1.0
+    return await run_blocking(currency.get_exchange_rate, from_currency, to_currency, timeout=QUOTE_TIMEOUT_SECONDS)
+
+async def search(query: str) -> List[Dict]:
+    return await run_blocking(lambda: get_provider().search(query), timeout=SEARCH_TIMEOUT_SECONDS)
+
+async def get_history(symbol: str, period: str = None, start=None) -> pd.DataFrame:
+    """Daily OHLC history from the local history store, shaped like Ticker.history(period=... or start=...)."""
+    return await run_blocking(history_store.frame, symbol, period=period, start=start, timeout=HISTORY_TIMEOUT_SECONDS)
+
+async def download(tickers, **kwargs) -> pd.DataFrame:
+    return await run_blocking(get_provider().download, tickers, timeout=HISTORY_TIMEOUT_SECONDS, **kwargs)
+
+
+def stats() -> Dict:
+    return {"workers": MARKET_DATA_WORKERS, **_stats}
@@ -0,0 +1,301 @@
+# backend/utils/market_snapshot.py
+"""
+Background-materialized dashboard data for /stocks/market-summary and /stocks/top-movers.
+
+One task downloads the index basket and scans the movers universe on a market-hours-aware
+cadence and publishes both as an immutable snapshot of pre-serialized JSON bytes.
+Requests only read the current snapshot, so N dashboard viewers cost nothing beyond
+the one download per refresh.
+"""
+import asyncio
+import csv
+import json
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import MOVERS_UNIVERSE_FILE
+from utils import market_service
+from utils.diversification_calculator import SECTOR_MAPPING
+from utils.market_hours import exchange_for, is_market_open
+from utils.price_engine import fetch_quotes
+
+logger = logging.getLogger(__name__)
+
+# Fallback movers basket if the universe file can't be read
+POPULAR_TICKERS = [
+    "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "ICICIBANK.NS",
+    "TATAMOTORS.NS", "SBIN.NS", "BAJFINANCE.NS", "ITC.NS", "WIPRO.NS",
+    "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX"
+]
+
+# Major Indices to track - EXPANDED LIST
+INDICES = {
+    "^NSEI": "Nifty 50",
+    "^BSESN": "Sensex",
+    "^GSPC": "S&P 500",
+    "^IXIC": "Nasdaq 100",   # Added Tech
+    "BTC-USD": "Bitcoin",
+    "ETH-USD": "Ethereum",   # Added Crypto
+    "GC=F": "Gold",
+    "CL=F": "Crude Oil",     # Added Commodities
+    "INR=X": "USD/INR"       # Added Currency
+}
+
+# --- Refresh cadence (seconds), per basket ---
+OPEN_REFRESH_SECONDS = 60       # some market in the basket is trading
+CLOSED_REFRESH_SECONDS = 900    # the basket's markets are closed: the numbers barely move
+# Always (or all-week) open; they'd pin every basket to the open cadence, so they don't count
+# towards the movers universe's cadence. The index basket, which has crypto and FX, stays at 60s.
+ROUND_THE_CLOCK_EXCHANGES = ("CRYPTO", "FX")
+RETRY_SECONDS = 30              # after a failed refresh
+
+TOP_MOVERS_COUNT = 3            # gainers and losers each
+MOVERS_DEADLINE_SECONDS = 45    # ~12 rate-limited chunk downloads for a few hundred symbols
+
+EMPTY_SUMMARY = b"[]"
+EMPTY_MOVERS = b'{"gainers":[],"losers":[],"sectors":[]}'
+
+
+class Snapshot(NamedTuple):
+    built_at: float
+    summary: bytes
+    movers: bytes
+
+
+def summarize_indices(data: pd.DataFrame) -> List[Dict]:
+    summary = []
+    for ticker, name in INDICES.items():
+        try:
+            if ticker in data.columns.levels[0]:
+                df = data[ticker]
+            else:
+                continue
+
+            if not df.empty and 'Close' in df.columns:
+                close = float(df['Close'].iloc[-1])
+                prev_close = float(df['Open'].iloc[-1])
+                if pd.isna(prev_close): prev_close = close
+
+                if pd.notna(close) and pd.notna(prev_close) and prev_close != 0:
+                    change = ((close - prev_close) / prev_close) * 100
+                    summary.append({
+                        "symbol": ticker,
+                        "name": name,
+                        "price": close,
+                        "change_percent": change
+                    })
+        except Exception:
+            continue
+    return summary
+
+
+class Universe(NamedTuple):
+    symbols: List[str]
+    sector_codes: np.ndarray    # index into sector_names, per symbol
+    sector_names: List[str]
+
+
+def load_universe(path: str = MOVERS_UNIVERSE_FILE) -> Universe:
+    """
+    Symbols to scan for movers, with sectors. SECTOR_MAPPING (the diversification
+    calculator's sectors) wins over the file's own sector column.
+    """
+    try:
+        with open(path, newline="") as f:
+            rows = [row for row in csv.DictReader(f) if row.get("symbol")]
+    except OSError as e:
+        logger.warning("Movers universe %s unreadable (%s); using the popular tickers", path, e)
+        rows = [{"symbol": sym} for sym in POPULAR_TICKERS]
+    symbols, sectors, seen = [], [], set()
+    for row in rows:
+        sym = row["symbol"].strip().upper()
+        if sym in seen:
+            continue
+        seen.add(sym)
+        symbols.append(sym)
+        sectors.append(SECTOR_MAPPING.get(sym) or (row.get("sector") or "").strip() or "Other")
+    names, codes = np.unique(np.array(sectors, dtype=object).astype(str), return_inverse=True)
+    return Universe(symbols, codes, names.tolist())
+
+
+def rank_movers(universe: Universe, quotes: Dict[str, Optional[Tuple[float, float]]],
+                count: int = TOP_MOVERS_COUNT) -> Dict[str, List[Dict]]:
+    """
+    Day change for the whole universe in one vectorized pass; top/bottom `count` by
+    argpartition (no full sort) and a per-sector heatmap from bincount.
+    """
+    last = np.full(len(universe.symbols), np.nan)
+    prev = np.full(len(universe.symbols), np.nan)
+    for i, sym in enumerate(universe.symbols):
+        quote = quotes.get(sym)
+        if quote:
+            last[i], prev[i] = quote
+    change = (last / prev - 1) * 100
+
+    priced = np.flatnonzero(np.isfinite(change))
+    moves = change[priced]
+    k = min(count, len(priced))
+
+    def pick(order: np.ndarray) -> List[Dict]:
+        idx = priced[order]
+        idx = idx[np.argsort(-change[idx], kind="stable")]
+        return [
+            {
+                "symbol": universe.symbols[i],
+                "price": round(float(last[i]), 2),
+                "change": float(change[i]),
+                "sector": universe.sector_names[universe.sector_codes[i]],
+            }
+            for i in idx
+        ]
+
+    gainers = pick(np.argpartition(-moves, k - 1)[:k]) if k else []
+    losers = pick(np.argpartition(moves, k - 1)[:k]) if k else []
+
+    codes = universe.sector_codes[priced]
+    n_sectors = len(universe.sector_names)
+    counts = np.bincount(codes, minlength=n_sectors)
+    sums = np.bincount(codes, weights=moves, minlength=n_sectors)
+    advancers = np.bincount(codes, weights=moves > 0, minlength=n_sectors)
+    decliners = np.bincount(codes, weights=moves < 0, minlength=n_sectors)
+    sectors = [
+        {
+            "sector": universe.sector_names[s],
+            "change": round(float(sums[s] / counts[s]), 2),
+            "count": int(counts[s]),
+            "advancers": int(advancers[s]),
+            "decliners": int(decliners[s]),
+        }
+        for s in np.flatnonzero(counts)
+    ]
+    sectors.sort(key=lambda x: x["change"], reverse=True)
+
+    return {
+        "gainers": gainers,
+        "losers": losers,
+        "sectors": sectors,
+        "universe_size": len(universe.symbols),
+        "priced": int(len(priced)),
+    }
+
+
+def _probes(symbols) -> List[str]:
+    return list({exchange_for(s): s for s in symbols}.values())
+
+
+def _interval(probes: List[str]) -> float:
+    return OPEN_REFRESH_SECONDS if any(is_market_open(s) for s in probes) else CLOSED_REFRESH_SECONDS
+
+
+async def _not_due():
+    return None
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+class MarketSnapshotter:
+    def __init__(self, universe: Universe):
+        self.universe = universe
+        self.snapshot: Optional[Snapshot] = None
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+        self.failures = 0
+        self.movers_refreshes = 0
+        self._movers_built_at = 0.0
+        # One symbol per exchange is enough to ask "is anything open?"
+        self._summary_probes = _probes(INDICES)
+        self._movers_probes = _probes(s for s in universe.symbols
+                                      if exchange_for(s) not in ROUND_THE_CLOCK_EXCHANGES)
+
+    def interval(self) -> float:
+        """Loop cadence: the index basket's, which is never slower than the movers universe's."""
+        return min(_interval(self._summary_probes), self.movers_interval())
+
+    def movers_interval(self) -> float:
+        return _interval(self._movers_probes)
+
+    async def refresh(self) -> bool:
+        """
+        Download the index basket, and the movers universe when its own cadence is due,
+        and swap in a new snapshot. A basket that fails keeps its previous bytes.
+        """
+        previous = self.snapshot or Snapshot(0.0, EMPTY_SUMMARY, EMPTY_MOVERS)
+        movers_due = time.time() - self._movers_built_at >= self.movers_interval()
+        indices, quotes = await asyncio.gather(
+            market_service.download(list(INDICES), period="1d", group_by='ticker', threads=True),
+            market_service.run_blocking(fetch_quotes, self.universe.symbols, deadline_seconds=MOVERS_DEADLINE_SECONDS,
+                                        timeout=MOVERS_DEADLINE_SECONDS + 5) if movers_due else _not_due(),
+            return_exceptions=True,
+        )
+        summary_bytes, movers_bytes = previous.summary, previous.movers
+        ok = True
+        for name, result in (("market summary", indices), ("top movers", quotes)):
+            if result is None:
+                continue  # movers not due yet
+            if isinstance(result, Exception):
+                logger.warning("Market snapshot: %s download failed: %s", name, result)
+                ok = False
+                continue
+            try:
+                if name == "market summary":
+                    if result.empty:
+                        raise ValueError("empty download")
+                    summary_bytes = _dumps(summarize_indices(result))
+                else:
+                    movers = rank_movers(self.universe, result)
+                    if not movers["priced"]:
+                        raise ValueError("no symbol priced")
+                    movers_bytes = _dumps(movers)
+                    self._movers_built_at = time.time()
+                    self.movers_refreshes += 1
+            except Exception as e:
+                logger.warning("Market snapshot: could not build %s: %s", name, e)
+                ok = False
+        self.snapshot = Snapshot(time.time(), summary_bytes, movers_bytes)
+        self.refreshes += 1
+        self.failures += 0 if ok else 1
+        return ok
+
+    async def current(self) -> Snapshot:
+        """The latest snapshot; the first caller before the loop has run builds it."""
+        if self.snapshot is None:
+            async with self._lock:
+                if self.snapshot is None:
+                    await self.refresh()
+        return self.snapshot
+
+    async def run(self):
+        while True:
+            try:
+                async with self._lock:
+                    ok = await self.refresh()
+            except Exception as e:
+                logger.warning("Market snapshot refresh failed: %s", e)
+                ok = False
+            await asyncio.sleep(self.interval() if ok else RETRY_SECONDS)
+
+    def stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            "age_seconds": round(time.time() - snapshot.built_at, 1) if snapshot else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "next_interval_seconds": self.interval(),
+            "movers_refreshes": self.movers_refreshes,
+            "movers_interval_seconds": self.movers_interval(),
+            "universe_size": len(self.universe.symbols),
+        }
+
+
+market_snapshot = MarketSnapshotter(load_universe())
+
+
+def start_market_snapshot():
+    """FastAPI startup hook: keep the dashboard snapshot refreshing in the background."""
+    asyncio.create_task(market_snapshot.run())
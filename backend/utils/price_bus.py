@@ -0,0 +1,228 @@
+# backend/utils/price_bus.py
+"""
+Shared price bus so that N uvicorn workers poll the provider once.
+
+One worker wins a file-lock election and becomes the leader: it runs the price
+updater and publishes every tick on the bus. Every other worker is a follower:
+it consumes ticks into its own ConnectionManager and forwards its clients'
+symbol interest back to the leader so those symbols get polled too.
+
+Transports (PRICE_BUS_TRANSPORT):
+  - "inprocess": single worker; this process is always the leader. Also used in tests.
+  - "unix":      leader serves newline-delimited JSON on PRICE_BUS_SOCKET_PATH.
+"""
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 1.0
+# Line limit for both ends of the socket. A snapshot is one line holding every price and
+# updated_at (~55 bytes per symbol), which passes asyncio's 64 KiB default at ~1,200 symbols.
+STREAM_LIMIT_BYTES = 16 * 1024 * 1024
+
+
+class LeaderElection:
+    """Non-blocking exclusive flock on a file; whoever holds it is the leader until it exits."""
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        import fcntl
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class PriceBus(ABC):
+    """
+    Transport interface.
+      leader side:   serve(), publish(message), remote_interest()
+      follower side: consume() -> async iterator of messages, send_interest(subscribers)
+    """
+
+    def __init__(self):
+        # connection id -> {symbol: subscriber count} reported by followers
+        self._interest: Dict[int, Dict[str, int]] = {}
+        self.snapshot_provider = None  # callable returning {"prices": {...}, "updated_at": {...}}
+
+    @abstractmethod
+    def try_become_leader(self) -> bool:
+        ...
+
+    async def serve(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, message: Dict):
+        ...
+
+    @abstractmethod
+    def consume(self) -> AsyncIterator[Dict]:
+        ...
+
+    async def send_interest(self, subscribers: Dict[str, int]):
+        pass
+
+    def remote_interest(self) -> Dict[str, int]:
+        """Summed subscriber counts across followers, symbol -> count."""
+        totals: Dict[str, int] = {}
+        for counts in self._interest.values():
+            for sym, n in counts.items():
+                totals[sym] = totals.get(sym, 0) + n
+        return totals
+
+    async def close(self):
+        pass
+
+
+class InProcessBus(PriceBus):
+    """Everything lives in one process. Consumers get their own queue of published messages."""
+
+    def __init__(self):
+        super().__init__()
+        self._queues: Set[asyncio.Queue] = set()
+
+    def try_become_leader(self) -> bool:
+        return True
+
+    async def publish(self, message: Dict):
+        for queue in list(self._queues):
+            queue.put_nowait(message)
+
+    async def consume(self) -> AsyncIterator[Dict]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.discard(queue)
+
+    async def send_interest(self, subscribers: Dict[str, int]):
+        self._interest[0] = dict(subscribers)
+
+
+class UnixSocketBus(PriceBus):
+    """Leader serves ticks over a Unix domain socket; followers connect and read lines."""
+
+    def __init__(self, socket_path: str, lock_path: str):
+        super().__init__()
+        self.socket_path = socket_path
+        self.election = LeaderElection(lock_path)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._followers: Dict[int, asyncio.StreamWriter] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    def try_become_leader(self) -> bool:
+        return self.election.try_acquire()
+
+    # --- leader ---
+    async def serve(self):
+        # We hold the lock, so any socket file left behind belongs to a dead leader
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(
+            self._handle_follower, path=self.socket_path, limit=STREAM_LIMIT_BYTES)
+        logger.info("Price bus leader (pid %d) serving on %s", os.getpid(), self.socket_path)
+
+    async def _handle_follower(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn_id = id(writer)
+        self._followers[conn_id] = writer
+        try:
+            if self.snapshot_provider is not None:
+                writer.write(_encode({"type": "snapshot", **self.snapshot_provider()}))
+                await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if message.get("type") == "interest":
+                    self._interest[conn_id] = message.get("subscribers") or {}
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._followers.pop(conn_id, None)
+            self._interest.pop(conn_id, None)
+            writer.close()
+
+    async def publish(self, message: Dict):
+        if not self._followers:
+            return
+        data = _encode(message)
+        for conn_id, writer in list(self._followers.items()):
+            try:
+                writer.write(data)
+                # A follower that stops reading must not stall the leader's poller
+                await asyncio.wait_for(writer.drain(), timeout=2.0)
+            except Exception as e:
+                logger.info("Dropping price bus follower: %s", e)
+                self._followers.pop(conn_id, None)
+                self._interest.pop(conn_id, None)
+                writer.close()
+
+    # --- follower ---
+    async def consume(self) -> AsyncIterator[Dict]:
+        reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=STREAM_LIMIT_BYTES)
+        self._writer = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("price bus leader went away")
+                yield json.loads(line)
+        finally:
+            self._writer = None
+            writer.close()
+
+    async def send_interest(self, subscribers: Dict[str, int]):
+        if self._writer is None:
+            return
+        self._writer.write(_encode({"type": "interest", "subscribers": subscribers}))
+        await self._writer.drain()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        self.election.release()
+
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+def create_price_bus(transport: str, socket_path: str, lock_path: str) -> PriceBus:
+    transport = (transport or "inprocess").lower()
+    if transport == "inprocess":
+        return InProcessBus()
+    if transport == "unix":
+        return UnixSocketBus(socket_path, lock_path)
+    raise ValueError(f"Unknown PRICE_BUS_TRANSPORT: {transport}")
@@ -0,0 +1,205 @@
+# backend/utils/price_engine.py
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.market_data import get_provider
+
+logger = logging.getLogger(__name__)
+
+# --- Tuning ---
+CHUNK_SIZE = 30                 # tickers per provider download call
+FALLBACK_CHUNK_SIZE = 15        # tickers per batched retry of symbols the first pass missed
+MAX_WORKERS = 4                 # concurrent downloads in flight
+REQUESTS_PER_SECOND = 2.5       # sustained provider request rate (old serial loop: 1 per 0.4s)
+BURST = 4                       # requests allowed back-to-back before the rate applies
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Each provider request takes one token."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Block until a token is available. Returns False if `deadline` (monotonic) passes first."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_for = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+
+
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="price-fetch")
+
+
+# -------------------------
+# Parsing helpers
+# -------------------------
+def chunk_iterable(iterable: Iterable[str], size: int):
+    it = list(iterable)
+    for i in range(0, len(it), size):
+        yield it[i:i + size]
+
+def safe_float(val) -> Optional[float]:
+    try:
+        f = float(val)
+        if math.isnan(f):
+            return None
+        return f
+    except Exception:
+        return None
+
+def _parse_yf_dataframe_for_symbol(df: pd.DataFrame, symbol: str) -> Optional[float]:
+    """
+    Return the latest close price for `symbol` from a provider download dataframe.
+    Handles multi-index and single-index DataFrames.
+    """
+    try:
+        # MultiIndex columns case: columns like ('AAPL', 'Close')
+        if isinstance(df.columns, pd.MultiIndex):
+            top_level = df.columns.levels[0]
+            if symbol in top_level:
+                try:
+                    col = df[symbol]
+                    if "Close" in col.columns:
+                        return safe_float(col["Close"].dropna().iloc[-1])
+                except Exception:
+                    # some shapes vary; try direct index
+                    try:
+                        return safe_float(df[(symbol, "Close")].dropna().iloc[-1])
+                    except Exception:
+                        return None
+        else:
+            # Single ticker case or single-level columns
+            if "Close" in df.columns:
+                # df['Close'] may be a Series (single ticker) or DataFrame
+                try:
+                    return safe_float(df["Close"].dropna().iloc[-1])
+                except Exception:
+                    # fallback: last row 'Close' value
+                    try:
+                        return safe_float(df.iloc[-1]["Close"])
+                    except Exception:
+                        return None
+    except Exception:
+        return None
+    return None
+
+
+def _parse_last_two_closes(df: pd.DataFrame, symbol: str) -> Optional[Tuple[float, float]]:
+    """(latest close, previous close) for `symbol` from a multi-day group_by='ticker' download."""
+    try:
+        if not isinstance(df.columns, pd.MultiIndex) or symbol not in df.columns.levels[0]:
+            return None
+        closes = df[(symbol, "Close")].dropna()
+        if len(closes) < 2:
+            return None
+        last, prev = safe_float(closes.iloc[-1]), safe_float(closes.iloc[-2])
+        return (last, prev) if last is not None and prev else None
+    except Exception:
+        return None
+
+
+# -------------------------
+# Fetch engine
+# -------------------------
+def _download_chunk(chunk: List[str], period: str, deadline: float,
+                    parse: Callable = _parse_yf_dataframe_for_symbol) -> Dict[str, Optional[float]]:
+    """Download one chunk under the rate limiter. Symbols that can't be parsed map to None."""
+    if not rate_limiter.acquire(deadline):
+        return {sym: None for sym in chunk}
+    try:
+        # group_by="ticker" keeps the MultiIndex shape even for a one-symbol chunk
+        df = get_provider().download(chunk, period=period, group_by="ticker", threads=True, auto_adjust=False)
+    except Exception as e:
+        logger.warning("Provider download failed for chunk of %d (%s): %s", len(chunk), period, e)
+        return {sym: None for sym in chunk}
+    if df is None or (isinstance(df, pd.DataFrame) and df.empty):
+        return {sym: None for sym in chunk}
+    return {sym: parse(df, sym) for sym in chunk}
+
+
+def _run_chunks(chunks: List[List[str]], period: str, deadline: float, out: Dict[str, Optional[float]],
+                parse: Callable = _parse_yf_dataframe_for_symbol):
+    """Run chunk downloads on the worker pool, merging results into `out` until the deadline."""
+    pending = {_executor.submit(_download_chunk, chunk, period, deadline, parse): chunk for chunk in chunks}
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for fut in done:
+            chunk = pending.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as e:
+                logger.debug("Chunk worker error: %s", e)
+                result = {}
+            for sym in chunk:
+                price = result.get(sym)
+                if price is not None or sym not in out:
+                    out[sym] = price
+    for fut, chunk in pending.items():
+        # Out of time: drop queued work, report these as unknown for this cycle
+        fut.cancel()
+        for sym in chunk:
+            out.setdefault(sym, None)
+    if pending:
+        logger.warning("Price fetch deadline hit with %d chunks outstanding", len(pending))
+
+
+def fetch_prices(symbols: Iterable[str], deadline_seconds: float) -> Dict[str, Optional[float]]:
+    """
+    Fetch latest close prices for `symbols` within `deadline_seconds`.
+    - Chunks run concurrently on a bounded pool, paced by a shared token bucket.
+    - Symbols missing from the 1d pass are retried together in smaller batches over
+      a 5d window (covers tickers with no bar yet today) instead of one call each.
+    - Anything unresolved when the deadline hits maps to None.
+    """
+    tickers = sorted({s.strip().upper() for s in symbols if isinstance(s, str) and s.strip()})
+    if not tickers:
+        return {}
+
+    deadline = time.monotonic() + deadline_seconds
+    prices: Dict[str, Optional[float]] = {}
+    _run_chunks(list(chunk_iterable(tickers, CHUNK_SIZE)), "1d", deadline, prices)
+
+    missing = [sym for sym in tickers if prices.get(sym) is None]
+    if missing and time.monotonic() < deadline:
+        logger.debug("Retrying %d symbols in batched fallback", len(missing))
+        _run_chunks(list(chunk_iterable(missing, FALLBACK_CHUNK_SIZE)), "5d", deadline, prices)
+
+    return {sym: (round(prices[sym], 2) if prices.get(sym) is not None else None) for sym in tickers}
+
+
+def fetch_quotes(symbols: Iterable[str], deadline_seconds: float) -> Dict[str, Optional[Tuple[float, float]]]:
+    """
+    (latest close, previous close) for `symbols` within `deadline_seconds`, for day-change
+    scans over large universes. Same chunking, pool and rate limiter as fetch_prices; one
+    5d pass, since a 5d window already covers symbols with no bar yet today.
+    """
+    tickers = sorted({s.strip().upper() for s in symbols if isinstance(s, str) and s.strip()})
+    if not tickers:
+        return {}
+    quotes: Dict[str, Optional[Tuple[float, float]]] = {}
+    _run_chunks(list(chunk_iterable(tickers, CHUNK_SIZE)), "5d", time.monotonic() + deadline_seconds, quotes,
+                parse=_parse_last_two_closes)
+    return {sym: quotes.get(sym) for sym in tickers}
@@ -0,0 +1,118 @@
+# backend/utils/price_lookup.py
+"""
+One place to ask "what is this symbol worth right now" for valuation code.
+
+Prices come from the websocket manager's live cache (kept fresh by the price
+updater) whenever they are recent enough. Only symbols that are missing or too
+old are fetched from the provider, in one batched call, and those results are
+cached briefly so repeated dashboard refreshes don't refetch them.
+Every result carries its age so responses can say how fresh a valuation is.
+
+Each price also carries its quote currency. That comes from the quote/fundamentals
+layer (remembered for a week, it doesn't change); the symbol suffix is only a
+fallback for symbols that layer can't resolve.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from utils.cache import TTLCache
+from utils.currency import resolve_currency
+from utils.fetch_data import fetch_stock_quote
+from utils.market_hours import is_market_open
+from utils.price_engine import fetch_prices
+from utils import market_service
+
+logger = logging.getLogger(__name__)
+
+# Live-cache prices older than this are refetched. Closed markets barely move and the
+# updater polls them every 10 minutes, so their prices stay usable for longer.
+OPEN_MARKET_MAX_AGE_SECONDS = 180
+CLOSED_MARKET_MAX_AGE_SECONDS = 1800
+FALLBACK_DEADLINE_SECONDS = 8
+
+# symbol -> (price, fetched_at) for symbols the live cache couldn't serve
+_fallback_cache = TTLCache("fallback_prices", ttl=OPEN_MARKET_MAX_AGE_SECONDS, max_entries=5000)
+
+# Registered by websocket_manager: symbol -> (price, updated_at) or None
+_live_source: Optional[Callable[[str], Optional[Tuple[float, float]]]] = None
+
+
+def register_live_source(source: Callable[[str], Optional[Tuple[float, float]]]):
+    global _live_source
+    _live_source = source
+
+
+def currency_for(symbol: str) -> Optional[str]:
+    """Quote currency, asking the quote layer for listings the suffix can't settle (.L, .T, .DE, ...)."""
+    currency = resolve_currency(symbol)
+    if currency:
+        return currency
+    quote = fetch_stock_quote(symbol)  # records the currency it finds
+    return None if quote.get("error") else quote.get("currency")
+
+
+def max_age_for(symbol: str) -> float:
+    return OPEN_MARKET_MAX_AGE_SECONDS if is_market_open(symbol) else CLOSED_MARKET_MAX_AGE_SECONDS
+
+
+def _entry(price: float, updated_at: float, source: str, now: float) -> Dict:
+    return {
+        "price": price,
+        "age_seconds": round(max(0.0, now - updated_at), 1),
+        "source": source,
+    }
+
+
+async def get_prices(symbols: Iterable[str]) -> Dict[str, Dict]:
+    """
+    symbol -> {"price", "currency", "age_seconds", "source"} with source "live",
+    "fallback" (recently fetched here) or "provider" (fetched by this call).
+    Symbols with no price anywhere are left out.
+    """
+    now = time.time()
+    results: Dict[str, Dict] = {}
+    missing = []
+    for sym in {s.upper() for s in symbols if s}:
+        live = _live_source(sym) if _live_source is not None else None
+        if live is not None and now - live[1] <= max_age_for(sym):
+            results[sym] = _entry(live[0], live[1], "live", now)
+            continue
+        cached = _fallback_cache.get(sym)
+        if cached is not None:
+            results[sym] = _entry(cached[0], cached[1], "fallback", now)
+            continue
+        missing.append(sym)
+
+    if missing:
+        try:
+            fetched = await market_service.run_blocking(
+                fetch_prices, missing, deadline_seconds=FALLBACK_DEADLINE_SECONDS,
+                timeout=FALLBACK_DEADLINE_SECONDS + 2,
+            )
+        except market_service.MarketDataTimeout:
+            fetched = {}
+        fetched_at = time.time()
+        found = 0
+        for sym, price in fetched.items():
+            if price is None:
+                continue
+            _fallback_cache.set(sym, (price, fetched_at))
+            results[sym] = _entry(price, fetched_at, "provider", fetched_at)
+            found += 1
+        logger.info("Price lookup fetched %d of %d symbols the live cache couldn't serve", found, len(missing))
+
+    currencies = {sym: resolve_currency(sym) for sym in results}
+    unresolved = [sym for sym, currency in currencies.items() if currency is None]
+    if unresolved:
+        # Once per listing per week: the quote load records the currency in utils.currency
+        resolved = await asyncio.gather(
+            *(market_service.run_blocking(currency_for, sym) for sym in unresolved), return_exceptions=True)
+        for sym, currency in zip(unresolved, resolved):
+            currencies[sym] = currency if isinstance(currency, str) else None
+    for sym, entry in results.items():
+        if currencies[sym] is None:
+            logger.warning("No quote currency for %s; assuming USD", sym)
+        entry["currency"] = currencies[sym] or "USD"
+    return results
@@ -0,0 +1,140 @@
+# backend/utils/refresh_scheduler.py
+import heapq
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.market_hours import is_market_open
+
+# --- Refresh tiers (seconds) ---
+HOT_INTERVAL = 5            # many clients watching
+WATCHED_INTERVAL = 10       # at least one client subscribed
+HELD_INTERVAL = 60          # only held/watchlisted, nobody looking right now
+CLOSED_INTERVAL = 600       # exchange closed: price barely moves
+CLOSED_WATCHED_INTERVAL = 120
+HOT_SUBSCRIBERS = 10
+MIN_INTERVAL = 3
+MAX_INTERVAL = 900
+
+# Volatility scaling: a symbol moving REFERENCE_MOVE per refresh keeps its tier interval;
+# busier symbols refresh up to 2x faster, quiet ones up to 2x slower.
+REFERENCE_MOVE = 0.002
+VOL_EWMA_ALPHA = 0.3
+
+
+class RefreshScheduler:
+    """
+    Priority queue of symbols keyed by when they are next due for a price refresh.
+    Each symbol's interval comes from its tier (subscriber count, market open/closed)
+    scaled by an EWMA of its recent absolute returns between refreshes.
+    """
+
+    def __init__(self, subscriber_count: Callable[[str], int]):
+        self.subscriber_count = subscriber_count
+        self._heap: List[Tuple[float, str]] = []
+        self._due: Dict[str, float] = {}
+        self._last_fetched: Dict[str, float] = {}
+        self._last_price: Dict[str, float] = {}
+        self._volatility: Dict[str, float] = {}
+
+    def interval_for(self, symbol: str, now: Optional[float] = None) -> float:
+        subscribers = self.subscriber_count(symbol)
+        if not is_market_open(symbol):
+            # Someone looking at a closed market still sees after-hours quotes every couple of minutes
+            return CLOSED_INTERVAL if subscribers == 0 else CLOSED_WATCHED_INTERVAL
+        if subscribers >= HOT_SUBSCRIBERS:
+            base = HOT_INTERVAL
+        elif subscribers > 0:
+            base = WATCHED_INTERVAL
+        else:
+            base = HELD_INTERVAL
+
+        vol = self._volatility.get(symbol)
+        if vol:
+            base *= min(2.0, max(0.5, REFERENCE_MOVE / vol))
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, base))
+
+    def _schedule(self, symbol: str, due_at: float):
+        self._due[symbol] = due_at
+        heapq.heappush(self._heap, (due_at, symbol))
+
+    def sync(self, active: Set[str], now: Optional[float] = None):
+        """
+        Track exactly `active`: new symbols become due immediately, dropped ones are
+        forgotten, and a symbol whose tier just got faster (e.g. a client subscribed)
+        is pulled forward instead of waiting out its old interval.
+        """
+        now = now or time.monotonic()
+        for sym in list(self._due):
+            if sym not in active:
+                del self._due[sym]
+                self._last_fetched.pop(sym, None)
+                self._last_price.pop(sym, None)
+                self._volatility.pop(sym, None)
+        for sym in active:
+            due = self._due.get(sym)
+            if due is None:
+                self._schedule(sym, now)
+                continue
+            last = self._last_fetched.get(sym)
+            if last is not None:
+                sooner = last + self.interval_for(sym)
+                if sooner < due - 0.5:
+                    self._schedule(sym, sooner)
+        # Drop stale heap entries if lazy deletion let the heap grow well past the live set
+        if len(self._heap) > 4 * max(len(self._due), 16):
+            self._heap = [(due, sym) for sym, due in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """Symbols whose refresh time has passed, most overdue first, up to `limit`."""
+        now = now or time.monotonic()
+        due: List[str] = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            due_at, sym = heapq.heappop(self._heap)
+            if self._due.get(sym) != due_at:
+                continue  # superseded entry
+            due.append(sym)
+            # Keep it tracked until record() reschedules it; a failed fetch retries after HELD_INTERVAL
+            self._schedule(sym, now + HELD_INTERVAL)
+        return due
+
+    def record(self, prices: Dict[str, Optional[float]], now: Optional[float] = None):
+        """Feed fetched prices back: update volatility and schedule the next refresh."""
+        now = now or time.monotonic()
+        for sym, price in prices.items():
+            if sym not in self._due:
+                continue
+            previous = self._last_price.get(sym)
+            if price is not None and price > 0:
+                if previous:
+                    move = abs(math.log(price / previous))
+                    old = self._volatility.get(sym)
+                    self._volatility[sym] = move if old is None else (1 - VOL_EWMA_ALPHA) * old + VOL_EWMA_ALPHA * move
+                self._last_price[sym] = price
+            self._last_fetched[sym] = now
+            self._schedule(sym, now + self.interval_for(sym))
+
+    def next_due_in(self, now: Optional[float] = None) -> Optional[float]:
+        now = now or time.monotonic()
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
+
+    def snapshot(self, now: Optional[float] = None) -> List[Dict]:
+        now = now or time.monotonic()
+        return [
+            {
+                "symbol": sym,
+                "due_in": round(due - now, 1),
+                "interval": round(self.interval_for(sym), 1),
+                "subscribers": self.subscriber_count(sym),
+                "volatility": self._volatility.get(sym),
+            }
+            for sym, due in sorted(self._due.items(), key=lambda kv: kv[1])
+        ]
+
+    def symbols(self) -> Iterable[str]:
+        return self._due.keys()
@@ -1,6 +1,10 @@
 # backend/utils/simulate_nav.py
 import datetime
-import hashlib
+import threading
+import zlib
+from typing import Optional, Tuple
+
+import numpy as np
 
 # Centralized simulated funds data with categories
 SIMULATED_FUNDS_DATA = {
@@ -77,35 +81,150 @@ SIMULATED_FUNDS_DATA = {
     "BANDHAN-VALUE": {"name": "Bandhan Value Fund", "baseNav": 171.18, "category": "Contra & Value Funds"},
 }
 
-def get_simulated_nav(fund_id: str) -> float | None:
+# -------------------------
+# NAV engine
+# -------------------------
+# Every fund gets a seeded daily log-return series over business days since NAV_EPOCH,
+# scaled so its NAV on NAV_ANCHOR_DATE equals baseNav. The anchor is the engine's rollout
+# date: the hash-jitter NAVs before it stayed within ~1.5% of baseNav, so holdings valued
+# at baseNav carry over without a jump and only move with the path from then on. Don't
+# move it, or every simulated holding is repriced. A fund's draws depend only on
+# (NAV_SEED, fund id), so paths are identical across requests, processes and restarts,
+# and extending the calendar by a day only appends to them.
+NAV_SEED = 20240601
+NAV_EPOCH = datetime.date(2015, 1, 1)
+NAV_ANCHOR_DATE = datetime.date(2026, 10, 16)
+TRADING_DAYS_PER_YEAR = 252
+# Trailing-return windows for the fund catalog, in calendar days
+RETURN_WINDOWS = {"1m": 30, "1y": 365, "3y": 3 * 365}
+
+# Annual (drift, volatility) by category
+CATEGORY_DYNAMICS = {
+    "Index Funds": (0.11, 0.15),
+    "Midcap Funds": (0.15, 0.20),
+    "Smallcap Funds": (0.17, 0.24),
+    "Flexicap Funds": (0.13, 0.16),
+    "ELSS Funds": (0.13, 0.17),
+    "Contra & Value Funds": (0.13, 0.17),
+}
+DEFAULT_DYNAMICS = (0.12, 0.16)
+
+
+class NavEngine:
+    """All simulated NAV paths as one (fund, business day) matrix, built once per calendar day."""
+
+    def __init__(self, funds: dict, end: datetime.date):
+        self.fund_ids = list(funds)
+        self.row = {fund_id: i for i, fund_id in enumerate(self.fund_ids)}
+        self.built_for = end
+        self.epoch = np.datetime64(NAV_EPOCH, "D")
+        n = int(np.busday_count(self.epoch, np.datetime64(end, "D") + 1))
+        self.dates = np.busday_offset(self.epoch, np.arange(n), roll="forward")
+        anchor = int(np.busday_count(self.epoch, np.datetime64(NAV_ANCHOR_DATE, "D")))
+
+        returns = np.empty((len(self.fund_ids), n), dtype=np.float64)
+        for i, fund_id in enumerate(self.fund_ids):
+            drift, vol = CATEGORY_DYNAMICS.get(funds[fund_id].get("category"), DEFAULT_DYNAMICS)
+            rng = np.random.default_rng([NAV_SEED, zlib.crc32(fund_id.encode())])
+            daily_vol = vol / np.sqrt(TRADING_DAYS_PER_YEAR)
+            returns[i] = rng.normal(drift / TRADING_DAYS_PER_YEAR - daily_vol ** 2 / 2, daily_vol, n)
+        returns[:, 0] = 0.0
+        log_nav = np.cumsum(returns, axis=1)
+        base = np.array([funds[f]["baseNav"] for f in self.fund_ids], dtype=np.float64)
+        self.navs = base[:, None] * np.exp(log_nav - log_nav[:, [min(anchor, n - 1)]])
+        self._catalog = None
+
+    def index_on(self, day: datetime.date) -> int:
+        """Column of the last business day on or before `day` (O(1) via busday_count)."""
+        return min(int(np.busday_count(self.epoch, np.datetime64(day, "D") + 1)) - 1, len(self.dates) - 1)
+
+    def nav(self, fund_id: str, day: Optional[datetime.date] = None) -> Optional[float]:
+        row = self.row.get(fund_id)
+        if row is None:
+            return None
+        col = self.index_on(day) if day is not None else len(self.dates) - 1
+        return float(self.navs[row, col]) if col >= 0 else None
+
+    def history(self, fund_id: str, start: Optional[datetime.date] = None,
+                end: Optional[datetime.date] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(dates, navs) views for business days from `start` to `end`, inclusive."""
+        row = self.row[fund_id]
+        lo = 0 if start is None else max(int(np.busday_count(self.epoch, np.datetime64(start, "D"))), 0)
+        hi = len(self.dates) if end is None else self.index_on(end) + 1
+        return self.dates[lo:hi], self.navs[row, lo:hi]
+
+    def catalog(self) -> list:
+        """
+        Every fund with its latest NAV, trailing returns (3Y annualized) and 1Y annualized
+        volatility, computed for all funds at once from the matrix. Cached per engine,
+        i.e. once a day.
+        """
+        if self._catalog is not None:
+            return self._catalog
+        last = len(self.dates) - 1
+        latest = self.navs[:, last]
+        as_of = self.dates[last].astype(datetime.date)
+        returns = {}
+        for label, days in RETURN_WINDOWS.items():
+            col = self.index_on(as_of - datetime.timedelta(days=days))
+            growth = latest / self.navs[:, max(col, 0)]
+            if label == "3y":
+                growth = growth ** (365 / days)
+            returns[label] = np.round((growth - 1) * 100, 2)
+        year = self.navs[:, max(self.index_on(as_of - datetime.timedelta(days=365)), 0):]
+        volatility = np.round(np.diff(np.log(year), axis=1).std(axis=1) * np.sqrt(TRADING_DAYS_PER_YEAR) * 100, 2)
+
+        self._catalog = [
+            {
+                "id": fund_id,
+                "name": SIMULATED_FUNDS_DATA[fund_id]["name"],
+                "category": SIMULATED_FUNDS_DATA[fund_id].get("category", "Uncategorized"),
+                "baseNav": SIMULATED_FUNDS_DATA[fund_id]["baseNav"],
+                "nav": round(float(latest[i]), 2),
+                "returns": {label: float(values[i]) for label, values in returns.items()},
+                "volatility": float(volatility[i]),
+            }
+            for i, fund_id in enumerate(self.fund_ids)
+        ]
+        return self._catalog
+
+    def candles(self, fund_id: str, start: Optional[datetime.date] = None) -> Tuple[np.ndarray, ...]:
+        """
+        (dates, open, high, low, close) from `start` to today. A fund has one NAV a day,
+        so each candle opens at the previous NAV and closes at that day's.
+        """
+        dates, close = self.history(fund_id, start)
+        lo = len(self.dates) - len(close)
+        if lo > 0:
+            open_ = self.navs[self.row[fund_id], lo - 1:lo - 1 + len(close)]
+        else:
+            open_ = np.r_[close[:1], close[:-1]]
+        return dates, open_, np.maximum(open_, close), np.minimum(open_, close), close
+
+
+_engine: Optional[NavEngine] = None
+_engine_lock = threading.Lock()
+
+
+def nav_engine() -> NavEngine:
+    """The NAV matrix through today, rebuilt when the date changes."""
+    global _engine
+    today = datetime.date.today()
+    engine = _engine
+    if engine is None or engine.built_for != today:
+        with _engine_lock:
+            if _engine is None or _engine.built_for != today:
+                _engine = NavEngine(SIMULATED_FUNDS_DATA, today)
+            engine = _engine
+    return engine
+
+
+def get_simulated_nav(fund_id: str, on: Optional[datetime.date] = None) -> float | None:
     """
-    Generates a consistent, simulated NAV for a given fund ID based on the current date.
-    This ensures the NAV is the same for the entire day but changes the next day.
+    Simulated NAV for a fund on a date (default: today), from the NAV engine.
+    Weekends and holidays carry the previous business day's NAV.
     """
-    fund_details = SIMULATED_FUNDS_DATA.get(fund_id)
-    if not fund_details:
+    if fund_id not in SIMULATED_FUNDS_DATA:
         return None
-
-    base_nav = fund_details["baseNav"]
-    
-    # Create a seed from the fund ID and the current date to ensure consistency for the day
-    today_str = datetime.date.today().isoformat()
-    seed_str = f"{fund_id}-{today_str}"
-    
-    # Use a hash to generate a pseudo-random but deterministic number from the seed
-    hash_object = hashlib.sha256(seed_str.encode())
-    hash_hex = hash_object.hexdigest()
-    # Convert a part of the hash to an integer
-    hash_int = int(hash_hex[:8], 16)
-    
-    # Normalize the hash to a value between -1 and 1
-    max_hash_val = int('ffffffff', 16)
-    normalized_val = (hash_int / max_hash_val) * 2 - 1
-    
-    # Create a daily percentage change (e.g., between -1.5% and +1.5%)
-    daily_change_percent = normalized_val * 0.015 
-    
-    # Calculate and return the new NAV
-    simulated_nav = base_nav * (1 + daily_change_percent)
-    
-    return round(simulated_nav, 2)
\ No newline at end of file
+    nav = nav_engine().nav(fund_id, on)
+    return round(nav, 2) if nav is not None else None
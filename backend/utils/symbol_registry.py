@@ -0,0 +1,97 @@
+# backend/utils/symbol_registry.py
+import logging
+import time
+from collections import Counter
+from typing import Dict, Optional, Set
+
+from database import portfolio_collection, users_collection
+
+logger = logging.getLogger(__name__)
+
+# How often the in-memory counts are rebuilt from Mongo to heal any drift
+# (e.g. writes made by another process or a crash between update and increment).
+RECONCILE_INTERVAL_SECONDS = 600
+
+
+class SymbolRegistry:
+    """
+    Reference-counted set of symbols that are held in a portfolio or sit on a watchlist.
+    Each investment lot and each watchlist entry counts once; a symbol is active while
+    its count is above zero. Routes update it as they write, so the price updater can
+    read the active set without scanning every portfolio.
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self.last_reconciled: Optional[float] = None
+
+    @staticmethod
+    def _normalize(symbol) -> str:
+        return str(symbol or "").strip().upper()
+
+    @property
+    def seeded(self) -> bool:
+        return self.last_reconciled is not None
+
+    def add(self, symbol: str, count: int = 1):
+        key = self._normalize(symbol)
+        if key and count > 0:
+            self._counts[key] += count
+
+    def remove(self, symbol: str, count: int = 1):
+        key = self._normalize(symbol)
+        if not key or count <= 0:
+            return
+        remaining = self._counts.get(key, 0) - count
+        if remaining > 0:
+            self._counts[key] = remaining
+        else:
+            self._counts.pop(key, None)
+
+    def symbols(self) -> Set[str]:
+        return set(self._counts.keys())
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+    def replace(self, counts: Dict[str, int]):
+        fresh = Counter()
+        for sym, n in counts.items():
+            key = self._normalize(sym)
+            if key and n > 0:
+                fresh[key] += n
+        self._counts = fresh
+        self.last_reconciled = time.time()
+
+    def needs_reconcile(self) -> bool:
+        return not self.seeded or time.time() - self.last_reconciled >= RECONCILE_INTERVAL_SECONDS
+
+
+async def load_symbol_counts() -> Counter:
+    """Count investment lots and watchlist entries per symbol straight from Mongo."""
+    counts: Counter = Counter()
+
+    pipeline = [
+        {"$unwind": {"path": "$investments", "preserveNullAndEmptyArrays": False}},
+        {"$group": {"_id": "$investments.symbol", "count": {"$sum": 1}}},
+    ]
+    async for row in portfolio_collection.aggregate(pipeline):
+        if row.get("_id"):
+            counts[str(row["_id"]).strip().upper()] += row.get("count", 0)
+
+    async for user in users_collection.find({"watchlist": {"$exists": True, "$not": {"$size": 0}}}, {"watchlist": 1}):
+        for sym in user.get("watchlist") or []:
+            if sym:
+                counts[str(sym).strip().upper()] += 1
+
+    return counts
+
+
+async def reconcile_symbol_registry():
+    """Rebuild the registry from Mongo. Called once at startup and periodically after."""
+    counts = await load_symbol_counts()
+    symbol_registry.replace(counts)
+    logger.info("Symbol registry reconciled: %d active symbols", len(counts))
+
+
+symbol_registry = SymbolRegistry()
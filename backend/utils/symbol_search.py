@@ -0,0 +1,325 @@
+# backend/utils/symbol_search.py
+"""
+Local symbol master for /stocks/search.
+
+Tickers, names and exchanges come from SYMBOL_MASTER_FILE (reloaded when the file
+changes) plus the simulated mutual funds. Symbols and the words of each name are
+kept in sorted key lists, so a prefix match is two bisects; a trigram index finds
+typo candidates ("relaince", "microsft") without scanning every name. Results found
+through the remote fallback are learned into the index, so they are local next time.
+"""
+import bisect
+import csv
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import SYMBOL_MASTER_FILE
+from utils.simulate_nav import SIMULATED_FUNDS_DATA
+
+logger = logging.getLogger(__name__)
+
+RELOAD_CHECK_SECONDS = 60
+MAX_LEARNED_SYMBOLS = 2000  # remote results kept, least recently used evicted first
+MIN_FUZZY_LENGTH = 4        # shorter queries only match by prefix
+MAX_FUZZY_CANDIDATES = 12
+
+# Ranking: higher is better
+SCORE_EXACT_SYMBOL = 100
+SCORE_SYMBOL_PREFIX = 80
+SCORE_NAME_PREFIX = 65
+SCORE_WORD_PREFIX = 50
+SCORE_FUZZY = 30
+SCORE_PER_EDIT = 8
+FUND_PENALTY = 10           # equities first when a fund house shares the company's name
+
+_WORD = re.compile(r"[a-z0-9&]+")
+
+
+def exchange_of(symbol: str) -> str:
+    if symbol.endswith(".NS"):
+        return "NSE"
+    if symbol.endswith(".BO"):
+        return "BSE"
+    if symbol.endswith("-USD"):
+        return "CRYPTO"
+    return "US"
+
+
+def _trigrams(word: str) -> set:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (returning limit + 1) once it must exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class SymbolIndex:
+    def __init__(self, entries: Iterable[Dict]):
+        # Slots are never reused or shifted, so key lists can refer to entries by position
+        self.entries: List[Optional[Dict]] = []
+        self._positions: Dict[str, int] = {}
+        self._symbols: List[Tuple[str, int]] = []
+        self._words: List[Tuple[str, int]] = []
+        self._names: List[Tuple[str, int]] = []
+        self._word_entries: Dict[str, List[int]] = defaultdict(list)
+        self._trigram_words: Dict[str, set] = defaultdict(set)
+        for entry in entries:
+            if entry["symbol"] not in self._positions:
+                i = self._positions[entry["symbol"]] = len(self.entries)
+                self.entries.append(entry)
+                symbols, words, name = self._keys(entry)
+                self._symbols.extend((key, i) for key in symbols)
+                self._words.extend((word, i) for word in words)
+                self._names.append((name, i))
+        self._symbols.sort()
+        self._words.sort()
+        self._names.sort()
+        for word, i in self._words:
+            self._word_entries[word].append(i)
+        for word in self._word_entries:
+            self._index_trigrams(word)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        i = self._positions.get(symbol)
+        return None if i is None else self.entries[i]
+
+    @staticmethod
+    def _keys(entry: Dict) -> Tuple[List[str], set, str]:
+        """(symbol keys, name words, full name) an entry is found under."""
+        symbol = entry["symbol"].lower()
+        symbols = [symbol]
+        # "reliance.ns" is also found as "reliance", "btc-usd" as "btc"; fund ids are kept whole
+        base = symbol if entry["type"] == "MUTUALFUND" else re.split(r"[.\-=]", symbol)[0]
+        if base and base != symbol:
+            symbols.append(base)
+        name = entry["name"].lower()
+        return symbols, set(_WORD.findall(name)) | {base}, name
+
+    def _index_trigrams(self, word: str):
+        if len(word) >= MIN_FUZZY_LENGTH - 1:
+            for gram in _trigrams(word):
+                self._trigram_words[gram].add(word)
+
+    def add(self, entry: Dict):
+        """Insert one entry in place (a bisect insert per key), keeping every list sorted."""
+        if entry["symbol"] in self._positions:
+            return
+        i = self._positions[entry["symbol"]] = len(self.entries)
+        self.entries.append(entry)
+        symbols, words, name = self._keys(entry)
+        for key in symbols:
+            bisect.insort(self._symbols, (key, i))
+        for word in words:
+            bisect.insort(self._words, (word, i))
+            if not self._word_entries[word]:
+                self._index_trigrams(word)
+            self._word_entries[word].append(i)
+        bisect.insort(self._names, (name, i))
+
+    def remove(self, symbol: str):
+        i = self._positions.pop(symbol, None)
+        if i is None:
+            return
+        symbols, words, name = self._keys(self.entries[i])
+        self.entries[i] = None
+        for keys, values in ((self._symbols, symbols), (self._words, words), (self._names, [name])):
+            for key in values:
+                at = bisect.bisect_left(keys, (key, i))
+                if at < len(keys) and keys[at] == (key, i):
+                    del keys[at]
+        for word in words:
+            self._word_entries[word].remove(i)
+            if not self._word_entries[word]:
+                del self._word_entries[word]
+                for gram in _trigrams(word):
+                    self._trigram_words[gram].discard(word)
+
+    @staticmethod
+    def _prefixed(keys: List[Tuple[str, int]], prefix: str) -> List[Tuple[str, int]]:
+        lo = bisect.bisect_left(keys, (prefix, -1))
+        hi = bisect.bisect_left(keys, (prefix + "\uffff", -1))
+        return keys[lo:hi]
+
+    def _fuzzy_words(self, token: str) -> List[Tuple[str, int]]:
+        """(indexed word, edits) for words within 1-2 edits of `token` or of its leading part."""
+        counts: Dict[str, int] = defaultdict(int)
+        for gram in _trigrams(token):
+            for word in self._trigram_words.get(gram, ()):
+                counts[word] += 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:MAX_FUZZY_CANDIDATES]
+        limit = 1 if len(token) < 7 else 2
+        matches = []
+        for word in candidates:
+            # Longer words are compared on their leading part, so "microsft" still finds "microsoft"
+            target = word if len(word) <= len(token) + limit else word[:len(token)]
+            edits = _edit_distance(token, target, limit)
+            if edits <= limit:
+                matches.append((word, edits))
+        return matches
+
+    def search(self, query: str, limit: int = 7) -> List[Dict]:
+        q = query.strip().lower()
+        tokens = _WORD.findall(q)
+        if not q or not tokens:
+            return []
+        scores: Dict[int, float] = {}
+
+        def offer(i: int, score: float):
+            if score > scores.get(i, -1):
+                scores[i] = score
+
+        for key, i in self._prefixed(self._symbols, q):
+            offer(i, SCORE_EXACT_SYMBOL if key == q else SCORE_SYMBOL_PREFIX - min(len(key) - len(q), 10))
+        for name, i in self._prefixed(self._names, q):
+            offer(i, SCORE_NAME_PREFIX)
+
+        # Every query word must prefix-match (or, failing that, fuzzily match) a word of the name
+        per_token: List[Dict[int, float]] = []
+        for token in tokens:
+            hits: Dict[int, float] = {}
+            for word, i in self._prefixed(self._words, token):
+                hits[i] = max(hits.get(i, 0), SCORE_WORD_PREFIX - (0 if word == token else 5))
+            if not hits and len(token) >= MIN_FUZZY_LENGTH:
+                for word, edits in self._fuzzy_words(token):
+                    for i in self._word_entries.get(word, ()):
+                        hits[i] = max(hits.get(i, 0), SCORE_FUZZY - edits * SCORE_PER_EDIT)
+            per_token.append(hits)
+        common = set(per_token[0]).intersection(*per_token[1:])
+        for i in common:
+            offer(i, min(hits[i] for hits in per_token))
+
+        for i in scores:
+            if self.entries[i]["type"] == "MUTUALFUND":
+                scores[i] -= FUND_PENALTY
+        ranked = sorted(scores, key=lambda i: (-scores[i], len(self.entries[i]["symbol"]), self.entries[i]["symbol"]))
+        return [self.entries[i] for i in ranked[:limit]]
+
+
+# -------------------------
+# Symbol master
+# -------------------------
+def _load_master(path: str) -> List[Dict]:
+    entries = []
+    try:
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                symbol = (row.get("symbol") or "").strip().upper()
+                if not symbol:
+                    continue
+                entries.append({
+                    "symbol": symbol,
+                    "name": (row.get("name") or symbol).strip(),
+                    "exchange": (row.get("exchange") or "").strip() or exchange_of(symbol),
+                    "type": (row.get("type") or "").strip() or "EQUITY",
+                })
+    except OSError as e:
+        logger.warning("Symbol master %s unreadable: %s", path, e)
+    return entries
+
+
+def _fund_entries() -> List[Dict]:
+    return [
+        {"symbol": fund_id, "name": details["name"], "exchange": "MF", "type": "MUTUALFUND"}
+        for fund_id, details in SIMULATED_FUNDS_DATA.items()
+    ]
+
+
+class SymbolSearch:
+    """
+    The current SymbolIndex, rebuilt when the master file changes. Remote results are
+    added to (and, past MAX_LEARNED_SYMBOLS, evicted from) the live index in place.
+    """
+
+    def __init__(self, path: str = SYMBOL_MASTER_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._learned: "OrderedDict[str, Dict]" = OrderedDict()   # LRU order, oldest first
+        self._index: Optional[SymbolIndex] = None
+        self.searches = 0
+        self.remote_fallbacks = 0
+
+    def _mtime_now(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def _rebuild(self):
+        master = _load_master(self.path)
+        self._index = SymbolIndex(master + _fund_entries() + list(self._learned.values()))
+        logger.info("Symbol index built: %d symbols", len(self._index))
+
+    def index(self) -> SymbolIndex:
+        now = time.monotonic()
+        if self._index is None or now - self._checked_at >= RELOAD_CHECK_SECONDS:
+            with self._lock:
+                self._checked_at = now
+                mtime = self._mtime_now()
+                if self._index is None or mtime != self._mtime:
+                    self._mtime = mtime
+                    self._rebuild()
+        return self._index
+
+    def search(self, query: str, limit: int = 7) -> List[Dict]:
+        self.searches += 1
+        results = self.index().search(query, limit)
+        learned = [e["symbol"] for e in results if e["symbol"] in self._learned]
+        if learned:
+            with self._lock:
+                for symbol in learned:
+                    if symbol in self._learned:
+                        self._learned.move_to_end(symbol)
+        return results
+
+    def record_fallback(self):
+        self.remote_fallbacks += 1
+
+    def learn(self, entries: Iterable[Dict]):
+        """Add symbols found through the remote search so later lookups stay local."""
+        index = self.index()
+        with self._lock:
+            for entry in entries:
+                if index.get(entry["symbol"]) is not None:
+                    continue
+                self._learned[entry["symbol"]] = entry
+                index.add(entry)
+            while len(self._learned) > MAX_LEARNED_SYMBOLS:
+                symbol, entry = self._learned.popitem(last=False)
+                # The master file may have picked the symbol up since; leave its entry alone
+                if index.get(symbol) is entry:
+                    index.remove(symbol)
+
+    def stats(self) -> Dict:
+        index = self._index
+        return {
+            "symbols": len(index) if index else 0,
+            "learned": len(self._learned),
+            "searches": self.searches,
+            "remote_fallbacks": self.remote_fallbacks,
+            "master_file": self.path,
+        }
+
+
+symbol_search = SymbolSearch()
@@ -0,0 +1,130 @@
+# backend/utils/tick_store.py
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# --- Tuning ---
+TICK_BUFFER_SIZE = 4096     # ticks kept per symbol; ~11h at the 10s watched cadence, 128 KB per symbol
+BAR_INTERVALS = {"1m": 60, "5m": 300}
+
+
+class TickRing:
+    """Fixed-size ring of (epoch seconds, price) held in two preallocated float64 arrays."""
+
+    def __init__(self, capacity: int = TICK_BUFFER_SIZE):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.head = 0       # next slot to write
+        self.count = 0
+
+    def append(self, ts: float, price: float):
+        if self.count and ts < self.last_ts:
+            return  # out-of-order tick (e.g. a late bus message); keep the buffer sorted
+        self.ts[self.head] = ts
+        self.price[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    @property
+    def last_ts(self) -> float:
+        return self.ts[(self.head - 1) % self.capacity]
+
+    def window(self, since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Chronological (ts, price) arrays, optionally from `since` onwards."""
+        if self.count < self.capacity:
+            ts, price = self.ts[:self.count], self.price[:self.count]
+        else:
+            ts = np.concatenate((self.ts[self.head:], self.ts[:self.head]))
+            price = np.concatenate((self.price[self.head:], self.price[:self.head]))
+        if since is not None:
+            start = int(np.searchsorted(ts, since, side="left"))
+            ts, price = ts[start:], price[start:]
+        return ts, price
+
+    def bars(self, interval_seconds: int, since: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """OHLC bars aggregated from the ticks: one bar per interval bucket that saw a tick."""
+        ts, price = self.window(since)
+        if len(ts) == 0:
+            empty = np.empty(0)
+            return {"time": empty.astype(np.int64), "open": empty, "high": empty, "low": empty, "close": empty}
+        buckets = (ts // interval_seconds).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        return {
+            "time": buckets[starts] * interval_seconds,
+            "open": price[starts],
+            "high": np.maximum.reduceat(price, starts),
+            "low": np.minimum.reduceat(price, starts),
+            "close": price[ends],
+        }
+
+
+class TickStore:
+    """
+    Per-symbol tick rings fed by the price updater, so intraday charts and
+    bar streams are served from memory without calling the provider.
+    """
+
+    def __init__(self, capacity: int = TICK_BUFFER_SIZE):
+        self.capacity = capacity
+        self._rings: Dict[str, TickRing] = {}
+
+    def record(self, prices: Dict[str, Optional[float]], ts: Optional[float] = None) -> List[str]:
+        """Append one tick per known price. Returns the symbols that got a tick."""
+        ts = ts or time.time()
+        recorded = []
+        for sym, price in prices.items():
+            if price is None:
+                continue
+            ring = self._rings.get(sym)
+            if ring is None:
+                ring = self._rings[sym] = TickRing(self.capacity)
+            ring.append(ts, price)
+            recorded.append(sym)
+        return recorded
+
+    def drop(self, symbols: Iterable[str]):
+        for sym in symbols:
+            self._rings.pop(sym, None)
+
+    def has(self, symbol: str) -> bool:
+        return symbol in self._rings
+
+    def ticks(self, symbol: str, since: Optional[float] = None) -> List[Dict]:
+        ring = self._rings.get(symbol)
+        if ring is None:
+            return []
+        ts, price = ring.window(since)
+        return [{"time": int(t), "value": float(p)} for t, p in zip(ts, price)]
+
+    def bars(self, symbol: str, interval: str, since: Optional[float] = None) -> List[Dict]:
+        """Bars in Lightweight Charts shape: [{time, open, high, low, close}], time in epoch seconds."""
+        ring = self._rings.get(symbol)
+        if ring is None:
+            return []
+        cols = ring.bars(BAR_INTERVALS[interval], since)
+        return [
+            {"time": int(t), "open": float(o), "high": float(h), "low": float(l), "close": float(c)}
+            for t, o, h, l, c in zip(cols["time"], cols["open"], cols["high"], cols["low"], cols["close"])
+        ]
+
+    def last_bar(self, symbol: str, interval: str) -> Optional[Dict]:
+        """The bar the latest tick falls in; only that bucket's ticks are aggregated."""
+        ring = self._rings.get(symbol)
+        if ring is None or ring.count == 0:
+            return None
+        seconds = BAR_INTERVALS[interval]
+        bars = self.bars(symbol, interval, since=(ring.last_ts // seconds) * seconds)
+        return bars[-1] if bars else None
+
+    def stats(self) -> Dict:
+        return {
+            "symbols": len(self._rings),
+            "ticks": sum(ring.count for ring in self._rings.values()),
+            "bytes": sum(ring.ts.nbytes + ring.price.nbytes for ring in self._rings.values()),
+        }
+
+
+tick_store = TickStore()
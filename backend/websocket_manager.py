@@ -3,55 +3,242 @@
 import asyncio
 import json
 import logging
-import math
+import struct
 import time
+from collections import deque
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Set, Iterable
+from typing import Dict, List, Optional, Set, Tuple
 
-import pandas as pd
-import yfinance as yf
 from fastapi import WebSocket
 
 # Ensure these imports match your project structure
-from database import portfolio_collection, users_collection
 from routes.portfolio import SIMULATED_MF_IDS
+from utils.symbol_registry import symbol_registry, reconcile_symbol_registry
+from utils.price_engine import fetch_prices
+from utils.refresh_scheduler import RefreshScheduler
+from utils.tick_store import tick_store, BAR_INTERVALS
+from utils.price_lookup import register_live_source
+from utils.price_bus import create_price_bus, RECONNECT_DELAY_SECONDS
+from config import PRICE_BUS_TRANSPORT, PRICE_BUS_SOCKET_PATH, PRICE_BUS_LOCK_PATH
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("websocket_manager")
 
+# -------------------------
+# Per-connection outbound channel
+# -------------------------
+OUTBOUND_QUEUE_SIZE = 8         # queued messages per client before ticks get coalesced
+SEND_TIMEOUT_SECONDS = 5.0      # a single send stuck longer than this evicts the client
+LAG_SAMPLES = 200               # rolling window for per-connection lag percentiles
+
+# Binary price frames (opt in with /ws?encoding=binary), little-endian:
+#   header:  uint8 frame type (1 = prices), uint8 mode (0 = delta, 1 = snapshot), uint32 seq, uint16 count
+#   records: count x (uint16 symbol id, float64 price); NaN means the price is unknown
+# Ids come from {"type": "symbols", "ids": {"AAPL": 0, ...}} text messages, sent for
+# each symbol before the first frame that can carry it. Ids are never reused.
+BINARY_PRICES = 1
+BINARY_MODES = {"delta": 0, "snapshot": 1}
+MAX_SYMBOL_IDS = 0x10000
+_BIN_HEADER = struct.Struct("<BBIH")
+_BIN_RECORD = struct.Struct("<Hd")
+
+class ClientConnection:
+    """
+    One websocket plus its bounded outbound queue and writer task.
+    Producers never await the socket: they enqueue and return. The writer task
+    drains the queue with a send timeout, so a slow client only delays itself.
+    When the queue is full, queued price ticks are coalesced into a single
+    snapshot that is rendered from the live cache at send time.
+    """
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager", binary: bool = False):
+        self.websocket = websocket
+        self.manager = manager
+        # Price messages go out as packed binary frames instead of JSON text
+        self.binary = binary
+        self.subscriptions: Set[str] = set()
+        # (symbol, interval) pairs this client streams live OHLC bars for
+        self.bar_subscriptions: Set[Tuple[str, str]] = set()
+        # Last sequence number sent on this connection; clients detect gaps with it
+        self.seq = 0
+        # Items: (kind, body, mode, enqueued_at) with kind in
+        # {"control", "text", "error", "prices", "snapshot", "bar"}; a "control" body is the
+        # message dict (mode is its type), a "prices" body is a JSON data map, or packed
+        # records for binary connections
+        self.queue: deque = deque()
+        self._wakeup = asyncio.Event()
+        self.writer_task: Optional[asyncio.Task] = None
+        self.closed = False
+        # Stats
+        self.sent = 0
+        self.coalesced = 0
+        self.lag_samples: deque = deque(maxlen=LAG_SAMPLES)
+        self.connected_at = time.monotonic()
+
+    def start(self):
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def enqueue_text(self, text: str):
+        self._enqueue(("text", text, None, time.monotonic()))
+
+    def enqueue_control(self, message: Dict):
+        """hello / symbols / subscribed: the client's view of the stream depends on these, so they are never dropped."""
+        self._enqueue(("control", message, message["type"], time.monotonic()))
+
+    def enqueue_error(self, message: str):
+        self._enqueue(("error", json.dumps({"type": "error", "message": message}), None, time.monotonic()))
+
+    def enqueue_prices(self, data, mode: str = "delta"):
+        self._enqueue(("prices", data, mode, time.monotonic()))
+
+    def enqueue_bar(self, text: str):
+        self._enqueue(("bar", text, None, time.monotonic()))
+
+    def enqueue_snapshot(self):
+        self._enqueue(("snapshot", None, "snapshot", time.monotonic()))
+
+    def _enqueue(self, item):
+        if self.closed:
+            return
+        if len(self.queue) >= OUTBOUND_QUEUE_SIZE:
+            self._coalesce()
+        self.queue.append(item)
+        self._wakeup.set()
+
+    def _coalesce(self):
+        """
+        Replace every queued price message with one snapshot, drop queued bar updates
+        (the next one supersedes them) and errors. Control messages are merged, never
+        dropped: symbol-id dictionaries into one (at the first one's place, so it still
+        precedes every frame), "subscribed" lists down to the latest. Broadcasts are kept.
+        If nothing could be dropped the queue stays over its bound; a client that has
+        stopped reading is evicted by the writer's send timeout.
+        """
+        last_subscribed = max((i for i, item in enumerate(self.queue)
+                               if item[0] == "control" and item[2] == "subscribed"), default=None)
+        kept: deque = deque()
+        ids: Optional[Dict[str, int]] = None
+        for i, item in enumerate(self.queue):
+            kind, body, mode, enqueued_at = item
+            if kind == "text":
+                kept.append(item)
+            elif kind == "control" and mode == "symbols":
+                if ids is None:
+                    ids = dict(body["ids"])
+                    kept.append(("control", {"type": "symbols", "ids": ids}, "symbols", enqueued_at))
+                else:
+                    ids.update(body["ids"])
+            elif kind == "control" and (mode != "subscribed" or i == last_subscribed):
+                kept.append(item)
+        dropped = len(self.queue) - len(kept)
+        had_prices = any(item[0] in ("prices", "snapshot") for item in self.queue)
+        oldest = self.queue[0][3] if self.queue else time.monotonic()
+        self.queue = kept
+        self.coalesced += dropped
+        if had_prices:
+            self.queue.append(("snapshot", None, "snapshot", oldest))
+
+    def _render(self, item):
+        kind, body, mode, _ = item
+        if kind == "control":
+            return json.dumps(body)
+        if kind in ("text", "error", "bar"):
+            return body
+        if kind == "snapshot":
+            cache = self.manager.cached_prices
+            symbols = [s for s in self.subscriptions if s in cache]
+            if self.binary:
+                body = self.manager.pack_prices(symbols, cache)
+            else:
+                body = json.dumps({s: cache[s] for s in symbols})
+        self.seq += 1
+        if self.binary:
+            count = len(body) // _BIN_RECORD.size
+            return _BIN_HEADER.pack(BINARY_PRICES, BINARY_MODES[mode], self.seq, count) + body
+        return (
+            f'{{"type": "live_prices", "mode": "{mode}", "seq": {self.seq}, '
+            f'"last_updated": {json.dumps(self.manager.last_updated)}, "data": {body}}}'
+        )
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                item = self.queue.popleft()
+                frame = self._render(item)
+                send = self.websocket.send_bytes if isinstance(frame, bytes) else self.websocket.send_text
+                try:
+                    await asyncio.wait_for(send(frame), SEND_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    logger.info("Evicting websocket stuck for more than %.1fs on send", SEND_TIMEOUT_SECONDS)
+                    break
+                except Exception as e:
+                    logger.info("Removing connection due to send error: %s", e)
+                    break
+                self.sent += 1
+                self.lag_samples.append(time.monotonic() - item[3])
+        except asyncio.CancelledError:
+            pass
+        if not self.closed:
+            await self.manager.evict(self.websocket)
+
+    def stats(self) -> Dict:
+        lags = sorted(self.lag_samples)
+        def pct(p):
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 2) if lags else None
+        return {
+            "subscriptions": len(self.subscriptions),
+            "bar_subscriptions": len(self.bar_subscriptions),
+            "encoding": "binary" if self.binary else "json",
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "seq": self.seq,
+            "lag_ms_last": round(self.lag_samples[-1] * 1000, 2) if self.lag_samples else None,
+            "lag_ms_p50": pct(0.50),
+            "lag_ms_p99": pct(0.99),
+            "connected_seconds": round(time.monotonic() - self.connected_at, 1),
+        }
+
 # -------------------------
 # Connection Manager
 # -------------------------
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self.clients: Dict[WebSocket, ClientConnection] = {}
         # Cache: symbol -> price (or None if unknown)
         self.cached_prices: Dict[str, Optional[float]] = {}
         self.last_updated: Optional[str] = None
+        # symbol -> epoch seconds of its last successful refresh (moved or not), for price age
+        self.price_updated_at: Dict[str, float] = {}
+        # Reverse subscription index symbol -> connections, so a tick only touches interested sockets.
+        self.symbol_subscribers: Dict[str, Set[WebSocket]] = {}
+        # symbol -> connections streaming live bars for it
+        self.bar_subscribers: Dict[str, Set[WebSocket]] = {}
+        # Stable symbol -> uint16 id for binary connections
+        self.symbol_ids: Dict[str, int] = {}
 
     async def connect(self, websocket: WebSocket):
-        """Accept connection and immediately send last cached prices (if any)."""
+        """
+        Accept connection, start its writer and send a hello. Prices follow once the client subscribes.
+        Clients connecting with ?encoding=binary get packed price frames (see BINARY_PRICES).
+        """
         await websocket.accept()
+        query = getattr(websocket, "query_params", None) or {}
+        binary = str(query.get("encoding", "")).lower() == "binary"
+        client = ClientConnection(websocket, self, binary=binary)
         self.active_connections.append(websocket)
-
+        self.clients[websocket] = client
+        client.start()
         # Send a quick hello to confirm connection
-        try:
-            await websocket.send_text(json.dumps({"type": "hello", "message": "connected"}))
-        except Exception as e:
-            logger.debug("Failed to send hello to new connection: %s", e)
-
-        # Send cached prices immediately so client doesn't wait for next update loop
-        if self.cached_prices:
-            payload = {
-                "type": "live_prices",
-                "data": self.cached_prices,
-                "last_updated": self.last_updated,
-            }
-            try:
-                await websocket.send_text(json.dumps(payload))
-            except Exception as e:
-                logger.error("Error sending initial cached prices: %s", e)
+        client.enqueue_control({
+            "type": "hello", "message": "connected", "encoding": "binary" if binary else "json",
+        })
 
     def disconnect(self, websocket: WebSocket):
         try:
@@ -59,197 +246,371 @@ class ConnectionManager:
                 self.active_connections.remove(websocket)
         except ValueError:
             pass
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        client.closed = True
+        client._wakeup.set()
+        for sym in client.subscriptions:
+            subscribers = self.symbol_subscribers.get(sym)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.symbol_subscribers[sym]
+        for sym, _ in client.bar_subscriptions:
+            subscribers = self.bar_subscribers.get(sym)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.bar_subscribers[sym]
+
+    async def evict(self, websocket: WebSocket):
+        """Drop a connection that errored or stayed stuck, and close the socket."""
+        self.disconnect(websocket)
+        try:
+            await websocket.close(code=1008)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _normalize_symbols(symbols) -> Set[str]:
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        normalized = set()
+        for s in symbols or []:
+            if isinstance(s, str) and s.strip():
+                normalized.add(s.strip().upper())
+        return normalized
+
+    def symbol_id(self, symbol: str) -> Optional[int]:
+        """Id of `symbol` in binary frames, assigning the next free one. None once ids run out."""
+        sid = self.symbol_ids.get(symbol)
+        if sid is None and len(self.symbol_ids) < MAX_SYMBOL_IDS:
+            sid = len(self.symbol_ids)
+            self.symbol_ids[symbol] = sid
+        return sid
+
+    def pack_prices(self, symbols, prices: Dict[str, Optional[float]], packed: Optional[Dict[str, bytes]] = None) -> bytes:
+        """
+        Binary records for `symbols`. `packed` caches per-symbol records so one tick
+        packs each symbol once however many connections carry it.
+        """
+        if packed is None:
+            packed = {}
+        parts = []
+        for sym in symbols:
+            record = packed.get(sym)
+            if record is None:
+                price = prices.get(sym)
+                record = _BIN_RECORD.pack(self.symbol_ids[sym], float("nan") if price is None else price)
+                packed[sym] = record
+            parts.append(record)
+        return b"".join(parts)
+
+    def subscribe(self, websocket: WebSocket, symbols) -> Set[str]:
+        """Add symbols to a connection's subscription set. Returns the newly added symbols."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return set()
+        added = self._normalize_symbols(symbols) - client.subscriptions
+        if client.binary:
+            # A binary client can only receive symbols that have an id
+            added = {sym for sym in added if self.symbol_id(sym) is not None}
+        for sym in added:
+            client.subscriptions.add(sym)
+            self.symbol_subscribers.setdefault(sym, set()).add(websocket)
+        return added
+
+    def unsubscribe(self, websocket: WebSocket, symbols) -> Set[str]:
+        """Remove symbols from a connection's subscription set. Returns the removed symbols."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return set()
+        removed = self._normalize_symbols(symbols) & client.subscriptions
+        for sym in removed:
+            client.subscriptions.discard(sym)
+            subscribers = self.symbol_subscribers.get(sym)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.symbol_subscribers[sym]
+        return removed
+
+    def subscribe_bars(self, websocket: WebSocket, symbols, interval: str) -> Set[str]:
+        """Stream live `interval` bars for symbols to a connection. Returns the newly added symbols."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return set()
+        added = {s for s in self._normalize_symbols(symbols) if (s, interval) not in client.bar_subscriptions}
+        for sym in added:
+            client.bar_subscriptions.add((sym, interval))
+            self.bar_subscribers.setdefault(sym, set()).add(websocket)
+        return added
+
+    def unsubscribe_bars(self, websocket: WebSocket, symbols, interval: str):
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        for sym in self._normalize_symbols(symbols):
+            client.bar_subscriptions.discard((sym, interval))
+            if any(s == sym for s, _ in client.bar_subscriptions):
+                continue  # still streaming another interval for it
+            subscribers = self.bar_subscribers.get(sym)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.bar_subscribers[sym]
+
+    def subscribed_symbols(self) -> Set[str]:
+        """Symbols at least one connected client is currently subscribed to (prices or bars)."""
+        return set(self.symbol_subscribers.keys()) | set(self.bar_subscribers.keys())
+
+    def subscriber_count(self, symbol: str) -> int:
+        """Connections on this worker watching `symbol`, by prices or bars."""
+        return len(self.symbol_subscribers.get(symbol, set()) | self.bar_subscribers.get(symbol, set()))
+
+    async def handle_client_message(self, websocket: WebSocket, text: str):
+        """
+        Handle a control message from a client. Supported actions:
+          {"action": "subscribe", "symbols": ["AAPL", "TCS.NS"]}
+          {"action": "unsubscribe", "symbols": ["AAPL"]}
+          {"action": "snapshot"}   -> full state of all subscribed symbols (after a seq gap)
+          {"action": "subscribe_bars", "symbols": ["AAPL"], "interval": "1m"}   -> "bar" messages
+          {"action": "unsubscribe_bars", "symbols": ["AAPL"], "interval": "1m"}
+        Anything else is answered with an error message and otherwise ignored.
+        """
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        try:
+            message = json.loads(text)
+            action = message.get("action")
+            symbols = message.get("symbols", [])
+        except Exception:
+            client.enqueue_error("Invalid JSON message")
+            return
+
+        if action == "subscribe":
+            added = self.subscribe(websocket, symbols)
+            if client.binary and added:
+                # Dictionary entries go out ahead of any frame that references them
+                client.enqueue_control({"type": "symbols", "ids": {s: self.symbol_ids[s] for s in sorted(added)}})
+            client.enqueue_control({"type": "subscribed", "symbols": sorted(client.subscriptions)})
+            # Send what we already know for the new symbols so the client doesn't wait a full cycle
+            initial = [s for s in added if s in self.cached_prices]
+            if initial and client.binary:
+                client.enqueue_prices(self.pack_prices(initial, self.cached_prices), mode="delta")
+            elif initial:
+                client.enqueue_prices(json.dumps({s: self.cached_prices[s] for s in initial}), mode="delta")
+        elif action == "unsubscribe":
+            self.unsubscribe(websocket, symbols)
+            client.enqueue_control({"type": "subscribed", "symbols": sorted(client.subscriptions)})
+        elif action == "snapshot":
+            client.enqueue_snapshot()
+        elif action in ("subscribe_bars", "unsubscribe_bars"):
+            interval = message.get("interval", "1m")
+            if interval not in BAR_INTERVALS:
+                client.enqueue_error(f"Unknown bar interval: {interval}")
+            elif action == "subscribe_bars":
+                self.subscribe_bars(websocket, symbols, interval)
+            else:
+                self.unsubscribe_bars(websocket, symbols, interval)
+        else:
+            client.enqueue_error(f"Unknown action: {action}")
 
     async def broadcast(self, payload: Dict):
-        """Broadcast a JSON-serializable payload to all active websockets (non-blocking)."""
+        """Queue a JSON-serializable payload for every active websocket. Serialized once."""
         text = json.dumps(payload)
-        # iterate over a shallow copy to prevent modification during iteration
-        for conn in list(self.active_connections):
-            try:
-                await conn.send_text(text)
-            except Exception as e:
-                logger.info("Removing connection due to send error: %s", e)
-                self.disconnect(conn)
-
-    def update_cache(self, prices: Dict[str, Optional[float]]):
+        for client in list(self.clients.values()):
+            client.enqueue_text(text)
+
+    async def broadcast_prices(self, changed: Dict[str, Optional[float]]):
+        """
+        Queue for each connection the changed prices among the symbols it subscribed to.
+        The data map is serialized once per distinct subscription slice, so clients
+        watching the same symbols share the JSON work; binary connections join
+        per-symbol records that are packed once per tick. Connections whose symbols
+        didn't move get nothing (and their sequence number doesn't advance).
+        Enqueueing never waits on a socket; each connection's writer does the sending.
+        """
+        # Only symbols that someone subscribed to need to be considered at all
+        touched: Dict[WebSocket, None] = {}
+        for sym in changed:
+            for conn in self.symbol_subscribers.get(sym, ()):
+                touched[conn] = None
+
+        serialized: Dict[tuple, object] = {}
+        packed: Dict[str, bytes] = {}
+        for conn in touched:
+            client = self.clients.get(conn)
+            if client is None:
+                continue
+            key = (client.binary, frozenset(s for s in client.subscriptions if s in changed))
+            data = serialized.get(key)
+            if data is None:
+                if client.binary:
+                    data = self.pack_prices(key[1], changed, packed)
+                else:
+                    data = json.dumps({s: changed[s] for s in key[1]})
+                serialized[key] = data
+            client.enqueue_prices(data, mode="delta")
+
+    async def broadcast_bars(self, symbols):
+        """
+        Queue the current bar of each updated symbol for connections streaming it.
+        Each (symbol, interval) bar is aggregated and serialized once.
+        """
+        rendered: Dict[Tuple[str, str], Optional[str]] = {}
+        for sym in symbols:
+            for conn in self.bar_subscribers.get(sym, ()):
+                client = self.clients.get(conn)
+                if client is None:
+                    continue
+                for interval in BAR_INTERVALS:
+                    key = (sym, interval)
+                    if key not in client.bar_subscriptions:
+                        continue
+                    if key not in rendered:
+                        bar = tick_store.last_bar(sym, interval)
+                        rendered[key] = bar and json.dumps(
+                            {"type": "bar", "symbol": sym, "interval": interval, "bar": bar}
+                        )
+                    if rendered[key]:
+                        client.enqueue_bar(rendered[key])
+
+    def update_cache(self, prices: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+        """
+        Replace the cached snapshot and return the delta against the previous one:
+        symbols that are new or whose price changed.
+        """
+        previous = self.cached_prices
+        changed = {
+            sym: price for sym, price in prices.items()
+            if sym not in previous or previous[sym] != price
+        }
         self.cached_prices = prices
         self.last_updated = datetime.now(timezone.utc).isoformat()
+        self.price_updated_at = self._stamp(prices, {}, time.time())
+        return changed
+
+    @staticmethod
+    def _stamp(prices: Dict[str, Optional[float]], updated_at: Dict[str, float], ts: float) -> Dict[str, float]:
+        """Record `ts` as the refresh time of every symbol in `prices` that has a price."""
+        for sym, price in prices.items():
+            if price is not None:
+                updated_at[sym] = ts
+        return updated_at
+
+    def price_with_age(self, symbol: str):
+        """(price, updated_at epoch seconds) from the live cache, or None if it has no price."""
+        price = self.cached_prices.get(symbol)
+        updated_at = self.price_updated_at.get(symbol)
+        if price is None or updated_at is None:
+            return None
+        return price, updated_at
+
+    def merge_cache(self, prices: Dict[str, Optional[float]], active: Set[str]) -> Dict[str, Optional[float]]:
+        """
+        Merge a partial refresh into the cached snapshot, dropping symbols that are no
+        longer in `active`. Returns the delta (new or changed symbols) among `prices`.
+        """
+        previous = self.cached_prices
+        merged = {sym: price for sym, price in previous.items() if sym in active}
+        changed = {}
+        for sym, price in prices.items():
+            if sym not in previous or previous[sym] != price:
+                changed[sym] = price
+            merged[sym] = price
+        self.cached_prices = merged
+        self.price_updated_at = self._stamp(
+            prices, {sym: ts for sym, ts in self.price_updated_at.items() if sym in merged}, time.time()
+        )
+        if prices:
+            self.last_updated = datetime.now(timezone.utc).isoformat()
+        return changed
+
+    async def apply_bus_message(self, message: Dict):
+        """
+        Apply a snapshot or tick published by the price bus leader and fan out the delta.
+        Followers only see changed prices, so their tick rings skip unchanged refreshes.
+        """
+        kind = message.get("type")
+        if kind == "snapshot":
+            changed = self.update_cache(message.get("prices") or {})
+            self.price_updated_at.update(message.get("updated_at") or {})
+        elif kind == "tick":
+            changed = message.get("changed") or {}
+            removed = message.get("removed") or []
+            merged = dict(self.cached_prices)
+            for sym in removed:
+                merged.pop(sym, None)
+                self.price_updated_at.pop(sym, None)
+            merged.update(changed)
+            self.cached_prices = merged
+            # Unchanged refreshes still count toward freshness
+            ts = message.get("ts") or time.time()
+            for sym in message.get("refreshed") or changed:
+                if merged.get(sym) is not None:
+                    self.price_updated_at[sym] = ts
+            self.last_updated = message.get("last_updated") or datetime.now(timezone.utc).isoformat()
+            tick_store.drop(removed)
+        else:
+            return
+        if changed:
+            await self.broadcast_prices(changed)
+            await self.broadcast_bars(tick_store.record(changed))
+
+    def connection_stats(self) -> Dict:
+        """Per-connection queue depth, coalescing and delivery lag, plus an aggregate p99."""
+        per_connection = [client.stats() for client in self.clients.values()]
+        all_lags = sorted(lag for client in self.clients.values() for lag in client.lag_samples)
+        p99 = round(all_lags[min(len(all_lags) - 1, int(0.99 * len(all_lags)))] * 1000, 2) if all_lags else None
+        return {
+            "connections": len(per_connection),
+            "subscribed_symbols": len(self.symbol_subscribers),
+            "bar_symbols": len(self.bar_subscribers),
+            "tick_store": tick_store.stats(),
+            "lag_ms_p99": p99,
+            "clients": per_connection,
+        }
 
 manager = ConnectionManager()
+# Valuation code (utils/price_lookup.py) reads prices and their age from this worker's cache
+register_live_source(manager.price_with_age)
 
 # -------------------------
 # Helpers: Symbol collection
 # -------------------------
 async def get_active_symbols() -> Set[str]:
     """
-    Collect unique symbols from portfolios and user watchlists.
-    Normalizes symbols to uppercase stripped strings.
+    Unique symbols from portfolios and user watchlists, read from the in-memory
+    symbol registry. The registry is seeded from Mongo on first use and
+    reconciled every RECONCILE_INTERVAL_SECONDS; routes keep it current in between.
     Excludes simulated mutual fund IDs (SIMULATED_MF_IDS).
     """
-    symbols = set()
-
-    # 1. Get symbols from portfolios (aggregation)
-    try:
-        pipeline = [
-            {"$unwind": {"path": "$investments", "preserveNullAndEmptyArrays": False}},
-            {"$group": {"_id": None, "symbols": {"$addToSet": "$investments.symbol"}}},
-        ]
-        cursor = portfolio_collection.aggregate(pipeline)
-        portfolio_data = await cursor.to_list(length=1)
-        if portfolio_data and "symbols" in portfolio_data[0]:
-            symbols.update([s for s in portfolio_data[0]["symbols"] if s])
-    except Exception as e:
-        logger.exception("Error fetching symbols from portfolios: %s", e)
-
-    # 2. Get symbols from users' watchlists
-    try:
-        async for user in users_collection.find({"watchlist": {"$exists": True, "$not": {"$size": 0}}}, {"watchlist": 1}):
-            wl = user.get("watchlist") or []
-            symbols.update([s for s in wl if s])
-    except Exception as e:
-        logger.exception("Error fetching symbols from watchlists: %s", e)
-
-    # Normalize and filter out simulated mutual funds and bad entries
-    normalized = set()
-    for s in symbols:
+    if symbol_registry.needs_reconcile():
         try:
-            candidate = str(s).strip().upper()
-            if candidate and candidate not in SIMULATED_MF_IDS:
-                normalized.add(candidate)
-        except Exception:
-            continue
+            await reconcile_symbol_registry()
+        except Exception as e:
+            logger.exception("Error reconciling symbol registry: %s", e)
 
-    return normalized
+    return {s for s in symbol_registry.symbols() if s not in SIMULATED_MF_IDS}
 
 # -------------------------
 # Helpers: Fetching prices robustly
 # -------------------------
-def chunk_iterable(iterable: Iterable[str], size: int):
-    it = list(iterable)
-    for i in range(0, len(it), size):
-        yield it[i:i + size]
-
-def safe_float(val) -> Optional[float]:
-    try:
-        f = float(val)
-        if math.isnan(f):
-            return None
-        return f
-    except Exception:
-        return None
-
-def _parse_yf_dataframe_for_symbol(df: pd.DataFrame, symbol: str) -> Optional[float]:
-    """
-    Return the latest close price for `symbol` from yfinance download dataframe.
-    Handles multi-index and single-index DataFrames.
-    """
-    try:
-        # MultiIndex columns case: columns like ('AAPL', 'Close')
-        if isinstance(df.columns, pd.MultiIndex):
-            top_level = df.columns.levels[0]
-            if symbol in top_level:
-                try:
-                    col = df[symbol]
-                    if "Close" in col.columns:
-                        return safe_float(col["Close"].iloc[-1])
-                except Exception:
-                    # some shapes vary; try direct index
-                    try:
-                        return safe_float(df[(symbol, "Close")].iloc[-1])
-                    except Exception:
-                        return None
-        else:
-            # Single ticker case or single-level columns
-            if "Close" in df.columns:
-                # df['Close'] may be a Series (single ticker) or DataFrame
-                try:
-                    return safe_float(df["Close"].iloc[-1])
-                except Exception:
-                    # fallback: last row 'Close' value
-                    try:
-                        return safe_float(df.iloc[-1]["Close"])
-                    except Exception:
-                        return None
-    except Exception:
-        return None
-    return None
-
 def fetch_prices_blocking(active_symbols: Set[str]) -> Dict[str, Optional[float]]:
     """
     Synchronous worker function to fetch prices for the provided symbols.
-    - Uses chunking to avoid requesting too many tickers at once.
-    - Tries multiple parsing strategies.
-    - Falls back to per-symbol yf.Ticker.history if bulk fails.
-    - Returns a mapping symbol -> price (or None if not available).
+    Delegates to utils.price_engine, which runs chunks concurrently under a
+    token-bucket rate limit, retries misses in batches and stops at a deadline
+    that keeps a full refresh inside one update interval.
+    Returns a mapping symbol -> price (or None if not available).
     """
     if not active_symbols:
         return {}
 
-    tickers_list = [s.strip().upper() for s in active_symbols if isinstance(s, str) and s.strip()]
-    live_prices: Dict[str, Optional[float]] = {}
-
-    CHUNK_SIZE = 30        # tune depending on provider limits and performance
-    SLEEP_BETWEEN_CHUNKS = 0.4
-
-    for chunk in chunk_iterable(tickers_list, CHUNK_SIZE):
-        try:
-            logger.debug("yfinance.download chunk: %s", chunk)
-            # threads=True can be faster but may depend on environment
-            df = yf.download(chunk, period="1d", group_by="ticker", threads=True, progress=False, auto_adjust=False)
-
-            if df is None:
-                logger.warning("yfinance returned None for chunk: %s", chunk)
-                for sym in chunk:
-                    live_prices[sym] = None
-                time.sleep(SLEEP_BETWEEN_CHUNKS)
-                continue
-
-            # If df is empty DataFrame, log and fallback per-symbol
-            if isinstance(df, pd.DataFrame) and df.empty:
-                logger.warning("yfinance returned empty DataFrame for chunk: %s", chunk)
-                # Try fallback per-symbol
-                for sym in chunk:
-                    price_val = None
-                    try:
-                        t = yf.Ticker(sym)
-                        hist = t.history(period="1d")
-                        if hist is not None and not hist.empty:
-                            price_val = safe_float(hist["Close"].iloc[-1])
-                    except Exception as e:
-                        logger.debug("yf.Ticker fallback error for %s: %s", sym, e)
-                    live_prices[sym] = round(price_val, 2) if price_val is not None else None
-                time.sleep(SLEEP_BETWEEN_CHUNKS)
-                continue
-
-            # Parse bulk df
-            for sym in chunk:
-                price_val = None
-                try:
-                    price_val = _parse_yf_dataframe_for_symbol(df, sym)
-                except Exception as e:
-                    logger.debug("Error parsing symbol %s from df: %s", sym, e)
-
-                # if still None, try fallback per-symbol
-                if price_val is None:
-                    try:
-                        t = yf.Ticker(sym)
-                        hist = t.history(period="1d")
-                        if hist is not None and not hist.empty:
-                            price_val = safe_float(hist["Close"].iloc[-1])
-                    except Exception as e:
-                        logger.debug("yf.Ticker fallback error for %s: %s", sym, e)
-
-                live_prices[sym] = round(price_val, 2) if price_val is not None else None
-
-        except Exception as e:
-            logger.exception("Bulk fetch chunk failed for chunk %s: %s", chunk, e)
-            # Set None for this chunk to avoid leaving UI in indefinite loading
-            for sym in chunk:
-                live_prices[sym] = None
-
-        # Be polite to provider
-        time.sleep(SLEEP_BETWEEN_CHUNKS)
-
+    live_prices = fetch_prices(active_symbols, deadline_seconds=PRICE_FETCH_DEADLINE_SECONDS)
     logger.info("Fetched prices for %d symbols", len(live_prices))
     return live_prices
 
@@ -257,74 +618,170 @@ def fetch_prices_blocking(active_symbols: Set[str]) -> Dict[str, Optional[float]
 # Price updater background task
 # -------------------------
 PRICE_UPDATE_INTERVAL_SECONDS = 30
+# Upper bound for one fetch batch; leaves headroom for cache diffing and fan-out
+PRICE_FETCH_DEADLINE_SECONDS = PRICE_UPDATE_INTERVAL_SECONDS * 0.8
+# How often the updater wakes to check which symbols are due (see utils/refresh_scheduler.py)
+SCHEDULER_TICK_SECONDS = 2
+# Provider budget: most symbols refreshed in a single wake-up; the rest wait for the next one
+MAX_SYMBOLS_PER_CYCLE = 300
+
+price_bus = create_price_bus(PRICE_BUS_TRANSPORT, PRICE_BUS_SOCKET_PATH, PRICE_BUS_LOCK_PATH)
+price_bus.snapshot_provider = lambda: {"prices": manager.cached_prices, "updated_at": manager.price_updated_at}
+# Follower workers' subscriber counts, refreshed by the leader once per loop
+_remote_subscribers: Dict[str, int] = {}
+
+scheduler = RefreshScheduler(
+    subscriber_count=lambda sym: manager.subscriber_count(sym) + _remote_subscribers.get(sym, 0)
+)
+
+def _normalize_prices(live_prices: Optional[Dict[str, Optional[float]]]) -> Dict[str, Optional[float]]:
+    """Normalize keys to uppercase and ensure None is JSON-serializable."""
+    normalized: Dict[str, Optional[float]] = {}
+    for k, v in (live_prices or {}).items():
+        normalized_key = (k or "").strip().upper()
+        normalized[normalized_key] = None if v is None else float(v)
+    return normalized
 
 async def price_updater_task():
     """
-    Background coroutine to periodically fetch active symbols and broadcast live prices.
-    Designed to be started via asyncio.create_task(...) from FastAPI startup.
+    Leader-only background coroutine that refreshes live prices on a per-symbol schedule.
+    Every SCHEDULER_TICK_SECONDS it syncs the scheduler with the active symbols
+    (including interest reported by follower workers), fetches only the ones that
+    are due, broadcasts what changed to local clients and publishes it on the price bus.
     """
+    global _remote_subscribers
     logger.info("🚀 Price Updater Service started")
     while True:
         try:
+            _remote_subscribers = price_bus.remote_interest()
             active_symbols = await get_active_symbols()
-            if not active_symbols:
-                # If nothing is active, still broadcast an empty payload (or skip)
-                logger.debug("No active symbols found; broadcasting empty prices")
-                payload = {"type": "live_prices", "data": {}, "last_updated": datetime.now(timezone.utc).isoformat()}
-                # update cache and broadcast so clients know we are alive
-                manager.update_cache({})
-                await manager.broadcast(payload)
-                await asyncio.sleep(PRICE_UPDATE_INTERVAL_SECONDS)
-                continue
-
-            # Fetch prices in a thread to avoid blocking event loop
-            live_prices = await asyncio.to_thread(fetch_prices_blocking, active_symbols)
+            # Symbols a client is looking at (e.g. a StockDetails page), here or on another worker, are live too
+            active_symbols |= {
+                s for s in (manager.subscribed_symbols() | set(_remote_subscribers)) if s not in SIMULATED_MF_IDS
+            }
+            scheduler.sync(active_symbols)
 
-            # Normalize keys to uppercase and ensure None is JSON-serializable
+            due = scheduler.pop_due(limit=MAX_SYMBOLS_PER_CYCLE)
             normalized: Dict[str, Optional[float]] = {}
-            for k, v in (live_prices or {}).items():
-                normalized_key = (k or "").strip().upper()
-                normalized[normalized_key] = None if v is None else float(v)
-
-            # Update cache and broadcast new payload
-            manager.update_cache(normalized)
-            payload = {
-                "type": "live_prices",
-                "data": normalized,
-                "last_updated": manager.last_updated,
-            }
-            await manager.broadcast(payload)
-            logger.info("Broadcasted %d prices to %d connections", len(normalized), len(manager.active_connections))
+            if due:
+                # Fetch prices in a thread to avoid blocking event loop
+                live_prices = await asyncio.to_thread(fetch_prices_blocking, set(due))
+                normalized = _normalize_prices(live_prices)
+                scheduler.record(normalized)
+
+            # Merge into the cache (dropping inactive symbols) and push each client
+            # the changed part of its subscribed slice
+            before = set(manager.cached_prices)
+            changed = manager.merge_cache(normalized, active_symbols)
+            removed = sorted(before - set(manager.cached_prices))
+            if changed:
+                await manager.broadcast_prices(changed)
+            # Every fetched price is a tick, moved or not; bar streams follow the rings
+            tick_store.drop(removed)
+            if normalized:
+                await manager.broadcast_bars(tick_store.record(normalized))
+            if normalized or removed:
+                await price_bus.publish({
+                    "type": "tick",
+                    "changed": changed,
+                    "removed": removed,
+                    "refreshed": sorted(normalized),
+                    "ts": time.time(),
+                    "last_updated": manager.last_updated,
+                })
+            if due:
+                logger.info("Refreshed %d due symbols (%d active); broadcasted %d changed prices to %d connections",
+                            len(due), len(active_symbols), len(changed), len(manager.active_connections))
         except Exception as e:
             logger.exception("Critical error in price_updater_task: %s", e)
 
-        await asyncio.sleep(PRICE_UPDATE_INTERVAL_SECONDS)
+        await asyncio.sleep(SCHEDULER_TICK_SECONDS)
 
 # -------------------------
-# Startup helper / public API
+# Follower side of the price bus
 # -------------------------
-async def start_price_updater_on_startup():
-    """
-    Helper to be called on FastAPI startup.
-    """
-    # Optionally prime the cache once before starting (fetch once synchronously)
+async def _report_interest():
+    """Tell the leader which symbols this worker's clients and users care about, when it changes."""
+    last_sent = None
+    while True:
+        interest = {sym: 0 for sym in symbol_registry.symbols() if sym not in SIMULATED_MF_IDS}
+        for sym in manager.subscribed_symbols():
+            if sym not in SIMULATED_MF_IDS:
+                interest[sym] = manager.subscriber_count(sym)
+        if interest != last_sent:
+            await price_bus.send_interest(interest)
+            last_sent = interest
+        await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+
+async def price_follower_task():
+    """Consume ticks from the leader into this worker's manager until the bus drops."""
+    logger.info("Following price bus leader")
+    reporter = None
+    try:
+        async for message in price_bus.consume():
+            if reporter is None:
+                reporter = asyncio.create_task(_report_interest())
+            await manager.apply_bus_message(message)
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+
+async def prime_price_cache():
+    """Fetch all active symbols once so the cache is warm before the first client connects."""
     try:
         active_symbols = await get_active_symbols()
         if active_symbols:
             initial_prices = await asyncio.to_thread(fetch_prices_blocking, active_symbols)
-            # Normalize and update cache
-            normalized = {k.strip().upper(): (None if v is None else float(v)) for k, v in (initial_prices or {}).items()}
+            # Normalize and update cache; seed the scheduler so the first loop doesn't refetch everything
+            normalized = _normalize_prices(initial_prices)
             manager.update_cache(normalized)
+            tick_store.record(normalized)
+            scheduler.sync(active_symbols)
+            scheduler.record(normalized)
     except Exception as e:
         logger.warning("Initial cache prime failed: %s", e)
 
-    # Start the periodic updater in the background
-    asyncio.create_task(price_updater_task())
-    logger.info("Price updater background task scheduled")
+async def price_bus_role_task():
+    """
+    Follow the current leader; whenever the leader is gone, try to take over.
+    Exactly one worker holds the lock, so exactly one polls the provider.
+    """
+    while True:
+        if price_bus.try_become_leader():
+            await price_bus.serve()
+            await prime_price_cache()
+            await price_updater_task()
+        try:
+            await price_follower_task()
+        except Exception as e:
+            logger.info("Price bus follower disconnected: %s", e)
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+# -------------------------
+# Startup helper / public API
+# -------------------------
+async def start_price_updater_on_startup():
+    """
+    Helper to be called on FastAPI startup.
+    The worker that wins the price bus election primes the cache and polls;
+    the others follow it.
+    """
+    if price_bus.try_become_leader():
+        await price_bus.serve()
+        await prime_price_cache()
+        # Start the periodic updater in the background
+        asyncio.create_task(price_updater_task())
+        logger.info("Price updater background task scheduled (leader)")
+    else:
+        asyncio.create_task(price_bus_role_task())
+        logger.info("Price bus follower task scheduled")
 
 # Exported objects
 __all__ = [
     "manager",
+    "scheduler",
+    "price_bus",
+    "ClientConnection",
     "get_active_symbols",
     "price_updater_task",
     "start_price_updater_on_startup",
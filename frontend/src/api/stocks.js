@@ -35,11 +35,13 @@ export const getStockPrice = async (symbol) => {
 /**
  * Fetches historical candle data for charts.
  * Now returns OHLC data for Candlestick charts.
+ * format: 'records' ([{time, open, high, low, close}]) or 'columnar' ({time: [], open: [], ...})
+ * maxPoints: if set, the server merges bars into at most this many candles
  */
-export const getStockHistory = async (symbol, period = '1y') => {
+export const getStockHistory = async (symbol, period = '1y', format = 'records', maxPoints = null) => {
   try {
     const response = await client.get(`/stocks/history/${symbol}`, {
-      params: { period }
+      params: { period, format, max_points: maxPoints ?? undefined }
     });
     return response.data;
   } catch (error) {
@@ -48,6 +50,22 @@ export const getStockHistory = async (symbol, period = '1y') => {
   }
 };
 
+/**
+ * Fetches today's intraday bars from the server's in-memory tick buffers.
+ * interval: '1m' | '5m' | 'tick'
+ */
+export const getIntradayBars = async (symbol, interval = '1m', minutes = 390) => {
+  try {
+    const response = await client.get(`/stocks/intraday/${symbol}`, {
+      params: { interval, minutes }
+    });
+    return response.data;
+  } catch (error) {
+    console.error("Error fetching intraday bars:", error);
+    throw error.response?.data || { error: "Network error" };
+  }
+};
+
 /**
  * Calculates projected returns (CAGR).
  */
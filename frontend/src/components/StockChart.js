@@ -1,7 +1,8 @@
 // src/components/StockChart.js
 import React, { useEffect, useRef, useState } from 'react';
 import { createChart, ColorType, CandlestickSeries } from 'lightweight-charts';
-import { getStockHistory } from '../api/stocks';
+import { getStockHistory, getIntradayBars } from '../api/stocks';
+import { useWebSocket } from '../context/WebSocketContext';
 import { Box, Flex, Button, Spinner, Text } from '@chakra-ui/react';
 
 function StockChart({ symbol }) {
@@ -9,6 +10,7 @@ function StockChart({ symbol }) {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     const [period, setPeriod] = useState('1y');
+    const { subscribeBars } = useWebSocket();
 
     // We use a single useEffect to handle the Chart Lifecycle (Create -> Fetch -> Destroy)
     // This prevents the "chart is not a function" error by ensuring perfect order of operations.
@@ -70,16 +72,30 @@ function StockChart({ symbol }) {
         });
 
         // 4. DATA FETCHING: Get data from Backend and set it
+        // '1d' is served from the server's live tick buffers and then kept current by streamed bars
+        const intraday = period === '1d';
+        const stopBars = intraday
+            ? subscribeBars(symbol, '1m', bar => {
+                candlestickSeries.update(bar);
+                setError('');
+            })
+            : null;
         const fetchData = async () => {
             setLoading(true);
             setError('');
             try {
                 // Fetch OHLC data from our Python Backend
-                const data = await getStockHistory(symbol, period);
-                
+                // Long periods are merged server-side to roughly one candle per 3px of chart width
+                const maxPoints = Math.max(100, Math.floor(container.clientWidth / 3));
+                const data = intraday
+                    ? await getIntradayBars(symbol, '1m')
+                    : await getStockHistory(symbol, period, 'records', maxPoints);
+
                 if (data && data.length > 0) {
                     candlestickSeries.setData(data);
                     chart.timeScale().fitContent(); // Auto-zoom to fit data
+                } else if (intraday) {
+                    setError('Waiting for live ticks...');
                 } else {
                     setError('No data available for this period.');
                 }
@@ -104,13 +120,14 @@ function StockChart({ symbol }) {
         // 6. CLEANUP: Destroy chart when component unmounts or symbol/period changes
         return () => {
             window.removeEventListener('resize', handleResize);
+            if (stopBars) stopBars();
             chart.remove();
         };
 
-    }, [symbol, period]); // Re-run everything if Symbol or Period changes
+    }, [symbol, period, subscribeBars]); // Re-run everything if Symbol or Period changes
 
     // Period Buttons Configuration
-    const periods = ['1mo', '3mo', '6mo', '1y', '2y', '5y'];
+    const periods = ['1d', '1mo', '3mo', '6mo', '1y', '2y', '5y'];
 
     return (
         <Box className="glass-panel" p={4} mt={6} borderRadius="xl" bg="var(--bg-dark-secondary)">
@@ -1,24 +1,57 @@
 // src/context/WebSocketContext.js
 
-import React, { createContext, useState, useContext, useEffect } from 'react';
+import React, { createContext, useState, useContext, useEffect, useRef, useCallback } from 'react';
 
 const WebSocketContext = createContext(null);
 
 export function WebSocketProvider({ children }) {
     const [livePrices, setLivePrices] = useState({});
+    const wsRef = useRef(null);
+    // symbol -> number of mounted components interested in it
+    const subscriptionCounts = useRef({});
+    // Last live_prices sequence number received on this socket
+    const lastSeqRef = useRef(0);
+    // "SYMBOL|interval" -> Set of callbacks receiving live OHLC bars
+    const barListeners = useRef({});
+
+    const send = useCallback((message) => {
+        const ws = wsRef.current;
+        if (ws && ws.readyState === WebSocket.OPEN) {
+            ws.send(JSON.stringify(message));
+        }
+    }, []);
 
     useEffect(() => {
         const ws = new WebSocket("ws://localhost:8000/ws");
+        wsRef.current = ws;
 
         ws.onopen = () => {
             console.log("WebSocket Connected");
+            // Re-send anything components subscribed to before the socket opened
+            const symbols = Object.keys(subscriptionCounts.current);
+            if (symbols.length > 0) {
+                ws.send(JSON.stringify({ action: "subscribe", symbols }));
+            }
+            Object.keys(barListeners.current).forEach(key => {
+                const [symbol, interval] = key.split('|');
+                ws.send(JSON.stringify({ action: "subscribe_bars", symbols: [symbol], interval }));
+            });
         };
 
         ws.onmessage = (event) => {
             try {
                 const message = JSON.parse(event.data);
                 if (message.type === "live_prices") {
+                    // Ticks are deltas; a skipped sequence number means we missed one
+                    const expected = lastSeqRef.current + 1;
+                    if (message.mode === "delta" && lastSeqRef.current > 0 && message.seq !== expected) {
+                        ws.send(JSON.stringify({ action: "snapshot" }));
+                    }
+                    lastSeqRef.current = message.seq || 0;
                     setLivePrices(prevPrices => ({ ...prevPrices, ...message.data }));
+                } else if (message.type === "bar") {
+                    const listeners = barListeners.current[`${message.symbol}|${message.interval}`];
+                    if (listeners) listeners.forEach(callback => callback(message.bar));
                 }
             } catch (error) {
                 console.error("Error parsing WebSocket message:", error);
@@ -39,7 +72,51 @@ export function WebSocketProvider({ children }) {
         };
     }, []); // Empty dependency array ensures this runs only once
 
-    const value = { livePrices };
+    const subscribe = useCallback((symbols) => {
+        const added = [];
+        symbols.filter(Boolean).map(s => s.toUpperCase()).forEach(sym => {
+            const count = subscriptionCounts.current[sym] || 0;
+            if (count === 0) added.push(sym);
+            subscriptionCounts.current[sym] = count + 1;
+        });
+        if (added.length > 0) send({ action: "subscribe", symbols: added });
+    }, [send]);
+
+    const unsubscribe = useCallback((symbols) => {
+        const removed = [];
+        symbols.filter(Boolean).map(s => s.toUpperCase()).forEach(sym => {
+            const count = subscriptionCounts.current[sym] || 0;
+            if (count <= 1) {
+                delete subscriptionCounts.current[sym];
+                if (count === 1) removed.push(sym);
+            } else {
+                subscriptionCounts.current[sym] = count - 1;
+            }
+        });
+        if (removed.length > 0) send({ action: "unsubscribe", symbols: removed });
+    }, [send]);
+
+    // Streams live bars for one symbol/interval to `callback`; returns the cleanup function
+    const subscribeBars = useCallback((symbol, interval, callback) => {
+        const sym = symbol.toUpperCase();
+        const key = `${sym}|${interval}`;
+        if (!barListeners.current[key]) {
+            barListeners.current[key] = new Set();
+            send({ action: "subscribe_bars", symbols: [sym], interval });
+        }
+        barListeners.current[key].add(callback);
+        return () => {
+            const listeners = barListeners.current[key];
+            if (!listeners) return;
+            listeners.delete(callback);
+            if (listeners.size === 0) {
+                delete barListeners.current[key];
+                send({ action: "unsubscribe_bars", symbols: [sym], interval });
+            }
+        };
+    }, [send]);
+
+    const value = { livePrices, subscribe, unsubscribe, subscribeBars };
 
     return (
         <WebSocketContext.Provider value={value}>
@@ -55,4 +132,17 @@ export function useWebSocket() {
         throw new Error('useWebSocket must be used within a WebSocketProvider');
     }
     return context;
-}
\ No newline at end of file
+}
+
+// Subscribes the calling component to live prices for `symbols` while it is mounted
+export function usePriceSubscription(symbols) {
+    const { subscribe, unsubscribe } = useWebSocket();
+    const key = [...new Set((symbols || []).filter(Boolean).map(s => s.toUpperCase()))].sort().join(',');
+
+    useEffect(() => {
+        const list = key ? key.split(',') : [];
+        if (list.length === 0) return undefined;
+        subscribe(list);
+        return () => unsubscribe(list);
+    }, [key, subscribe, unsubscribe]);
+}
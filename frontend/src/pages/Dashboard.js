@@ -10,7 +10,7 @@ import { Doughnut, Line } from 'react-chartjs-2';
 import { Chart as ChartJS, ArcElement, Tooltip, Legend, CategoryScale, LinearScale, PointElement, LineElement, Title, Filler } from 'chart.js';
 import NewsTicker from '../components/NewsTicker';
 import Joyride, { STATUS } from 'react-joyride';
-import { useWebSocket } from '../context/WebSocketContext';
+import { useWebSocket, usePriceSubscription } from '../context/WebSocketContext';
 import {
   Box, Container, Flex, Heading, Text, SimpleGrid, Grid, GridItem,
   Input, List, ListItem, Spinner, Skeleton, Button, IconButton, Badge,
@@ -129,6 +129,26 @@ const MoversList = ({ title, items, type }) => (
     </Box>
 );
 
+// Average day change per sector across the movers universe; stronger colour = bigger move
+const SectorHeatmap = ({ sectors }) => (
+    <Box>
+        <Text fontSize="xs" fontWeight="bold" color="gray.500" mb={2} textTransform="uppercase">Sectors</Text>
+        <Flex wrap="wrap" gap={1}>
+            {sectors.map(s => {
+                const alpha = Math.min(Math.abs(s.change) / 2, 1) * 0.6 + 0.15;
+                const rgb = s.change >= 0 ? '16, 185, 129' : '244, 63, 94';
+                return (
+                    <Box key={s.sector} px={2} py={1} borderRadius="md" bg={`rgba(${rgb}, ${alpha})`}
+                         title={`${s.count} stocks: ${s.advancers} up, ${s.decliners} down`}>
+                        <Text fontSize="xs" fontWeight="bold">{s.sector}</Text>
+                        <Text fontSize="xs">{s.change >= 0 ? '+' : ''}{s.change.toFixed(2)}%</Text>
+                    </Box>
+                );
+            })}
+        </Flex>
+    </Box>
+);
+
 const AllocationChart = ({ data }) => {
   if (!data) return <Flex justify="center" align="center" h="100%"><Text color="gray.500">No assets</Text></Flex>;
   return (
@@ -179,6 +199,9 @@ function Dashboard() {
     });
     const [sendingEmail, setSendingEmail] = useState(false);
 
+    // Only stream prices for what this page shows: holdings and watchlist
+    usePriceSubscription([...portfolio.map(inv => inv.symbol), ...watchlist]);
+
     const tourSteps = [
         { target: '#hero-stat', content: 'Your total simulated Net Worth.' },
         { target: '#market-movers', content: 'Check top gainers and losers.' },
@@ -378,6 +401,7 @@ function Dashboard() {
                             <>
                                 <MoversList title="Top Gainers" items={movers.gainers} type="gain" />
                                 <MoversList title="Top Losers" items={movers.losers} type="loss" />
+                                {movers.sectors?.length > 0 && <SectorHeatmap sectors={movers.sectors} />}
                             </>
                         ) : <Spinner size="sm" />}
                     </BentoCard>
@@ -27,9 +27,25 @@ const FundCard = ({ fund }) => (
       Category: {fund.category}
     </Text>
     <Text mt={3}>
-      <Text as="span" color="var(--text-secondary-dynamic, var(--text-secondary))">Base NAV: </Text>
-      <Text as="span" fontWeight="bold">{formatCurrency(fund.baseNav, 'INR')}</Text>
+      <Text as="span" color="var(--text-secondary-dynamic, var(--text-secondary))">NAV: </Text>
+      <Text as="span" fontWeight="bold">{formatCurrency(fund.nav ?? fund.baseNav, 'INR')}</Text>
     </Text>
+    {fund.returns && (
+      <Flex mt={2} gap={4} fontSize="sm" wrap="wrap">
+        {[['1M', '1m'], ['1Y', '1y'], ['3Y p.a.', '3y']].map(([label, key]) => (
+          <Text key={key}>
+            <Text as="span" color="var(--text-secondary-dynamic, var(--text-secondary))">{label}: </Text>
+            <Text as="span" fontWeight="bold" color={fund.returns[key] >= 0 ? 'green.400' : 'red.400'}>
+              {fund.returns[key].toFixed(2)}%
+            </Text>
+          </Text>
+        ))}
+        <Text>
+          <Text as="span" color="var(--text-secondary-dynamic, var(--text-secondary))">Volatility: </Text>
+          <Text as="span" fontWeight="bold">{fund.volatility.toFixed(2)}%</Text>
+        </Text>
+      </Flex>
+    )}
   </Box>
 );
 
@@ -40,7 +56,6 @@ function MutualFunds() {
     const [amount, setAmount] = useState(5000);
     const [loading, setLoading] = useState(false);
     const [pageLoading, setPageLoading] = useState(true);
-    const [currentNav, setCurrentNav] = useState(null);
     const [filterCategory, setFilterCategory] = useState('All Funds');
 
     const fundCategories = [
@@ -79,22 +94,11 @@ function MutualFunds() {
         }
     }, [filteredFunds, selectedFundId]);
 
-    useEffect(() => {
-        if (!selectedFundId) {
-            setCurrentNav(null);
-            return;
-        }
-        const fetchNav = async () => {
-            setCurrentNav(null);
-            try {
-                const response = await axios.get(`${BASE_URL}/mutual-funds/nav/${selectedFundId}`);
-                setCurrentNav(response.data.simulated_nav);
-            } catch (error) {
-                toast.error(`Could not fetch NAV for ${selectedFundId}.`);
-            }
-        };
-        fetchNav();
-    }, [selectedFundId]);
+    // Today's NAV comes with the catalog, so picking a fund needs no extra request
+    const currentNav = useMemo(
+        () => allFunds.find(fund => fund.id === selectedFundId)?.nav ?? null,
+        [allFunds, selectedFundId]
+    );
 
     const handleBuy = async (e) => {
         e.preventDefault();
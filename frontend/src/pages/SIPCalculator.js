@@ -145,9 +145,17 @@ function SIPCalculator() {
         setSelectedFund(fundId);
         const fund = funds.find(f => f.id === fundId);
         if (fund) {
-            const expectedReturn = MF_CATEGORY_RETURNS[fund.category] || 12;
-            setRateOfReturn(expectedReturn);
-            toast.info(`Set return rate to ${expectedReturn}% based on ${fund.category} historical averages.`);
+            // The catalog carries each fund's own 3Y annualized return; fall back to the category average
+            const fundCagr = fund.returns?.['3y'];
+            if (fundCagr !== undefined && fundCagr !== null) {
+                const expectedReturn = Number(Math.min(Math.max(fundCagr, 1), 35).toFixed(1));
+                setRateOfReturn(expectedReturn);
+                toast.info(`Set return rate to ${expectedReturn}% based on ${fund.name}'s 3-year return.`);
+            } else {
+                const expectedReturn = MF_CATEGORY_RETURNS[fund.category] || 12;
+                setRateOfReturn(expectedReturn);
+                toast.info(`Set return rate to ${expectedReturn}% based on ${fund.category} historical averages.`);
+            }
         }
     };
 
@@ -295,7 +303,7 @@ function SIPCalculator() {
                         <Text mb={2}>
                             Expected Return Rate (p.a) % 
                             {mode === 'stock' && symbol && <Badge ml={2} colorScheme="green">Based on 5Y History</Badge>}
-                            {mode === 'mf' && selectedFund && <Badge ml={2} colorScheme="blue">Category Avg</Badge>}
+                            {mode === 'mf' && selectedFund && <Badge ml={2} colorScheme="blue">Based on 3Y Return</Badge>}
                         </Text>
                         <Input 
                             type="number" 
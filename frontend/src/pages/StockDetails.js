@@ -9,7 +9,7 @@ import BackButton from '../components/BackButton';
 import StockChart from "../components/StockChart";
 import { toast } from 'react-toastify';
 import { DIVIDEND_STOCKS } from '../utils/dividendAssets';
-import { useWebSocket } from '../context/WebSocketContext';
+import { useWebSocket, usePriceSubscription } from '../context/WebSocketContext';
 import Tooltip from '../components/Tooltip';
 import { useNumberFormat } from '../context/NumberFormatContext';
 import { Select, Input, FormControl, FormLabel, Box, Text } from '@chakra-ui/react';
@@ -80,6 +80,7 @@ function StockDetails() {
     const { symbol } = useParams();
     const { user, refreshUser } = useAuth();
     const { livePrices } = useWebSocket();
+    usePriceSubscription([symbol]);
     const { formatNumber } = useNumberFormat();
 
     const [stockData, setStockData] = useState(null);